@@ -0,0 +1,245 @@
+"""
+Mergeable Streaming Accumulators
+צוברים הניתנים למיזוג לחישוב סטטיסטיקות במנות
+
+Every accumulator has ``update(chunk)`` and ``merge(other)``, so a report can
+be built from CSV chunks (or from per-file partial results) with memory that
+depends on the number of categories and distinct values, not on the total
+number of sequence bytes.
+"""
+
+import numpy as np
+import pandas as pd
+
+from grouped_stats import group_codes, group_moments
+
+# כמות ה-hashes שנצברים לפני איחוד ראשון
+PENDING_HASHES = 1 << 16
+
+
+class ValueCounter:
+    """ספירת ערכים (כמו value_counts) הניתנת למיזוג"""
+
+    def __init__(self):
+        self.counts = pd.Series(dtype='int64')
+
+    def update(self, values):
+        chunk_counts = pd.Series(values).value_counts()
+        self.counts = self.counts.add(chunk_counts, fill_value=0).astype('int64')
+        return self
+
+    def merge(self, other):
+        self.counts = self.counts.add(other.counts, fill_value=0).astype('int64')
+        return self
+
+    def result(self):
+        """ספירות ממוינות מהגדול לקטן"""
+        return self.counts.sort_values(ascending=False, kind='stable')
+
+
+def normalized(values):
+    """צורה אחידה לפני hash: כל ערך מספרי כ-float64, כך ש-1 ו-1.0 נספרים פעם אחת"""
+    if pd.api.types.is_numeric_dtype(values):
+        return values.astype(np.float64)
+    return values
+
+
+def common_dtype(a, b):
+    """ה-dtype המשותף לשתי מנות - כמו שהיה נקבע בקריאת כל הקובץ בבת אחת"""
+    if a is None or a == b:
+        return b if a is None else a
+    try:
+        return np.result_type(a, b)
+    except TypeError:
+        return np.dtype(object)
+
+
+class ColumnProfile:
+    """ספירת ערכים חסרים וערכים ייחודיים לעמודה
+
+    Distinct values are tracked as 64-bit hashes of their normalized form, so
+    even long sequence strings cost 8 bytes per distinct value. New hashes are
+    buffered and deduplicated only once the buffer outgrows the distinct set,
+    instead of re-sorting the whole set on every chunk.
+    """
+
+    def __init__(self):
+        self._dtype = None        # dtype משותף של המנות שיש בהן ערכים
+        self._empty_dtype = None  # dtype של מנה ריקה - רק אם אין אף ערך
+        self.non_null = 0
+        self.null = 0
+        self._hashes = np.empty(0, dtype=np.uint64)
+        self._pending = []
+        self._pending_size = 0
+
+    @property
+    def dtype(self):
+        if self._dtype is None:
+            return self._empty_dtype
+        # ערך חסר הופך עמודת מספרים שלמים ל-float ועמודה בוליאנית ל-object
+        if self.null and self._dtype.kind in 'iu':
+            return np.dtype(np.float64)
+        if self.null and self._dtype.kind == 'b':
+            return np.dtype(object)
+        return self._dtype
+
+    def _observe(self, values):
+        """עדכון ה-dtype והמונים - מחזיר את הערכים שאינם חסרים"""
+        values = pd.Series(values)
+        present = values.dropna()
+        if len(present):
+            self._dtype = common_dtype(self._dtype, values.dtype)
+        elif self._empty_dtype is None:
+            self._empty_dtype = values.dtype
+        self.non_null += len(present)
+        self.null += len(values) - len(present)
+        return present
+
+    def _merge_observed(self, other):
+        """מיזוג ה-dtype והמונים של פרופיל אחר"""
+        if other._dtype is not None:
+            self._dtype = common_dtype(self._dtype, other._dtype)
+        if self._empty_dtype is None:
+            self._empty_dtype = other._empty_dtype
+        self.non_null += other.non_null
+        self.null += other.null
+
+    def _add(self, hashes):
+        self._pending.append(hashes)
+        self._pending_size += len(hashes)
+        if self._pending_size > max(len(self._hashes), PENDING_HASHES):
+            self._flush()
+
+    def _flush(self):
+        if self._pending:
+            self._hashes = np.unique(np.concatenate([self._hashes, *self._pending]))
+            self._pending, self._pending_size = [], 0
+
+    def update(self, values):
+        present = self._observe(values)
+        self._add(pd.util.hash_pandas_object(normalized(present), index=False).to_numpy())
+        return self
+
+    def merge(self, other):
+        self._merge_observed(other)
+        other._flush()
+        self._add(other._hashes)
+        return self
+
+    @property
+    def unique(self):
+        self._flush()
+        return len(self._hashes)
+
+
+class Moments:
+    """מינימום, מקסימום, ממוצע וסטיית תקן (מיזוג לפי Chan et al.)"""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = None
+        self.max = None
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        if len(values) == 0:
+            return self
+        other = Moments()
+        other.count = len(values)
+        other.mean = float(values.mean())
+        other.m2 = float(((values - other.mean) ** 2).sum())
+        other.min = values.min().item()
+        other.max = values.max().item()
+        return self.merge(other)
+
+    def merge(self, other):
+        if other.count == 0:
+            return self
+        if self.count == 0:
+            self.count, self.mean, self.m2 = other.count, other.mean, other.m2
+            self.min, self.max = other.min, other.max
+            return self
+        total = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / total
+        self.m2 += other.m2 + delta ** 2 * self.count * other.count / total
+        self.count = total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    @property
+    def std(self):
+        """סטיית תקן מדגמית (ddof=1, כמו pandas)"""
+        return (self.m2 / (self.count - 1)) ** 0.5 if self.count > 1 else float('nan')
+
+
+class LengthHistogram:
+    """היסטוגרמת אורכים שלמים - חציון ואחוזונים מדויקים במיזוג
+
+    Memory is one counter per possible length up to the longest sequence,
+    which stays small for sequence lengths and is exact, unlike a sketch.
+    """
+
+    def __init__(self):
+        self.bins = np.zeros(0, dtype=np.int64)
+
+    def update(self, lengths):
+        lengths = np.asarray(lengths, dtype=np.int64)
+        if len(lengths):
+            self._add(np.bincount(lengths))
+        return self
+
+    def merge(self, other):
+        self._add(other.bins)
+        return self
+
+    def _add(self, bins):
+        if len(bins) > len(self.bins):
+            self.bins = np.pad(self.bins, (0, len(bins) - len(self.bins)))
+        self.bins[:len(bins)] += bins
+
+    @property
+    def count(self):
+        return int(self.bins.sum())
+
+    def quantile(self, q):
+        """אחוזון עם אינטרפולציה לינארית (כמו pandas)"""
+        n = self.count
+        if n == 0:
+            return float('nan')
+        cum = np.cumsum(self.bins)
+        pos = q * (n - 1)
+        lo, hi = int(np.floor(pos)), int(np.ceil(pos))
+        lo_val = int(np.searchsorted(cum, lo, side='right'))
+        hi_val = int(np.searchsorted(cum, hi, side='right'))
+        return lo_val + (hi_val - lo_val) * (pos - lo)
+
+    def median(self):
+        return self.quantile(0.5)
+
+
+class GroupedMoments:
+    """Moments נפרדים לכל קטגוריה (למשל אורך לפי GeneType)"""
+
+    def __init__(self):
+        self.groups = {}
+
+    def update(self, keys, values):
+        codes, labels = group_codes(keys)
+        moments = group_moments(values, codes, len(labels))
+        for i in np.flatnonzero(moments['count']):
+            part = Moments()
+            part.count = int(moments['count'][i])
+            part.mean = float(moments['mean'][i])
+            part.m2 = float(moments['m2'][i])
+            part.min, part.max = float(moments['min'][i]), float(moments['max'][i])
+            self.groups.setdefault(labels[i], Moments()).merge(part)
+        return self
+
+    def merge(self, other):
+        for key, moments in other.groups.items():
+            self.groups.setdefault(key, Moments()).merge(moments)
+        return self
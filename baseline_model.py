@@ -0,0 +1,225 @@
+"""
+Baseline GeneType Predictor
+מסווג בסיס מהיר ל-GeneType לפי חוקי Symbol/Description, GeneGroupMethod, אורך ו-GC
+
+A naive Bayes model over cheap features: the boolean rule matrix from
+``rule_features`` (Bernoulli terms) and four categorical features -
+GeneGroupMethod, the alphabetic Symbol prefix, a length bin and a GC bin
+(one probability table each). For records of the dataset, GC and length
+come from the cached feature table (packed-store composition); only raw
+input falls back to scanning the sequence bytes. Fitting is a handful of ``bincount`` calls;
+prediction is table lookups plus one ``bincount`` per class over the sparse
+rule hits, so a batch of records is scored without a Python loop per row
+and without any ML library. The model is meant as a fast pre-filter and
+sanity check before the sequence model, not as a replacement for it.
+"""
+
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from data_loader import DATA_DIR, cache_path, load_splits, sequence_lengths
+from features import load_features
+from grouped_stats import group_codes
+from ingest import GENE_TYPES
+from rule_features import RULES, RuleSet
+
+MODEL_VERSION = 1
+MODEL_FILE_NAME = 'baseline_model.npz'
+# החלקת Laplace לכל ההסתברויות
+ALPHA = 1.0
+LENGTH_EDGES = (30, 60, 90, 120, 160, 250, 350, 500, 750, 1000)
+GC_EDGES = (30, 35, 40, 45, 50, 55, 60, 65, 70)
+# ערכים קטגוריאליים שמופיעים פחות מזה באימון נחשבים "לא ידוע"
+MIN_COUNT = 3
+CATEGORICAL = ('GeneGroupMethod', 'symbol_prefix', 'length_bin', 'gc_bin')
+
+# טבלת תרגום בתים: G/C -> 1, כל השאר -> 0
+_GC_TABLE = bytes(int(chr(b) in 'GCgc') for b in range(256))
+
+
+def gc_and_length(sequences):
+    """אחוז GC ואורך לכל רצף - תרגום בתים וסכום לכל רשומה, בלי פירוק לבסיסים"""
+    sequences = pd.Series(sequences).fillna('').astype(str)
+    raw = sequences.str.len().to_numpy(dtype=np.int64)
+    lengths = sequence_lengths(sequences).to_numpy()
+    flags = np.frombuffer(''.join(sequences.tolist()).encode('ascii', 'replace').translate(_GC_TABLE), dtype=np.uint8)
+    gc = np.zeros(len(raw), dtype=np.int64)
+    nonempty = raw > 0
+    if nonempty.any():
+        gc[nonempty] = np.add.reduceat(flags, (np.cumsum(raw) - raw)[nonempty], dtype=np.int64)
+    return np.divide(gc * 100.0, lengths, out=np.zeros(len(raw)), where=lengths > 0), lengths
+
+
+def record_features(records, rule_set, features=None):
+    """הפיצ'רים של כל רשומה: מטריצת החוקים והערכים הקטגוריאליים (לפני קידוד)
+
+    ``features`` are the rows of the feature table (``features.py``) for the
+    same records, in the same order; GC and length are then read from it
+    instead of scanning every sequence byte.
+    """
+    if features is None:
+        gc, lengths = gc_and_length(records['NucleotideSequence'])
+    elif len(features) != len(records):
+        raise ValueError(f"features have {len(features):,} rows for {len(records):,} records")
+    else:
+        gc, lengths = features['gc_content'].to_numpy(dtype=np.float64), features['seq_length'].to_numpy()
+    categorical = {
+        'GeneGroupMethod': records['GeneGroupMethod'],
+        # האותיות הגדולות בתחילת ה-Symbol (מחרוזת ריקה אם אין)
+        'symbol_prefix': records['Symbol'].str.replace(r'[^A-Z].*$', '', regex=True),
+        'length_bin': np.searchsorted(LENGTH_EDGES, lengths, side='right'),
+        'gc_bin': np.searchsorted(GC_EDGES, gc, side='right'),
+    }
+    return rule_set.match(records), categorical
+
+
+class BaselineModel:
+    """Naive Bayes על חוקים בוליאניים ועל ערכים קטגוריאליים"""
+
+    def __init__(self, rules=RULES, classes=GENE_TYPES):
+        self.rules = list(rules)
+        self.rule_set = RuleSet(self.rules)
+        self.classes = list(classes)
+        self.log_prior = None
+        self.rule_base = None    # sum log(1-p) לכל סוג - כשאף חוק לא מתאים
+        self.rule_delta = None   # log(p) - log(1-p) לכל חוק וסוג
+        self.vocab = {}          # פיצ'ר קטגוריאלי -> רשימת הערכים המוכרים
+        self.tables = {}         # פיצ'ר קטגוריאלי -> log P(ערך | סוג), שורה אחרונה = לא ידוע
+
+    def fit(self, records, labels, features=None):
+        y, _ = group_codes(labels, self.classes)
+        known = y >= 0
+        n_classes = len(self.classes)
+        class_counts = np.bincount(y[known], minlength=n_classes)
+        self.log_prior = np.log((class_counts + ALPHA) / (class_counts.sum() + ALPHA * n_classes))
+
+        matches, categorical = record_features(records, self.rule_set, features)
+        rows = matches.rows()
+        hit = known[rows]
+        rule_counts = np.bincount(matches.indices[hit] * n_classes + y[rows[hit]],
+                                  minlength=len(self.rules) * n_classes).reshape(len(self.rules), n_classes)
+        p = (rule_counts + ALPHA) / (class_counts + 2 * ALPHA)
+        self.rule_base = np.log1p(-p).sum(axis=0)
+        self.rule_delta = np.log(p) - np.log1p(-p)
+
+        for name in CATEGORICAL:
+            values = pd.Series(categorical[name])
+            frequent = values.value_counts()
+            self.vocab[name] = sorted(frequent.index[frequent >= MIN_COUNT].tolist(), key=str)
+            codes = self._codes(name, values)
+            table = np.bincount(codes[known] * n_classes + y[known],
+                                minlength=(len(self.vocab[name]) + 1) * n_classes).reshape(-1, n_classes)
+            self.tables[name] = np.log((table + ALPHA) / (class_counts + ALPHA * table.shape[0]))
+        return self
+
+    def _codes(self, name, values):
+        """קוד לכל ערך לפי אוצר המילים מהאימון (ערך לא מוכר/חסר = השורה האחרונה)"""
+        codes, _ = group_codes(pd.Series(values), self.vocab[name])
+        return np.where(codes >= 0, codes, len(self.vocab[name]))
+
+    def decision_function(self, records, features=None):
+        """log של ההסתברות (לא מנורמלת) לכל רשומה וסוג - מערך (n, classes)"""
+        if self.log_prior is None:
+            raise ValueError("model is not fitted")
+        matches, categorical = record_features(records, self.rule_set, features)
+        n_classes = len(self.classes)
+        scores = np.tile(self.log_prior + self.rule_base, (len(records), 1))
+        rows = matches.rows()
+        for c in range(n_classes):
+            scores[:, c] += np.bincount(rows, weights=self.rule_delta[matches.indices, c], minlength=len(records))
+        for name in CATEGORICAL:
+            scores += self.tables[name][self._codes(name, categorical[name])]
+        return scores
+
+    def predict_proba(self, records, features=None):
+        scores = self.decision_function(records, features)
+        scores = np.exp(scores - scores.max(axis=1, keepdims=True))
+        return pd.DataFrame(scores / scores.sum(axis=1, keepdims=True), index=records.index, columns=self.classes)
+
+    def predict(self, records, features=None):
+        """ה-GeneType הסביר ביותר לכל רשומה (Series באותו אינדקס)"""
+        best = self.decision_function(records, features).argmax(axis=1)
+        return pd.Series(np.asarray(self.classes, dtype=object)[best], index=records.index, name='predicted')
+
+    def save(self, path):
+        meta = {'version': MODEL_VERSION, 'rules': self.rules, 'classes': self.classes, 'vocab': self.vocab}
+        np.savez(path, meta=json.dumps(meta), log_prior=self.log_prior, rule_base=self.rule_base,
+                 rule_delta=self.rule_delta, **{f"table_{name}": table for name, table in self.tables.items()})
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            meta = json.loads(str(data['meta']))
+            if meta['version'] != MODEL_VERSION:
+                raise ValueError(f"model version {meta['version']} != {MODEL_VERSION}")
+            model = cls([tuple(rule) for rule in meta['rules']], meta['classes'])
+            model.vocab = meta['vocab']
+            model.log_prior = data['log_prior']
+            model.rule_base = data['rule_base']
+            model.rule_delta = data['rule_delta']
+            model.tables = {name: data[f"table_{name}"] for name in CATEGORICAL}
+        return model
+
+
+def evaluate(model, records, labels, features=None):
+    """דיוק כללי ולכל סוג: recall (דיוק בתוך הסוג), precision ו-support"""
+    predicted = model.predict(records, features).to_numpy()
+    labels = pd.Series(labels).to_numpy()
+    rows = {}
+    for gene_type in model.classes:
+        actual = labels == gene_type
+        chosen = predicted == gene_type
+        if not actual.any() and not chosen.any():
+            continue
+        correct = int((actual & chosen).sum())
+        rows[gene_type] = {
+            'support': int(actual.sum()),
+            'accuracy': correct / actual.sum() if actual.any() else np.nan,
+            'precision': correct / chosen.sum() if chosen.any() else np.nan,
+        }
+    per_class = pd.DataFrame.from_dict(rows, orient='index').rename_axis('GeneType')
+    return float((predicted == labels).mean()) if len(labels) else float('nan'), per_class
+
+
+def model_path(data_dir=DATA_DIR):
+    return cache_path(data_dir, MODEL_FILE_NAME)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fit and evaluate the rule-based GeneType baseline")
+    parser.add_argument('--data-dir', default=DATA_DIR, help="directory holding the split CSV files")
+    parser.add_argument('--output', default=None, help="where to save the fitted model (.npz)")
+    args = parser.parse_args()
+
+    train, test, val, all_data = load_splits(args.data_dir)
+    # GC ואורך מטבלת הפיצ'רים השמורה - השורות של כל סט לפי הסדר ב-all_data
+    features = load_features(all_data, args.data_dir)
+    source = features['source'].to_numpy()
+    split_features = {name: features[source == name] for name in ('train', 'test', 'validation')}
+    start = time.perf_counter()
+    model = BaselineModel().fit(train, train['GeneType'], split_features['train'])
+    fit_seconds = time.perf_counter() - start
+
+    print("=" * 60)
+    print(f"🤖 Baseline GeneType predictor (fit on {len(train):,} train rows in {fit_seconds:.2f}s)")
+    print("=" * 60)
+    for name, df in (('train', train), ('test', test), ('validation', val)):
+        start = time.perf_counter()
+        accuracy, per_class = evaluate(model, df, df['GeneType'], split_features[name])
+        seconds = time.perf_counter() - start
+        print(f"\n📊 {name}: accuracy {accuracy:.2%} ({len(df) / max(seconds, 1e-9):,.0f} rows/s)")
+        print(per_class.to_string(formatters={'accuracy': '{:.1%}'.format, 'precision': '{:.1%}'.format}))
+
+    output = args.output or model_path(args.data_dir)
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    model.save(output)
+    print(f"\n✅ Saved model to: {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,287 @@
+"""
+Batch Report
+דוחות לכמה תיקיות נתונים (snapshots) במקביל, והשוואה ביניהן
+
+Takes dataset directories from glob patterns and/or a manifest file and
+summarizes each one in a worker of a single process pool, so the
+interpreter and libraries are imported once per worker instead of once per
+snapshot. Every dataset is read in streaming chunks sized from
+``--memory-budget``, which keeps the peak memory of all workers together
+bounded no matter how large the snapshots are. Each dataset gets the usual
+report files in its own output folder. The parent then builds a
+cross-snapshot comparison from the small mergeable pieces the workers
+return: class drift (total variation distance between GeneType shares),
+length drift (Kolmogorov-Smirnov distance between the length histograms)
+and exact sequence overlap between every pair of snapshots.
+"""
+
+import argparse
+import contextlib
+import glob
+import io
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+import instrumentation
+from accumulators import LengthHistogram
+from data_loader import SPLIT_FILES, ingest_split
+from generate_report import (OUTPUT_FORMATS, SAMPLE_SIZE, combine, print_report, summarize_file,
+                             write_outputs)
+from instrumentation import stage
+from leakage import sequence_fingerprints
+
+MEMORY_BUDGET_MB = 2048
+# פי כמה גדלה שורה בזיכרון (DataFrame עם מחרוזות) לעומת גודלה בקובץ
+MEMORY_FACTOR = 4
+MIN_CHUNK_SIZE = 1000
+MAX_CHUNK_SIZE = 200000
+
+
+def dataset_files(data_dir):
+    """קבצי הסטים בתיקייה: train/test/validation אם קיימים, אחרת כל קובצי ה-CSV"""
+    files = {name: fname for name, fname in SPLIT_FILES.items()
+             if os.path.exists(os.path.join(data_dir, fname))}
+    if files:
+        return files
+    return {os.path.splitext(os.path.basename(path))[0]: os.path.basename(path)
+            for path in sorted(glob.glob(os.path.join(data_dir, '*.csv')))}
+
+
+def read_manifest(path):
+    """קובץ manifest: שורה לכל dataset - '[NAME=]DIR' (יחסית לקובץ), # להערות"""
+    entries = []
+    base = os.path.dirname(os.path.abspath(path))
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            name, sep, data_dir = line.partition('=')
+            if not sep:
+                name, data_dir = None, line
+            entries.append((name, os.path.join(base, os.path.expanduser(data_dir))))
+    return entries
+
+
+def find_datasets(patterns=(), manifest=None):
+    """שם -> תיקייה לכל dataset (לפי הסדר); שמות כפולים מקבלים את הנתיב היחסי"""
+    entries = read_manifest(manifest) if manifest else []
+    for pattern in patterns:
+        entries += [(None, path) for path in sorted(glob.glob(os.path.expanduser(pattern)))
+                    if os.path.isdir(path)]
+    datasets = {}
+    for name, data_dir in entries:
+        data_dir = os.path.normpath(data_dir)
+        if data_dir in datasets.values() or not dataset_files(data_dir):
+            continue
+        name = name or os.path.basename(data_dir)
+        if name in datasets:
+            name = os.path.relpath(data_dir).replace(os.sep, '_')
+        datasets[name] = data_dir
+    return datasets
+
+
+def chunk_size_for(datasets, memory_budget_mb, workers):
+    """גודל מנה כך שכל התהליכים יחד לא יעברו את תקציב הזיכרון"""
+    row_bytes = 1
+    for data_dir in datasets.values():
+        for fname in dataset_files(data_dir).values():
+            with open(os.path.join(data_dir, fname), 'rb') as f:
+                head = f.read(1 << 20)
+            row_bytes = max(row_bytes, len(head) / max(head.count(b'\n'), 1))
+    rows = memory_budget_mb * 2 ** 20 / max(workers, 1) / (row_bytes * MEMORY_FACTOR)
+    return int(np.clip(rows, MIN_CHUNK_SIZE, MAX_CHUNK_SIZE))
+
+
+def report_dataset(name, data_dir, output_dir, chunk_size, sample_size=SAMPLE_SIZE, sketch=False,
+                   formats=OUTPUT_FORMATS):
+    """דוח לתיקייה אחת במנות - מחזיר מה שצריך להשוואה (ספירות, היסטוגרמה, טביעות אצבע)"""
+    partials = {}
+    histogram = LengthHistogram()
+    fingerprints = []
+
+    def chunks(path):
+        # טביעות האצבע נאספות באותו מעבר על המנות
+        for chunk in pd.read_csv(path, index_col=0, chunksize=chunk_size):
+            fingerprints.append(np.unique(sequence_fingerprints(chunk['NucleotideSequence'])))
+            yield chunk
+
+    with stage(f"dataset:{name}") as span:
+        for split, fname in dataset_files(data_dir).items():
+            partials[fname] = summarize_file(chunks(ingest_split(data_dir, split, fname)[0]), sample_size, sketch)
+            histogram.merge(partials[fname]['histogram'])
+        summary = combine(partials)
+        span.rows = summary['total_samples']
+
+    buffer = io.StringIO()
+    with contextlib.redirect_stdout(buffer):
+        print_report(summary)
+    written = write_outputs(summary, buffer.getvalue(), os.path.join(output_dir, name), formats)
+    return {
+        'rows': summary['total_samples'],
+        'gene_type_counts': summary['gene_type_counts'],
+        'length': summary['length'],
+        'histogram': histogram.bins,
+        'fingerprints': np.unique(np.concatenate(fingerprints)) if fingerprints else np.empty(0, np.uint64),
+        'written': written,
+    }
+
+
+def _report_in_worker(*args):
+    return report_dataset(*args), instrumentation.drain()
+
+
+def class_drift(counts, reference):
+    """מרחק total variation בין התפלגויות ה-GeneType (0 = זהות, 1 = זרות)"""
+    p = counts / max(counts.sum(), 1)
+    q = reference.reindex(counts.index, fill_value=0)
+    q = q / max(q.sum(), 1)
+    return 0.5 * float((p - q).abs().sum())
+
+
+def length_drift(bins, reference):
+    """מרחק Kolmogorov-Smirnov בין התפלגויות האורכים (מתוך ההיסטוגרמות)"""
+    n = max(len(bins), len(reference))
+    cdf = [np.cumsum(np.pad(b, (0, n - len(b)))) / max(b.sum(), 1) for b in (bins, reference)]
+    return float(np.abs(cdf[0] - cdf[1]).max()) if n else 0.0
+
+
+def compare_datasets(results, reference=None):
+    """טבלת השוואה בין snapshots, טבלת אחוזי GeneType וטבלת חפיפה בין זוגות"""
+    names = list(results)
+    reference = reference or names[0]
+    ref = results[reference]
+    counts = pd.concat({name: r['gene_type_counts'] for name, r in results.items()}, axis=1).fillna(0)
+    ref_counts = counts[reference]
+
+    overlap = pd.DataFrame(0, index=names, columns=names, dtype='int64')
+    for i, a in enumerate(names):
+        for b in names[i:]:
+            shared = len(np.intersect1d(results[a]['fingerprints'], results[b]['fingerprints'], assume_unique=True))
+            overlap.loc[a, b] = overlap.loc[b, a] = shared
+
+    rows = {}
+    for name, r in results.items():
+        unique = len(r['fingerprints'])
+        union = unique + len(ref['fingerprints']) - overlap.loc[name, reference]
+        rows[name] = {
+            'rows': r['rows'],
+            'unique_sequences': unique,
+            'gene_types': int((counts[name] > 0).sum()),
+            'mean_length': r['length']['mean'],
+            'median_length': r['length']['median'],
+            'class_drift': class_drift(counts[name], ref_counts),
+            'length_drift': length_drift(r['histogram'], ref['histogram']),
+            'shared_with_reference': int(overlap.loc[name, reference]),
+            'jaccard_with_reference': overlap.loc[name, reference] / union if union else 0.0,
+        }
+    comparison = pd.DataFrame.from_dict(rows, orient='index').rename_axis('dataset')
+    shares = (counts / counts.sum().replace(0, 1) * 100).T.rename_axis('dataset')
+    return comparison, shares, overlap.rename_axis('dataset')
+
+
+def run_batch(datasets, output_dir, workers=1, memory_budget_mb=MEMORY_BUDGET_MB, sample_size=SAMPLE_SIZE,
+              sketch=False, formats=OUTPUT_FORMATS, reference=None):
+    """דוח לכל dataset במאגר תהליכים אחד, ואז טבלאות ההשוואה - מחזיר (תוצאות, שגיאות)"""
+    workers = max(1, min(workers, len(datasets)))
+    chunk_size = chunk_size_for(datasets, memory_budget_mb, workers)
+    jobs = [(name, data_dir, output_dir, chunk_size, sample_size, sketch, formats)
+            for name, data_dir in datasets.items()]
+    results = {}
+    errors = {}
+
+    def finished(name, result=None, error=None):
+        if error is not None:
+            errors[name] = error
+            print(f"❌ {name}: {error}")
+        else:
+            results[name] = result
+            print(f"✅ {name}: {result['rows']:,} rows -> {os.path.join(output_dir, name)}")
+
+    if workers <= 1:
+        for job in jobs:
+            try:
+                finished(job[0], report_dataset(*job))
+            except (OSError, ValueError, KeyError) as e:
+                finished(job[0], error=e)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(_report_in_worker, *job): job[0] for job in jobs}
+            for future in as_completed(futures):
+                try:
+                    result, events = future.result()
+                except (OSError, ValueError, KeyError) as e:
+                    finished(futures[future], error=e)
+                    continue
+                instrumentation.extend(events)
+                finished(futures[future], result)
+
+    # סדר התוצאות כמו סדר ה-datasets (לא סדר הסיום)
+    results = {name: results[name] for name in datasets if name in results}
+    if results:
+        with stage('compare', rows=sum(r['rows'] for r in results.values())):
+            if reference not in results:
+                reference = next(iter(results))
+            tables = compare_datasets(results, reference)
+        os.makedirs(output_dir, exist_ok=True)
+        for fname, table in zip(('comparison.csv', 'gene_type_shares.csv', 'overlap.csv'), tables):
+            table.to_csv(os.path.join(output_dir, fname))
+        results = {'reference': reference, 'tables': tables, 'datasets': results}
+    return results, errors
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Summary reports for many dataset snapshots in parallel")
+    parser.add_argument('patterns', nargs='*', metavar='GLOB', help="dataset directories (glob patterns)")
+    parser.add_argument('--manifest', help="file listing one [NAME=]DIR per line")
+    parser.add_argument('--output-dir', default='batch_reports', help="one sub-folder per dataset plus comparisons")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="datasets processed in parallel")
+    parser.add_argument('--memory-budget', type=int, default=MEMORY_BUDGET_MB, metavar='MB',
+                        help="approximate memory for all workers together (sets the chunk size)")
+    parser.add_argument('--reference', help="dataset the drift columns compare against (default: the first)")
+    parser.add_argument('--format', nargs='+', choices=OUTPUT_FORMATS, default=list(OUTPUT_FORMATS),
+                        dest='formats', help="per-dataset outputs")
+    parser.add_argument('--sample-size', type=int, default=SAMPLE_SIZE, help="rows shown in the sample section")
+    parser.add_argument('--sketch', action='store_true',
+                        help="approximate unique/value counts with HyperLogLog and Count-Min (constant memory)")
+    parser.add_argument('--trace', metavar='PATH',
+                        help="write per-stage timings (*.jsonl = JSON lines, otherwise Chrome trace)")
+    args = parser.parse_args(argv)
+    if not args.patterns and not args.manifest:
+        parser.error("give dataset directories (GLOB) and/or --manifest")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.trace:
+        instrumentation.enable(args.trace)
+    datasets = find_datasets(args.patterns, args.manifest)
+    if not datasets:
+        raise SystemExit("❌ No dataset directories with CSV files found")
+
+    print("=" * 60)
+    print(f"🧬 Batch Report: {len(datasets)} datasets")
+    print("=" * 60)
+    start = time.perf_counter()
+    results, errors = run_batch(datasets, args.output_dir, args.workers, args.memory_budget, args.sample_size,
+                                args.sketch, args.formats, args.reference)
+    print("-" * 60)
+    if results:
+        comparison = results['tables'][0]
+        print(f"📊 Comparison (reference: {results['reference']})")
+        print(comparison.to_string(float_format=lambda v: f"{v:,.3f}"))
+        print(f"✅ Saved comparison tables to: {args.output_dir}")
+    print(f"⏱️  {len(datasets)} datasets in {time.perf_counter() - start:.1f}s"
+          + (f" ({len(errors)} failed)" if errors else ""))
+    instrumentation.close()
+    if errors:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
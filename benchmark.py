@@ -0,0 +1,320 @@
+"""
+Pipeline Benchmark
+מדידת זמן וזיכרון לכל שלב בצינור, עם השוואה לתוצאות בסיס
+
+Synthetic datasets shaped like the real splits (same columns, GeneType mix,
+length spread, duplicated sequences across splits and commas inside
+``Description``) are generated at each requested size. A share of the rows
+is written malformed the way the raw files are - unquoted commas, broken
+quoting, stray quotes, bad sequence markers, missing fields - so ingest
+runs its repair and quarantine paths. Every stage runs on
+them: ingest, uncached and cached loading, ``seq_length``, composition,
+leakage, the feature table and each figure. Each stage is timed (best of
+``--repeat`` runs) and, in a separate pass, its peak traced allocation is
+measured with ``tracemalloc``. Results are saved as JSON; with
+``--baseline`` any stage slower than the baseline by more than
+``--threshold`` fails the run.
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+import warnings
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+DEFAULT_THRESHOLD = 0.25
+# הפרשים קטנים מזה (בשניות) נחשבים רעש ולא רגרסיה
+MIN_SECONDS = 0.05
+
+# חלוקה ושכיחויות כמו בנתונים האמיתיים
+SPLIT_SHARES = {'train': 0.64, 'test': 0.23, 'validation': 0.13}
+GENE_TYPE_SHARES = {
+    'PSEUDO': 0.46, 'BIOLOGICAL_REGION': 0.31, 'ncRNA': 0.11, 'snoRNA': 0.05, 'PROTEIN_CODING': 0.022,
+    'tRNA': 0.017, 'OTHER': 0.017, 'rRNA': 0.007, 'snRNA': 0.0046, 'scRNA': 0.0004,
+}
+PREFIXES = ['LOC', 'MIR', 'RNU', 'RPL', 'RN', 'RNA', 'RPS', 'OR', 'SNORD', 'TRNA']
+WORDS = ['ribosomal', 'protein', 'pseudogene', 'small', 'nucleolar', 'RNA', 'regulatory',
+         'region', 'enhancer', 'microRNA', 'processed', 'family', 'member']
+DUPLICATE_SHARE = 0.3
+# שורות גולמיות פגומות - חלקן מתוקנות ב-ingest וחלקן עוברות להסגר
+MALFORMED_SHARE = 0.02
+MALFORMED_KINDS = ['unquoted_comma', 'broken_quotes', 'stray_quotes', 'bad_sequence_marker', 'missing_fields',
+                   'bad_gene_id']
+
+
+def _synthetic_frame(n, rng, pool):
+    """טבלה סינתטית של n רשומות באותו מבנה כמו קבצי הסטים"""
+    shares = np.array(list(GENE_TYPE_SHARES.values()))
+    types = rng.choice(list(GENE_TYPE_SHARES), size=n, p=shares / shares.sum())
+    ids = rng.integers(100_000, 130_000_000, size=n)
+    prefixes = np.array(PREFIXES)[rng.integers(0, len(PREFIXES), size=n)]
+    symbols = [f"{p}{i}" for p, i in zip(prefixes, ids)]
+    words = np.array(WORDS)[rng.integers(0, len(WORDS), size=(n, 3))]
+    commas = rng.random(n) < 0.17
+    descriptions = [f"{a} {b}, {c}" if comma else f"{a} {b} {c}"
+                    for (a, b, c), comma in zip(words, commas)]
+
+    lengths = np.clip(rng.lognormal(5.6, 0.8, size=n), 3, 1000).astype(np.int64)
+    offsets = np.r_[0, np.cumsum(lengths)]
+    letters = np.frombuffer(b'ACGT', dtype=np.uint8)[rng.integers(0, 4, size=offsets[-1])]
+    n_runs = max(1, offsets[-1] // 5000)
+    letters[rng.integers(0, offsets[-1], size=n_runs)] = ord('N')
+    text = letters.tobytes().decode('ascii')
+    sequences = [f"<{text[a:b]}>" for a, b in zip(offsets[:-1], offsets[1:])]
+    duplicated = np.flatnonzero(rng.random(n) < DUPLICATE_SHARE)
+    for i, j in zip(duplicated, rng.integers(0, len(pool), size=len(duplicated))):
+        sequences[i] = pool[j]
+
+    return pd.DataFrame({
+        'NCBIGeneID': ids, 'Symbol': symbols, 'Description': descriptions, 'GeneType': types,
+        'GeneGroupMethod': 'NCBI Ortholog', 'NucleotideSequence': sequences,
+    })
+
+
+def _malformed_line(row, kind):
+    """שורה גולמית פגומה אחת, כמו השורות השבורות בקבצים האמיתיים"""
+    description = f'"{row.Description}"' if ',' in row.Description else row.Description
+    fields = [str(row.Index), str(row.NCBIGeneID), row.Symbol, description, row.GeneType, row.GeneGroupMethod,
+              row.NucleotideSequence]
+    if kind == 'unquoted_comma':
+        fields[3] = f"{row.Description}, processed pseudogene"
+    elif kind == 'broken_quotes':
+        # רווח לפני המרכאה - ה-reader לא מזהה ציטוט והשדה מתפצל
+        fields[3] = f' "{row.Description}, processed pseudogene"'
+    elif kind == 'stray_quotes':
+        fields[4] = f'{row.GeneType}"'
+    elif kind == 'bad_sequence_marker':
+        fields[6] = row.NucleotideSequence.rstrip('>')
+    elif kind == 'missing_fields':
+        del fields[5]
+    elif kind == 'bad_gene_id':
+        fields[1] = f"GeneID:{row.NCBIGeneID}"
+    return ','.join(fields)
+
+
+def _write_split(frame, path, rng):
+    """כתיבת סט סינתטי כ-CSV, עם חלק מהשורות פגומות"""
+    lines = frame.to_csv(lineterminator='\n').split('\n')
+    chosen = np.flatnonzero(rng.random(len(frame)) < MALFORMED_SHARE)
+    kinds = rng.choice(MALFORMED_KINDS, size=len(chosen))
+    for i, row, kind in zip(chosen, frame.iloc[chosen].itertuples(), kinds):
+        lines[i + 1] = _malformed_line(row, kind)
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        f.write('\n'.join(lines))
+
+
+def make_dataset(data_dir, n_rows, seed=42):
+    """כתיבת train/test/validation סינתטיים לתיקייה (אם עוד לא קיימים)"""
+    from data_loader import SPLIT_FILES
+
+    marker = os.path.join(data_dir, 'synthetic.json')
+    if os.path.exists(marker):
+        with open(marker) as f:
+            if json.load(f) == {'rows': n_rows, 'seed': seed, 'malformed': MALFORMED_SHARE}:
+                return data_dir
+    os.makedirs(data_dir, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    pool_rng = np.random.default_rng(seed + 1)
+    malformed_rng = np.random.default_rng(seed + 2)
+    pool = [f"<{''.join(pool_rng.choice(list('ACGT'), size=int(length)))}>"
+            for length in np.clip(pool_rng.lognormal(5.6, 0.8, size=2000), 3, 1000)]
+    for name, share in SPLIT_SHARES.items():
+        _write_split(_synthetic_frame(int(n_rows * share), rng, pool), os.path.join(data_dir, SPLIT_FILES[name]),
+                     malformed_rng)
+    with open(marker, 'w') as f:
+        json.dump({'rows': n_rows, 'seed': seed, 'malformed': MALFORMED_SHARE}, f)
+    return data_dir
+
+
+def pipeline_stages(data_dir, figures=True):
+    """רשימת השלבים: (שם, פונקציה להכנה שמחזירה פונקציה למדידה)
+
+    Each setup callable runs outside the measurement and returns the callable
+    that is timed, so earlier stages never leak into later numbers.
+    """
+    import matplotlib
+    matplotlib.use('Agg')
+    import create_visualizations as viz
+    from composition import composition_table
+    from data_loader import SPLIT_FILES, clear_cache, load_splits, sequence_lengths
+    from features import build_features
+    from ingest import ingest_csv
+    from packed_store import load_store
+
+    scratch = os.path.join(data_dir, 'scratch')
+    os.makedirs(scratch, exist_ok=True)
+    state = {}
+
+    def loaded():
+        if 'splits' not in state:
+            state['splits'] = load_splits(data_dir)
+        return state['splits']
+
+    def ingest():
+        def run():
+            for fname in SPLIT_FILES.values():
+                ingest_csv(os.path.join(data_dir, fname),
+                           os.path.join(scratch, fname), os.path.join(scratch, 'quarantine.csv'))
+        return run
+
+    def load_cold():
+        clear_cache(data_dir)
+        return lambda: load_splits(data_dir)
+
+    def load_warm():
+        loaded()
+        return lambda: load_splits(data_dir)
+
+    def seq_length():
+        sequences = loaded()[3]['NucleotideSequence']
+        return lambda: sequence_lengths(sequences)
+
+    def composition():
+        sequences = loaded()[3]['NucleotideSequence']
+        return lambda: composition_table(sequences)
+
+    def leakage():
+        train, test, val, _ = loaded()
+        return lambda: viz.split_leakage(train, test, val)
+
+    def features():
+        all_data = loaded()[3]
+        store = load_store(data_dir, all_data)
+        return lambda: build_features(all_data, store)
+
+    stages = [('ingest', ingest), ('load_splits_cold', load_cold), ('load_splits_warm', load_warm),
+              ('seq_length', seq_length), ('composition', composition), ('leakage', leakage),
+              ('features', features)]
+    if not figures:
+        return stages
+
+    def figure(name):
+        def setup():
+            if 'data' not in state:
+                # אותן טבלאות שהתרשימים מקבלים ב-create_visualizations (כולל quality)
+                state['data'] = viz.load_figure_data(data_dir, splits=loaded())
+                state['leakage'] = viz.split_leakage(*loaded()[:3])
+            return lambda: viz.render_figure(name, state['data'], scratch, state['leakage'])
+        return setup
+
+    return stages + [(f"plot:{name}", figure(name)) for name in viz.FIGURES]
+
+
+def measure(setup, repeat=1, memory=True):
+    """זמן (הטוב מבין repeat הרצות) ושיא הקצאות זיכרון של שלב"""
+    seconds = []
+    for _ in range(repeat):
+        run = setup()
+        gc.collect()
+        start = time.perf_counter()
+        run()
+        seconds.append(time.perf_counter() - start)
+    result = {'seconds': round(min(seconds), 4)}
+    if memory:
+        run = setup()
+        gc.collect()
+        tracemalloc.start()
+        run()
+        result['peak_mb'] = round(tracemalloc.get_traced_memory()[1] / 1e6, 2)
+        tracemalloc.stop()
+    return result
+
+
+def run_benchmarks(sizes, work_dir, repeat=1, memory=True, figures=True, seed=42, only=None):
+    """הרצת כל השלבים לכל גודל - {גודל: {שלב: תוצאה}}"""
+    results = {}
+    for n_rows in sizes:
+        data_dir = make_dataset(os.path.join(work_dir, f"rows_{n_rows}"), n_rows, seed)
+        print(f"📐 {n_rows:,} rows")
+        results[str(n_rows)] = {}
+        for name, setup in pipeline_stages(data_dir, figures):
+            if only and not any(name.startswith(sel) for sel in only):
+                continue
+            result = measure(setup, repeat, memory)
+            results[str(n_rows)][name] = result
+            peak = f"{result['peak_mb']:>9,.1f} MB" if 'peak_mb' in result else ''
+            print(f"   {name:<40} {result['seconds']:>9.3f}s {peak}")
+    return results
+
+
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD, min_seconds=MIN_SECONDS):
+    """השוואה לבסיס - רשימת (גודל, שלב, זמן בסיס, זמן נוכחי) לשלבים שהואטו"""
+    regressions = []
+    for size, stages in results.items():
+        for name, result in stages.items():
+            base = baseline.get(size, {}).get(name)
+            if base is None:
+                continue
+            if result['seconds'] > base['seconds'] * (1 + threshold) \
+                    and result['seconds'] - base['seconds'] > min_seconds:
+                regressions.append((size, name, base['seconds'], result['seconds']))
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the DNA data pipeline")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help="rows per synthetic dataset")
+    parser.add_argument('--work-dir', default=None, help="where synthetic datasets are kept (default: temp dir)")
+    parser.add_argument('--output', default='benchmark_results.json')
+    parser.add_argument('--baseline', default=None, help="results JSON to compare against")
+    parser.add_argument('--save-baseline', default=None, metavar='PATH', help="also write the results here")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help="allowed slowdown before a stage fails (0.25 = 25%%)")
+    parser.add_argument('--repeat', type=int, default=1)
+    parser.add_argument('--only', nargs='+', metavar='STAGE',
+                        help="run only stages whose name starts with these (e.g. leakage, plot:03)")
+    parser.add_argument('--no-memory', action='store_true', help="skip the tracemalloc pass")
+    parser.add_argument('--no-figures', action='store_true', help="skip the plot stages")
+    parser.add_argument('--seed', type=int, default=42)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix='dna_bench_')
+    warnings.simplefilter('ignore')
+    print("=" * 60)
+    print("⏱️  DNA Pipeline Benchmark")
+    print("=" * 60)
+    try:
+        results = run_benchmarks(args.sizes, work_dir, args.repeat, not args.no_memory,
+                                 not args.no_figures, args.seed, args.only)
+    finally:
+        if args.work_dir is None:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    report = {
+        'meta': {'python': sys.version.split()[0], 'platform': platform.platform(),
+                 'numpy': np.__version__, 'pandas': pd.__version__,
+                 'repeat': args.repeat, 'seed': args.seed},
+        'results': results,
+    }
+    for path in filter(None, [args.output, args.save_baseline]):
+        with open(path, 'w') as f:
+            json.dump(report, f, indent=2)
+    print(f"✅ Results saved to: {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)['results']
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"❌ {len(regressions)} stage(s) regressed by more than {args.threshold:.0%}:")
+            for size, name, before, after in regressions:
+                print(f"   {int(size):>10,} rows  {name:<40} {before:.3f}s → {after:.3f}s")
+            raise SystemExit(1)
+        print(f"✅ No regressions against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
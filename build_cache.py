@@ -0,0 +1,117 @@
+"""
+Incremental Build Cache
+מעקב תלויות לחישוב מחדש רק של חלקים שהקלט שלהם השתנה
+
+Every build target (a report partial, a figure) is recorded with a key: a
+hash of its code (plus the modules it depends on) and of the exact inputs it reads (file signatures or the
+content of the feature columns it uses). A target whose key is unchanged
+and whose outputs still exist is skipped.
+"""
+
+import hashlib
+import importlib
+import inspect
+import json
+import os
+import pickle
+
+import pandas as pd
+
+from data_loader import CACHE_DIR_NAME
+
+BUILD_DIR_NAME = 'build'
+
+
+def digest(*parts):
+    """hash יציב לרשימת רכיבים (מחרוזות, מספרים, מילונים, bytes)"""
+    h = hashlib.sha1()
+    for part in parts:
+        if isinstance(part, bytes):
+            h.update(part)
+        else:
+            h.update(json.dumps(part, sort_keys=True, default=str).encode())
+        h.update(b'\x00')
+    return h.hexdigest()
+
+
+def row_hashes(df, columns=None):
+    """hash לכל שורה (ללא האינדקס) - של חלקי טבלה אפשר לחשב בנפרד ולשרשר"""
+    if columns is not None:
+        df = df[list(columns)]
+    return pd.util.hash_pandas_object(df, index=False).to_numpy()
+
+
+def rows_digest(columns, hashes):
+    """hash של טבלה מתוך ה-hash של השורות שלה - כמו frame_digest"""
+    return digest(list(columns), len(hashes), hashes.tobytes())
+
+
+def frame_digest(df, columns=None):
+    """hash של תוכן עמודות (ללא האינדקס)"""
+    columns = list(df.columns) if columns is None else list(columns)
+    return rows_digest(columns, row_hashes(df, columns))
+
+
+def code_digest(func):
+    """hash של קוד הפונקציה - שינוי בקוד מבטל את המטמון"""
+    try:
+        return digest(inspect.getsource(func))
+    except (OSError, TypeError):
+        return digest(func.__module__, func.__qualname__)
+
+
+def module_digest(*names):
+    """hash של קוד המקור של מודולים שה-target תלוי בהם (לפי שם)
+
+    ``code_digest`` covers only the target's own function; helpers it calls in
+    other modules (accumulators, grouped statistics, ...) are covered by
+    listing their modules here.
+    """
+    return digest(*[inspect.getsource(importlib.import_module(name)) for name in names])
+
+
+class BuildCache:
+    """רישום מפתחות ותוצרים לכל target, נשמר ב-.dna_cache/build"""
+
+    def __init__(self, data_dir):
+        self.root = os.path.join(data_dir, CACHE_DIR_NAME, BUILD_DIR_NAME)
+        self.index_path = os.path.join(self.root, 'index.json')
+        try:
+            with open(self.index_path) as f:
+                self.index = json.load(f)
+        except (OSError, ValueError):
+            self.index = {}
+
+    def is_fresh(self, target, key, outputs=()):
+        """האם ה-target עדכני: אותו מפתח וכל התוצרים קיימים"""
+        entry = self.index.get(target)
+        return (entry is not None and entry['key'] == key
+                and all(os.path.exists(path) for path in outputs))
+
+    def record(self, target, key, outputs=()):
+        self.index[target] = {'key': key, 'outputs': list(outputs)}
+
+    def _object_path(self, target):
+        return os.path.join(self.root, hashlib.sha1(target.encode()).hexdigest() + '.pkl')
+
+    def load_object(self, target, key):
+        """תוצאת ביניים שמורה (pickle) - None אם המפתח השתנה"""
+        path = self._object_path(target)
+        if not self.is_fresh(target, key, [path]):
+            return None
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+
+    def store_object(self, target, key, obj):
+        os.makedirs(self.root, exist_ok=True)
+        path = self._object_path(target)
+        with open(path + '.tmp', 'wb') as f:
+            pickle.dump(obj, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(path + '.tmp', path)
+        self.record(target, key, [path])
+
+    def save(self):
+        os.makedirs(self.root, exist_ok=True)
+        with open(self.index_path + '.tmp', 'w') as f:
+            json.dump(self.index, f, indent=2)
+        os.replace(self.index_path + '.tmp', self.index_path)
@@ -0,0 +1,79 @@
+"""
+Nucleotide Composition Engine
+חישוב הרכב נוקלאוטידים לכל הרצפים במעבר אחד
+
+All sequences are packed into one concatenated uint8 buffer plus an offsets
+array; base counts per record are then a single ``bincount`` over
+``record_id * N_CLASSES + base_code``.
+"""
+
+import numpy as np
+import pandas as pd
+
+# קודי בסיסים: A, C, G, T, N, כל סימן אחר
+BASES = ['A', 'C', 'G', 'T', 'N', 'other']
+N_CLASSES = len(BASES)
+OTHER = N_CLASSES - 1
+
+# טבלת המרה בית -> קוד בסיס (לא תלוי רישיות)
+BASE_LUT = np.full(256, OTHER, dtype=np.uint8)
+for _code, _base in enumerate('ACGTN'):
+    BASE_LUT[ord(_base)] = _code
+    BASE_LUT[ord(_base.lower())] = _code
+
+
+def clean_sequences(sequences):
+    """הסרת סימוני < ו-> ורווחים (ערך חסר -> מחרוזת ריקה)"""
+    return sequences.fillna('').astype(str).str.strip('<>').str.strip()
+
+
+def encode_sequences(sequences):
+    """המרת הרצפים לבאפר uint8 אחד ומערך offsets
+
+    Returns ``(buffer, offsets)`` where record ``i`` occupies
+    ``buffer[offsets[i]:offsets[i + 1]]``. Non-ASCII symbols become ``?``.
+    """
+    cleaned = clean_sequences(pd.Series(sequences))
+    lengths = cleaned.str.len().to_numpy(dtype=np.int64)
+    offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    buffer = np.frombuffer(''.join(cleaned.tolist()).encode('ascii', 'replace'), dtype=np.uint8)
+    return buffer, offsets
+
+
+def base_counts(buffer, offsets):
+    """ספירת A/C/G/T/N/אחר לכל רשומה - מחזיר מערך (n, 6)"""
+    return count_bases(BASE_LUT[buffer], offsets)
+
+
+def count_bases(bases, offsets):
+    """כמו base_counts, אבל על קודי בסיסים (0-5) שכבר פוענחו"""
+    n = len(offsets) - 1
+    lengths = np.diff(offsets)
+    record_ids = np.repeat(np.arange(n, dtype=np.int64), lengths)
+    keys = record_ids * N_CLASSES + bases
+    return np.bincount(keys, minlength=n * N_CLASSES).reshape(n, N_CLASSES)
+
+
+def composition_from_counts(counts, lengths, index=None):
+    """טבלת הרכב מספירות בסיסים (n, 6) ואורכים - משותף למחרוזות ול-store הארוז"""
+    table = pd.DataFrame(counts, columns=BASES, index=index)
+    table['length'] = lengths
+
+    scale = np.divide(100.0, lengths, out=np.zeros(len(lengths)), where=lengths > 0)
+    for base in 'ACGT':
+        table[f'{base}_pct'] = table[base].to_numpy() * scale
+    table['gc_content'] = (table['G'].to_numpy() + table['C'].to_numpy()) * scale
+    return table
+
+
+def composition_table(sequences):
+    """טבלת הרכב לכל רשומה
+
+    Columns: ``A, C, G, T, N, other`` (counts), ``length`` and the
+    percentages ``A_pct, C_pct, G_pct, T_pct`` and ``gc_content``, all relative
+    to the full cleaned length (0 for empty sequences).
+    """
+    sequences = pd.Series(sequences)
+    buffer, offsets = encode_sequences(sequences)
+    return composition_from_counts(base_counts(buffer, offsets), np.diff(offsets), sequences.index)
@@ -3,55 +3,63 @@ DNA Dataset Visualization Generator
 יוצר ויזואליזציות להבנת הנתונים
 """
 
-import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
+import argparse
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
 import numpy as np
 from collections import Counter
 import os
 
-# הגדרות עיצוב
-plt.style.use('seaborn-v0_8-whitegrid')
-plt.rcParams['figure.figsize'] = (12, 8)
-plt.rcParams['font.size'] = 12
-plt.rcParams['axes.titlesize'] = 14
-plt.rcParams['axes.labelsize'] = 12
+from build_cache import BuildCache, code_digest, digest, frame_digest, module_digest
+from data_loader import DATA_DIR, ingest_table, load_splits
+from features import load_features
+from grouped_stats import grouped_histogram, grouped_stats
+from ingest import GENE_TYPES
+import instrumentation
+from instrumentation import stage
+from leakage import exact_overlap, sequence_fingerprints
+from quality import load_quality
+
+# matplotlib/seaborn נטענים רק כשמציירים (ראו _setup_plotting)
+plt = None
+sns = None
+
+def _setup_plotting(backend=None):
+    """ייבוא matplotlib/seaborn והגדרות העיצוב - בפעם הראשונה שצריך אותם"""
+    global plt, sns
+    if plt is not None:
+        if backend:
+            plt.switch_backend(backend)
+        return
+    import matplotlib
+    if backend:
+        matplotlib.use(backend)
+    import matplotlib.pyplot as pyplot
+    import seaborn
+
+    # הגדרות עיצוב
+    pyplot.style.use('seaborn-v0_8-whitegrid')
+    pyplot.rcParams['figure.figsize'] = (12, 8)
+    pyplot.rcParams['font.size'] = 12
+    pyplot.rcParams['axes.titlesize'] = 14
+    pyplot.rcParams['axes.labelsize'] = 12
+    plt, sns = pyplot, seaborn
 
 # צבעים
 COLORS = ['#2E86AB', '#A23B72', '#F18F01', '#C73E1D', '#3B1F2B', 
           '#95C623', '#5C4D7D', '#E8E8E8', '#FF6B6B', '#4ECDC4']
 
-def load_data():
+def load_data(data_dir=None):
     """טעינת הנתונים"""
-    base_path = "/Users/ido.abramovitch/Documents/dna project"
-    
-    train = pd.read_csv(f"{base_path}/train.csv", index_col=0)
-    test = pd.read_csv(f"{base_path}/test.csv", index_col=0)
-    val = pd.read_csv(f"{base_path}/validation.csv", index_col=0)
-    
-    # הוספת עמודת מקור
-    train['source'] = 'train'
-    test['source'] = 'test'
-    val['source'] = 'validation'
-    
-    # איחוד
-    all_data = pd.concat([train, test, val], ignore_index=True)
-    
-    # חישוב אורך רצף
-    all_data['seq_length'] = all_data['NucleotideSequence'].apply(
-        lambda x: len(str(x).strip('<>'))
-    )
-    
-    return train, test, val, all_data
+    return load_splits(data_dir or DATA_DIR)
 
-def plot_gene_type_distribution(all_data, save_path):
+def plot_gene_type_distribution(features, save_path):
     """1. התפלגות סוגי גנים"""
     fig, axes = plt.subplots(1, 2, figsize=(16, 7))
     
     # ספירה
-    valid_types = ['PSEUDO', 'BIOLOGICAL_REGION', 'ncRNA', 'snoRNA', 
-                   'PROTEIN_CODING', 'tRNA', 'OTHER', 'rRNA', 'snRNA', 'scRNA']
-    gene_counts = all_data[all_data['GeneType'].isin(valid_types)]['GeneType'].value_counts()
+    gene_counts = features[features['GeneType'].isin(GENE_TYPES)]['GeneType'].value_counts()
     
     # גרף עמודות
     ax1 = axes[0]
@@ -72,15 +80,15 @@ def plot_gene_type_distribution(all_data, save_path):
     plt.close()
     print("✅ Created: 01_gene_type_distribution.png")
 
-def plot_sequence_length_distribution(all_data, save_path):
+def plot_sequence_length_distribution(features, save_path):
     """2. התפלגות אורכי רצפים"""
     fig, axes = plt.subplots(2, 2, figsize=(16, 12))
     
     # היסטוגרמה כללית
     ax1 = axes[0, 0]
-    ax1.hist(all_data['seq_length'], bins=50, color=COLORS[0], edgecolor='white', alpha=0.8)
-    ax1.axvline(all_data['seq_length'].mean(), color='red', linestyle='--', label=f"Mean: {all_data['seq_length'].mean():.0f}")
-    ax1.axvline(all_data['seq_length'].median(), color='green', linestyle='--', label=f"Median: {all_data['seq_length'].median():.0f}")
+    ax1.hist(features['seq_length'], bins=50, color=COLORS[0], edgecolor='white', alpha=0.8)
+    ax1.axvline(features['seq_length'].mean(), color='red', linestyle='--', label=f"Mean: {features['seq_length'].mean():.0f}")
+    ax1.axvline(features['seq_length'].median(), color='green', linestyle='--', label=f"Median: {features['seq_length'].median():.0f}")
     ax1.set_xlabel('Sequence Length')
     ax1.set_ylabel('Count')
     ax1.set_title('Overall Sequence Length Distribution')
@@ -89,7 +97,7 @@ def plot_sequence_length_distribution(all_data, save_path):
     # Box plot לפי סוג גן
     ax2 = axes[0, 1]
     valid_types = ['PSEUDO', 'BIOLOGICAL_REGION', 'ncRNA', 'PROTEIN_CODING', 'tRNA', 'snoRNA']
-    data_filtered = all_data[all_data['GeneType'].isin(valid_types)]
+    data_filtered = features[features['GeneType'].isin(valid_types)]
     sns.boxplot(data=data_filtered, x='GeneType', y='seq_length', ax=ax2, palette=COLORS)
     ax2.set_xticklabels(ax2.get_xticklabels(), rotation=45, ha='right')
     ax2.set_title('Sequence Length by Gene Type')
@@ -97,9 +105,10 @@ def plot_sequence_length_distribution(all_data, save_path):
     
     # היסטוגרמה לפי סוג
     ax3 = axes[1, 0]
+    counts, edges, _ = grouped_histogram(features['seq_length'], features['GeneType'], bins=30,
+                                         group_order=valid_types[:4])
     for i, gt in enumerate(valid_types[:4]):
-        data = all_data[all_data['GeneType'] == gt]['seq_length']
-        ax3.hist(data, bins=30, alpha=0.5, label=gt, color=COLORS[i])
+        ax3.hist(edges[i][:-1], bins=edges[i], weights=counts[i], alpha=0.5, label=gt, color=COLORS[i])
     ax3.set_xlabel('Sequence Length')
     ax3.set_ylabel('Count')
     ax3.set_title('Sequence Length Distribution by Gene Type')
@@ -107,18 +116,9 @@ def plot_sequence_length_distribution(all_data, save_path):
     
     # סטטיסטיקות
     ax4 = axes[1, 1]
-    stats_data = []
-    for gt in valid_types:
-        lengths = all_data[all_data['GeneType'] == gt]['seq_length']
-        if len(lengths) > 0:
-            stats_data.append({
-                'GeneType': gt,
-                'Mean': lengths.mean(),
-                'Median': lengths.median(),
-                'Std': lengths.std()
-            })
-    
-    stats_df = pd.DataFrame(stats_data)
+    stats_df = grouped_stats(features['seq_length'], features['GeneType'], group_order=valid_types)
+    stats_df = (stats_df.rename(columns={'mean': 'Mean', 'median': 'Median', 'std': 'Std'})
+                .rename_axis('GeneType').reset_index())
     x = np.arange(len(stats_df))
     width = 0.35
     
@@ -137,7 +137,22 @@ def plot_sequence_length_distribution(all_data, save_path):
     plt.close()
     print("✅ Created: 02_sequence_length_distribution.png")
 
-def plot_data_split_analysis(train, test, val, save_path):
+def split_leakage(train, test, val):
+    """מספר הרצפים המשותפים לכל זוג סטים (לפי טביעות אצבע של 64 ביט)
+
+    Besides the ``(split_a, split_b)`` counts, ``'test_in_train'`` holds the
+    share of test records whose sequence also appears in train.
+    """
+    fingerprints = {
+        'train': sequence_fingerprints(train['NucleotideSequence']),
+        'test': sequence_fingerprints(test['NucleotideSequence']),
+        'validation': sequence_fingerprints(val['NucleotideSequence']),
+    }
+    leakage = exact_overlap(fingerprints)
+    leakage['test_in_train'] = float(np.isin(fingerprints['test'], fingerprints['train']).mean()) if len(test) else 0.0
+    return leakage
+
+def plot_data_split_analysis(train, test, val, save_path, leakage=None):
     """3. ניתוח חלוקת הנתונים"""
     fig, axes = plt.subplots(2, 2, figsize=(16, 12))
     
@@ -178,14 +193,13 @@ def plot_data_split_analysis(train, test, val, save_path):
     
     # Data Leakage Visualization
     ax4 = axes[1, 1]
-    train_seqs = set(train['NucleotideSequence'])
-    test_seqs = set(test['NucleotideSequence'])
-    val_seqs = set(val['NucleotideSequence'])
+    if leakage is None:
+        leakage = split_leakage(train, test, val)
     
     leakage_data = {
-        'Train∩Test': len(train_seqs & test_seqs),
-        'Train∩Val': len(train_seqs & val_seqs),
-        'Test∩Val': len(test_seqs & val_seqs),
+        'Train∩Test': leakage[('train', 'test')],
+        'Train∩Val': leakage[('train', 'validation')],
+        'Test∩Val': leakage[('test', 'validation')],
     }
     
     bars = ax4.bar(leakage_data.keys(), leakage_data.values(), color=['#FF6B6B', '#FF6B6B', '#FFE66D'])
@@ -200,27 +214,13 @@ def plot_data_split_analysis(train, test, val, save_path):
     plt.close()
     print("✅ Created: 03_data_split_analysis.png")
 
-def plot_nucleotide_composition(all_data, save_path):
+def plot_nucleotide_composition(features, save_path):
     """4. הרכב נוקלאוטידים"""
     fig, axes = plt.subplots(2, 2, figsize=(16, 12))
     
-    # חישוב הרכב
-    def calc_composition(seq):
-        seq = str(seq).strip('<>').upper()
-        total = len(seq)
-        if total == 0:
-            return {'A': 0, 'T': 0, 'G': 0, 'C': 0, 'GC': 0}
-        return {
-            'A': seq.count('A') / total * 100,
-            'T': seq.count('T') / total * 100,
-            'G': seq.count('G') / total * 100,
-            'C': seq.count('C') / total * 100,
-            'GC': (seq.count('G') + seq.count('C')) / total * 100
-        }
-    
-    # מדגם לחישוב מהיר
-    sample = all_data.sample(min(5000, len(all_data)), random_state=42)
-    compositions = sample['NucleotideSequence'].apply(calc_composition).apply(pd.Series)
+    # הרכב מחושב מראש בטבלת הפיצ'רים (לכל הנתונים)
+    compositions = features[['A_pct', 'T_pct', 'G_pct', 'C_pct', 'gc_content']].astype('float64')
+    compositions.columns = ['A', 'T', 'G', 'C', 'GC']
     
     # התפלגות GC Content
     ax1 = axes[0, 0]
@@ -245,8 +245,8 @@ def plot_nucleotide_composition(all_data, save_path):
     # GC Content לפי סוג גן
     ax3 = axes[1, 0]
     valid_types = ['PSEUDO', 'BIOLOGICAL_REGION', 'ncRNA', 'PROTEIN_CODING', 'tRNA', 'snoRNA']
-    sample['GC'] = compositions['GC']
-    data_filtered = sample[sample['GeneType'].isin(valid_types)]
+    data_filtered = features[['GeneType']].assign(GC=compositions['GC'])
+    data_filtered = data_filtered[data_filtered['GeneType'].isin(valid_types)]
     
     gc_by_type = data_filtered.groupby('GeneType')['GC'].mean().sort_values(ascending=False)
     bars = ax3.barh(gc_by_type.index, gc_by_type.values, color=COLORS[:len(gc_by_type)])
@@ -268,13 +268,11 @@ def plot_nucleotide_composition(all_data, save_path):
     plt.close()
     print("✅ Created: 04_nucleotide_composition.png")
 
-def plot_class_imbalance(all_data, save_path):
+def plot_class_imbalance(features, save_path):
     """5. ויזואליזציית חוסר איזון"""
     fig, axes = plt.subplots(1, 2, figsize=(16, 7))
     
-    valid_types = ['PSEUDO', 'BIOLOGICAL_REGION', 'ncRNA', 'snoRNA', 
-                   'PROTEIN_CODING', 'tRNA', 'OTHER', 'rRNA', 'snRNA', 'scRNA']
-    gene_counts = all_data[all_data['GeneType'].isin(valid_types)]['GeneType'].value_counts()
+    gene_counts = features[features['GeneType'].isin(GENE_TYPES)]['GeneType'].value_counts()
     
     # Log scale
     ax1 = axes[0]
@@ -299,24 +297,21 @@ def plot_class_imbalance(all_data, save_path):
     plt.close()
     print("✅ Created: 05_class_imbalance.png")
 
-def plot_symbol_patterns(all_data, save_path):
+def plot_symbol_patterns(features, save_path):
     """6. דפוסים ב-Symbol"""
     fig, axes = plt.subplots(2, 2, figsize=(16, 12))
     
-    # חילוץ prefix
-    all_data['symbol_prefix'] = all_data['Symbol'].str.extract(r'^([A-Z]+)', expand=False)
-    
     # Top prefixes
     ax1 = axes[0, 0]
-    top_prefixes = all_data['symbol_prefix'].value_counts().head(15)
+    top_prefixes = features['symbol_prefix'].value_counts().head(15)
     bars = ax1.barh(top_prefixes.index[::-1], top_prefixes.values[::-1], color=COLORS[0])
     ax1.set_xlabel('Count')
     ax1.set_title('Top 15 Symbol Prefixes')
     
     # Prefix לפי סוג גן
     ax2 = axes[0, 1]
-    prefix_type = all_data.groupby(['symbol_prefix', 'GeneType']).size().unstack(fill_value=0)
-    top_5_prefixes = all_data['symbol_prefix'].value_counts().head(5).index
+    prefix_type = features.groupby(['symbol_prefix', 'GeneType'], observed=True).size().unstack(fill_value=0)
+    top_5_prefixes = features['symbol_prefix'].value_counts().head(5).index
     valid_types = ['PSEUDO', 'BIOLOGICAL_REGION', 'ncRNA', 'PROTEIN_CODING']
     
     subset = prefix_type.loc[top_5_prefixes, valid_types] if all(t in prefix_type.columns for t in valid_types) else prefix_type.loc[top_5_prefixes].iloc[:, :4]
@@ -329,8 +324,7 @@ def plot_symbol_patterns(all_data, save_path):
     
     # סיומת P
     ax3 = axes[1, 0]
-    all_data['ends_with_P'] = all_data['Symbol'].str.endswith('P')
-    p_suffix_types = all_data[all_data['ends_with_P']]['GeneType'].value_counts().head(5)
+    p_suffix_types = features[features['ends_with_P']]['GeneType'].value_counts().head(5)
     bars = ax3.bar(p_suffix_types.index, p_suffix_types.values, color=COLORS[1])
     ax3.set_title('Gene Types for Symbols Ending with "P"')
     ax3.set_ylabel('Count')
@@ -338,8 +332,7 @@ def plot_symbol_patterns(all_data, save_path):
     
     # אורך Symbol
     ax4 = axes[1, 1]
-    all_data['symbol_length'] = all_data['Symbol'].str.len()
-    ax4.hist(all_data['symbol_length'], bins=30, color=COLORS[2], edgecolor='white')
+    ax4.hist(features['symbol_length'], bins=30, color=COLORS[2], edgecolor='white')
     ax4.set_xlabel('Symbol Length')
     ax4.set_ylabel('Count')
     ax4.set_title('Symbol Length Distribution')
@@ -350,30 +343,13 @@ def plot_symbol_patterns(all_data, save_path):
     plt.close()
     print("✅ Created: 06_symbol_patterns.png")
 
-def plot_correlation_heatmap(all_data, save_path):
+def plot_correlation_heatmap(features, save_path):
     """7. מפת קורלציות"""
     fig, ax = plt.subplots(figsize=(10, 8))
     
-    # יצירת פיצ'רים מספריים
-    all_data['seq_length'] = all_data['NucleotideSequence'].apply(lambda x: len(str(x).strip('<>')))
-    all_data['symbol_length'] = all_data['Symbol'].str.len()
-    all_data['desc_length'] = all_data['Description'].str.len()
-    all_data['ends_with_P'] = all_data['Symbol'].str.endswith('P').astype(int)
-    all_data['starts_with_LOC'] = all_data['Symbol'].str.startswith('LOC').astype(int)
-    
-    # חישוב GC
-    def gc_content(seq):
-        seq = str(seq).strip('<>').upper()
-        if len(seq) == 0:
-            return 0
-        return (seq.count('G') + seq.count('C')) / len(seq) * 100
-    
-    sample = all_data.sample(min(5000, len(all_data)), random_state=42)
-    sample['gc_content'] = sample['NucleotideSequence'].apply(gc_content)
-    
     # מטריצת קורלציה
     numeric_cols = ['seq_length', 'symbol_length', 'desc_length', 'ends_with_P', 'starts_with_LOC', 'gc_content']
-    corr_matrix = sample[numeric_cols].corr()
+    corr_matrix = features[numeric_cols].astype('float64').corr()
     
     sns.heatmap(corr_matrix, annot=True, cmap='RdBu_r', center=0, 
                 square=True, ax=ax, fmt='.2f', vmin=-1, vmax=1)
@@ -384,95 +360,211 @@ def plot_correlation_heatmap(all_data, save_path):
     plt.close()
     print("✅ Created: 07_correlation_heatmap.png")
 
-def plot_summary_dashboard(all_data, train, test, val, save_path):
-    """8. דשבורד סיכום"""
-    fig = plt.figure(figsize=(20, 14))
-    
-    # Grid
-    gs = fig.add_gridspec(3, 4, hspace=0.3, wspace=0.3)
-    
-    # 1. סה"כ דגימות
-    ax1 = fig.add_subplot(gs[0, 0])
-    ax1.text(0.5, 0.5, f"{len(all_data):,}", fontsize=40, ha='center', va='center', fontweight='bold', color=COLORS[0])
-    ax1.text(0.5, 0.2, "Total Samples", fontsize=14, ha='center', va='center')
-    ax1.axis('off')
-    ax1.set_title('📊 Dataset Size', fontsize=12)
-    
-    # 2. מספר קטגוריות
-    ax2 = fig.add_subplot(gs[0, 1])
-    valid_types = ['PSEUDO', 'BIOLOGICAL_REGION', 'ncRNA', 'snoRNA', 'PROTEIN_CODING', 'tRNA', 'OTHER', 'rRNA', 'snRNA', 'scRNA']
-    n_classes = len(all_data[all_data['GeneType'].isin(valid_types)]['GeneType'].unique())
-    ax2.text(0.5, 0.5, f"{n_classes}", fontsize=40, ha='center', va='center', fontweight='bold', color=COLORS[1])
-    ax2.text(0.5, 0.2, "Gene Types", fontsize=14, ha='center', va='center')
-    ax2.axis('off')
-    ax2.set_title('🏷️ Labels', fontsize=12)
-    
-    # 3. Data Leakage
-    ax3 = fig.add_subplot(gs[0, 2])
-    train_seqs = set(train['NucleotideSequence'])
-    test_seqs = set(test['NucleotideSequence'])
-    leakage = len(train_seqs & test_seqs)
-    ax3.text(0.5, 0.5, f"{leakage:,}", fontsize=40, ha='center', va='center', fontweight='bold', color='#FF6B6B')
-    ax3.text(0.5, 0.2, "Leaked Sequences", fontsize=14, ha='center', va='center')
-    ax3.axis('off')
-    ax3.set_title('⚠️ Data Leakage', fontsize=12)
-    
-    # 4. אורך רצף ממוצע
-    ax4 = fig.add_subplot(gs[0, 3])
-    mean_len = all_data['seq_length'].mean()
-    ax4.text(0.5, 0.5, f"{mean_len:.0f}", fontsize=40, ha='center', va='center', fontweight='bold', color=COLORS[2])
-    ax4.text(0.5, 0.2, "Avg Sequence Length", fontsize=14, ha='center', va='center')
-    ax4.axis('off')
-    ax4.set_title('📏 Sequences', fontsize=12)
-    
-    # 5. התפלגות סוגים
-    ax5 = fig.add_subplot(gs[1, :2])
-    gene_counts = all_data[all_data['GeneType'].isin(valid_types)]['GeneType'].value_counts()
-    bars = ax5.barh(gene_counts.index, gene_counts.values, color=COLORS[:len(gene_counts)])
-    ax5.set_xlabel('Count')
-    ax5.set_title('Gene Type Distribution')
-    ax5.bar_label(bars, fmt='%d', padding=3)
-    
-    # 6. אורכי רצפים
-    ax6 = fig.add_subplot(gs[1, 2:])
-    ax6.hist(all_data['seq_length'], bins=40, color=COLORS[0], edgecolor='white', alpha=0.8)
-    ax6.axvline(mean_len, color='red', linestyle='--', label=f'Mean: {mean_len:.0f}')
-    ax6.set_xlabel('Sequence Length')
-    ax6.set_ylabel('Count')
-    ax6.set_title('Sequence Length Distribution')
-    ax6.legend()
-    
-    # 7. חלוקת הנתונים
-    ax7 = fig.add_subplot(gs[2, :2])
-    sizes = [len(train), len(test), len(val)]
-    labels = ['Train\n64%', 'Test\n23%', 'Validation\n13%']
-    ax7.pie(sizes, labels=labels, colors=COLORS[:3], autopct='%1.0f%%', explode=[0.02]*3)
-    ax7.set_title('Data Split')
-    
-    # 8. בעיות שזוהו
-    ax8 = fig.add_subplot(gs[2, 2:])
-    issues = [
-        "⚠️ Data Leakage: 87% of test set in train!",
-        "⚠️ 17% records with parsing issues",
-        "⚠️ Class imbalance: 2,325:1 ratio",
-        "⚠️ Sequences as short as 3 nucleotides",
-        "✅ No missing values detected"
-    ]
-    for i, issue in enumerate(issues):
-        color = '#FF6B6B' if '⚠️' in issue else '#95C623'
-        ax8.text(0.05, 0.85 - i*0.18, issue, fontsize=11, va='top', 
-                color=color, fontweight='bold')
-    ax8.axis('off')
-    ax8.set_title('🔍 Issues Detected', fontsize=12)
-    
-    plt.suptitle('🧬 DNA Dataset Summary Dashboard', fontsize=20, fontweight='bold', y=0.98)
-    plt.savefig(f"{save_path}/08_summary_dashboard.png", dpi=150, bbox_inches='tight')
-    plt.close()
+def plot_summary_dashboard(features, train, test, val, ingest, quality, save_path, leakage=None):
+    """8. דשבורד סיכום (ראו dashboard.py - סיכום מחושב ותבנית שנבנית פעם אחת לתהליך)"""
+    from dashboard import dashboard_summary, render_dashboard
+    summary = dashboard_summary(features, train, test, val, ingest, quality, leakage)
+    render_dashboard(summary, save_path)
     print("✅ Created: 08_summary_dashboard.png")
 
-def main():
+# שם תרשים -> (פונקציה, הנתונים שהיא מקבלת, האם מקבלת את נתוני הזליגה)
+FIGURES = {
+    '01_gene_type_distribution': (plot_gene_type_distribution, ('features',), False),
+    '02_sequence_length_distribution': (plot_sequence_length_distribution, ('features',), False),
+    '03_data_split_analysis': (plot_data_split_analysis, ('train', 'test', 'val'), True),
+    '04_nucleotide_composition': (plot_nucleotide_composition, ('features',), False),
+    '05_class_imbalance': (plot_class_imbalance, ('features',), False),
+    '06_symbol_patterns': (plot_symbol_patterns, ('features',), False),
+    '07_correlation_heatmap': (plot_correlation_heatmap, ('features',), False),
+    '08_summary_dashboard': (plot_summary_dashboard, ('features', 'train', 'test', 'val', 'ingest', 'quality'),
+                             True),
+}
+
+# שם תרשים -> העמודות שהוא קורא מכל טבלת קלט (לבניה מחדש רק כשהן משתנות)
+FIGURE_INPUTS = {
+    '01_gene_type_distribution': {'features': ['GeneType']},
+    '02_sequence_length_distribution': {'features': ['GeneType', 'seq_length']},
+    '03_data_split_analysis': {split: ['GeneType', 'NucleotideSequence'] for split in ('train', 'test', 'val')},
+    '04_nucleotide_composition': {'features': ['GeneType', 'A_pct', 'C_pct', 'G_pct', 'T_pct', 'gc_content']},
+    '05_class_imbalance': {'features': ['GeneType']},
+    '06_symbol_patterns': {'features': ['GeneType', 'symbol_prefix', 'ends_with_P', 'symbol_length']},
+    '07_correlation_heatmap': {'features': ['seq_length', 'symbol_length', 'desc_length', 'ends_with_P',
+                                            'starts_with_LOC', 'gc_content']},
+    '08_summary_dashboard': {'features': ['GeneType', 'seq_length'],
+                             'train': ['NucleotideSequence'], 'test': ['NucleotideSequence'],
+                             'val': ['NucleotideSequence'],
+                             'ingest': ['rows', 'repaired', 'quarantined'],
+                             'quality': ['length', 'flagged', 'low_complexity', 'homopolymer']},
+}
+
+# מודולים שהתרשים קורא להם (מעבר לפונקציית הציור עצמה) - גם שינוי בהם מבטל את המטמון
+FIGURE_MODULES = {
+    '02_sequence_length_distribution': ('grouped_stats',),
+    '03_data_split_analysis': ('leakage',),
+    '08_summary_dashboard': ('dashboard', 'grouped_stats', 'leakage', 'quality'),
+}
+
+def figure_keys(names, data, column_digests=None):
+    """מפתח לכל תרשים: hash של הקוד ושל עמודות הקלט שהוא קורא
+
+    ``column_digests`` maps ``(table, column)`` to an already known
+    ``frame_digest`` (e.g. assembled per split by watch.py); only the other
+    input columns are hashed here.
+    """
+    _setup_plotting()
+    column_digests = dict(column_digests or {})
+    keys = {}
+    for name in names:
+        func = FIGURES[name][0]
+        # העיצוב המשותף (צבעים, rcParams) וחישוב הזליגה הם חלק מהקוד של כל תרשים
+        parts = [code_digest(func), code_digest(_setup_plotting), COLORS, plt.rcParams['figure.dpi'],
+                 module_digest(*FIGURE_MODULES.get(name, ()))]
+        if FIGURES[name][2]:
+            parts.append(code_digest(split_leakage))
+        for table, columns in FIGURE_INPUTS[name].items():
+            for col in columns:
+                if (table, col) not in column_digests:
+                    column_digests[(table, col)] = frame_digest(data[table], [col])
+                parts.append([table, col, column_digests[(table, col)]])
+        keys[name] = digest(*parts)
+    return keys
+
+def _figure_matches(name, selector):
+    """התאמה לפי שם מלא, מספר ('03') או שם ללא מספר ('data_split_analysis')"""
+    number, _, short = name.partition('_')
+    return selector in (name, number, short, str(int(number)))
+
+def select_figures(only=None, skip=None):
+    """בחירת התרשימים לפי --only / --skip"""
+    names = list(FIGURES)
+    for selector in (only or []) + (skip or []):
+        if not any(_figure_matches(name, selector) for name in names):
+            raise ValueError(f"Unknown figure: {selector!r} (choose from {', '.join(names)})")
+    if only:
+        names = [n for n in names if any(_figure_matches(n, sel) for sel in only)]
+    if skip:
+        names = [n for n in names if not any(_figure_matches(n, sel) for sel in skip)]
+    return names
+
+def render_figure(name, data, save_path, leakage=None):
+    """ציור תרשים בודד - מחזיר את זמן הריצה בשניות"""
+    _setup_plotting()
+    func, arg_names, takes_leakage = FIGURES[name]
+    kwargs = {'leakage': leakage} if takes_leakage else {}
+    start = time.perf_counter()
+    with stage(f"plot:{name}", rows=len(data['all_data'])):
+        func(*(data[a] for a in arg_names), save_path, **kwargs)
+    return time.perf_counter() - start
+
+# נתונים טעונים בכל תהליך עובד (נטענים פעם אחת מהמטמון שעל הדיסק)
+_WORKER_DATA = {}
+
+def load_figure_data(data_dir, exclude_flagged=False, splits=None):
+    """כל הטבלאות שהתרשימים קוראים; עם exclude_flagged - בלי רצפים מסומנים בטבלת הפיצ'רים
+
+    ``splits`` is an already loaded ``(train, test, val, all_data)`` tuple
+    (e.g. kept in memory by watch.py); without it the splits are loaded.
+    """
+    with stage('load_data') as span:
+        train, test, val, all_data = splits if splits is not None else load_data(data_dir)
+        span.rows = len(all_data)
+    with stage('features', rows=len(all_data)):
+        features = load_features(all_data, data_dir)
+    with stage('quality', rows=len(all_data)):
+        quality = load_quality(all_data, data_dir)
+    if exclude_flagged:
+        features = features[~quality['flagged'].to_numpy()]
+    return {'train': train, 'test': test, 'val': val, 'all_data': all_data, 'features': features,
+            'ingest': ingest_table(data_dir), 'quality': quality}
+
+def _init_worker(data_dir, exclude_flagged):
+    _setup_plotting('Agg')
+    instrumentation.drain()  # שלבים שהועתקו מהתהליך הראשי ב-fork
+    with stage('worker:load_data'):
+        _WORKER_DATA.update(load_figure_data(data_dir, exclude_flagged))
+
+def _render_in_worker(name, save_path, leakage):
+    seconds = render_figure(name, _WORKER_DATA, save_path, leakage)
+    return seconds, instrumentation.drain()
+
+def render_figures(names, data, save_path, leakage=None, workers=1, data_dir=None, exclude_flagged=False):
+    """ציור התרשימים - סדרתי, או במקביל במאגר תהליכים
+
+    Workers read the splits from the on-disk cache written by the parent's
+    load, so only figure names and the small leakage dict cross process
+    boundaries. Returns ``{name: seconds}``.
+    """
+    if workers <= 1 or len(names) <= 1:
+        return {name: render_figure(name, data, save_path, leakage) for name in names}
+
+    timings = {}
+    with ProcessPoolExecutor(max_workers=min(workers, len(names)),
+                             initializer=_init_worker, initargs=(data_dir or DATA_DIR, exclude_flagged)) as pool:
+        futures = {pool.submit(_render_in_worker, name, save_path, leakage): name for name in names}
+        for future in as_completed(futures):
+            timings[futures[future]], events = future.result()
+            instrumentation.extend(events)
+    return {name: timings[name] for name in names}
+
+def update_figures(names, data, save_path, data_dir=None, force=False, workers=1, exclude_flagged=False,
+                   column_digests=None):
+    """ציור רק של התרשימים שהקוד או עמודות הקלט שלהם השתנו (או שהקובץ חסר)
+
+    Returns ``({name: seconds}, wall_seconds)`` for the figures that were
+    rendered; the rest are left as they are on disk.
+    """
+    data_dir = data_dir or DATA_DIR
+    os.makedirs(save_path, exist_ok=True)
+    cache = BuildCache(data_dir)
+    keys = figure_keys(names, data, column_digests)
+    outputs = {name: os.path.join(save_path, f"{name}.png") for name in names}
+    stale = [name for name in names
+             if force or not cache.is_fresh(f"figure:{name}", keys[name], [outputs[name]])]
+
+    leakage = None
+    if any(FIGURES[name][2] for name in stale):
+        with stage('leakage', rows=len(data['all_data'])):
+            leakage = split_leakage(data['train'], data['test'], data['val'])
+
+    start = time.perf_counter()
+    timings = render_figures(stale, data, save_path, leakage, workers=workers, data_dir=data_dir,
+                             exclude_flagged=exclude_flagged)
+    wall = time.perf_counter() - start
+    for name in stale:
+        cache.record(f"figure:{name}", keys[name], [outputs[name]])
+    cache.save()
+    return timings, wall
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="DNA Dataset Visualization Generator")
+    parser.add_argument('--data-dir', default=DATA_DIR, help="directory holding the split CSV files")
+    parser.add_argument('--output-dir', default=None,
+                        help="where the PNG files are written (default: <data-dir>/visualizations)")
+    parser.add_argument('--only', nargs='+', metavar='FIGURE',
+                        help="render only these figures (e.g. 03 or data_split_analysis)")
+    parser.add_argument('--skip', nargs='+', metavar='FIGURE', help="skip these figures")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help="number of render processes (1 = serial)")
+    parser.add_argument('--force', action='store_true',
+                        help="re-render figures even if their inputs did not change")
+    parser.add_argument('--exclude-flagged', action='store_true',
+                        help="leave records flagged by quality.py out of the feature-based figures")
+    parser.add_argument('--trace', metavar='PATH',
+                        help="write per-stage timings (*.jsonl = JSON lines, otherwise Chrome trace)")
+    parser.add_argument('--trace-memory', action='store_true', help="also record tracemalloc peaks (slower)")
+    return parser.parse_args(argv)
+
+def main(argv=None):
     """Main function"""
-    save_path = "/Users/ido.abramovitch/Documents/dna project/visualizations"
+    args = parse_args(argv)
+    data_dir = args.data_dir
+    save_path = args.output_dir or os.path.join(data_dir, "visualizations")
+    try:
+        names = select_figures(args.only, args.skip)
+    except ValueError as e:
+        raise SystemExit(f"❌ {e}")
+    if args.trace:
+        instrumentation.enable(args.trace, memory=args.trace_memory)
     
     print("="*60)
     print("🧬 DNA Dataset Visualization Generator")
@@ -480,26 +572,31 @@ def main():
     print()
     
     print("📂 Loading data...")
-    train, test, val, all_data = load_data()
+    data = load_figure_data(data_dir, args.exclude_flagged)
+    all_data = data['all_data']
     print(f"   Loaded {len(all_data):,} records total")
+    if args.exclude_flagged:
+        print(f"   Excluding {len(all_data) - len(data['features']):,} flagged records from the plots")
     print()
     
     print("📊 Generating visualizations...")
     print("-"*40)
     
-    plot_gene_type_distribution(all_data, save_path)
-    plot_sequence_length_distribution(all_data, save_path)
-    plot_data_split_analysis(train, test, val, save_path)
-    plot_nucleotide_composition(all_data, save_path)
-    plot_class_imbalance(all_data, save_path)
-    plot_symbol_patterns(all_data, save_path)
-    plot_correlation_heatmap(all_data, save_path)
-    plot_summary_dashboard(all_data, train, test, val, save_path)
+    timings, wall = update_figures(names, data, save_path, data_dir, force=args.force, workers=args.workers,
+                                   exclude_flagged=args.exclude_flagged)
+    for name in names:
+        if name not in timings:
+            print(f"⏭️  Unchanged: {name}.png")
     
     print("-"*40)
+    print("⏱️  Render times:")
+    for name, seconds in timings.items():
+        print(f"   {name + '.png':<40} {seconds:6.2f}s")
+    print(f"   {'Total (wall)':<40} {wall:6.2f}s")
     print()
     print(f"✅ All visualizations saved to: {save_path}")
     print("="*60)
+    instrumentation.close()
 
 if __name__ == "__main__":
     main()
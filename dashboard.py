@@ -0,0 +1,276 @@
+"""
+Summary Dashboard
+דשבורד הסיכום - מסיכום מחושב מראש ועם תבנית תרשים שנבנית פעם אחת
+
+Rendering is split in two. ``dashboard_summary`` reduces the frames to a
+small JSON-able dict (counts, length moments and histogram, leakage numbers,
+detected issues) - that is the only step whose cost grows with the rows.
+``DashboardTemplate`` builds the 3x4 GridSpec figure, the bars, histogram,
+pie and text artists once; ``render`` only pushes new data into those
+artists and saves, so redrawing from a summary takes a fraction of a second.
+The template is kept per process (``render_dashboard``), which is what
+repeated refreshes reuse. Output can be PNG or SVG at any DPI.
+"""
+
+import argparse
+import os
+import time
+
+import numpy as np
+
+from data_loader import DATA_DIR
+from grouped_stats import group_codes
+from ingest import GENE_TYPES
+from quality import HOMOPOLYMER_MIN
+
+LENGTH_BINS = 40
+DPI = 150
+FORMATS = ('png', 'svg')
+FILE_NAME = '08_summary_dashboard'
+# דחיסת PNG מהירה - קובץ גדול בכ-25% אבל שמירה מהירה פי 2.5
+PNG_COMPRESSION = 1
+N_ISSUES = 5
+# יחס גדול מזה בין הסוג הנפוץ לנדיר נחשב חוסר איזון
+IMBALANCE_RATIO = 10
+SPLIT_LABELS = ('Train', 'Test', 'Validation')
+WARN_COLOR = '#FF6B6B'
+OK_COLOR = '#95C623'
+
+
+def _issue(ok, ok_text, warn_text):
+    return [warn_text if not ok else ok_text, not ok]
+
+
+def dashboard_summary(features, train, test, val, ingest, quality, leakage=None, bins=LENGTH_BINS):
+    """כל מה שהדשבורד מציג, כמבנה קטן (בלי שורות גולמיות)
+
+    ``leakage`` is the dict from ``create_visualizations.split_leakage``
+    (pair counts and ``test_in_train``); the sequences are fingerprinted only
+    when it is missing.
+    """
+    lengths = features['seq_length'].to_numpy()
+    codes, labels = group_codes(features['GeneType'], GENE_TYPES)
+    counts = np.bincount(codes[codes >= 0], minlength=len(labels))
+    present = [i for i in np.argsort(-counts, kind='stable') if counts[i] > 0]
+    hist_counts, edges = np.histogram(lengths, bins=bins)
+
+    if leakage is None:
+        from create_visualizations import split_leakage
+        leakage = split_leakage(train, test, val)
+    in_train = leakage['test_in_train']
+
+    bad_rows = int(ingest['repaired'].sum() + ingest['quarantined'].sum()) if len(ingest) else 0
+    ratio = counts[present[0]] / counts[present[-1]] if present else 1.0
+    flagged = int(quality['flagged'].sum())
+    missing = int(features['GeneType'].isna().sum()) + sum(int(df['NucleotideSequence'].isna().sum())
+                                                            for df in (train, test, val))
+    issues = [
+        _issue(in_train == 0, "✅ No test sequences found in train",
+               f"⚠️ Data Leakage: {in_train:.0%} of test set in train!"),
+        _issue(bad_rows == 0, "✅ No parsing issues detected",
+               f"⚠️ {bad_rows / max(int(ingest['rows'].sum()), 1):.1%} records with parsing issues "
+               f"({int(ingest['repaired'].sum()):,} repaired, {int(ingest['quarantined'].sum()):,} quarantined)"),
+        _issue(ratio <= IMBALANCE_RATIO, f"✅ Class balance: {ratio:,.0f}:1 ratio",
+               f"⚠️ Class imbalance: {ratio:,.0f}:1 ratio"),
+        _issue(flagged == 0, "✅ No length or low-complexity artifacts",
+               f"⚠️ {flagged:,} artifact sequences (min length {int(quality['length'].min()):,}, "
+               f"{int(quality['low_complexity'].sum()):,} low-complexity, "
+               f"{int(quality['homopolymer'].sum()):,} runs ≥{HOMOPOLYMER_MIN})"),
+        _issue(missing == 0, "✅ No missing values detected", f"⚠️ {missing:,} missing values"),
+    ]
+    return {
+        'total_samples': len(features),
+        'n_types': len(present),
+        'mean_length': float(lengths.mean()) if len(lengths) else 0.0,
+        'gene_types': {'labels': [labels[i] for i in present], 'counts': [int(counts[i]) for i in present]},
+        'length_hist': {'edges': edges.tolist(), 'counts': hist_counts.tolist()},
+        'splits': {'labels': list(SPLIT_LABELS), 'counts': [len(train), len(test), len(val)]},
+        'leakage': {'train_test': int(leakage[('train', 'test')]), 'test_in_train': round(in_train, 4)},
+        'issues': issues,
+    }
+
+
+class DashboardTemplate:
+    """הדשבורד כתבנית: הצירים והאובייקטים נוצרים פעם אחת, ו-render רק מעדכן את הנתונים"""
+
+    def __init__(self, n_types=len(GENE_TYPES), bins=LENGTH_BINS):
+        import create_visualizations as viz
+        viz._setup_plotting()
+        plt, colors = viz.plt, viz.COLORS
+        self.n_types = n_types
+        self.bins = bins
+        self._bbox = (None, None)  # (מפתח הפריסה, גבולות החיתוך)
+        self.fig = fig = plt.figure(figsize=(20, 14))
+        gs = fig.add_gridspec(3, 4, hspace=0.3, wspace=0.3)
+
+        # 1-4. מספרים גדולים
+        self.tiles = {}
+        tiles = (('total_samples', "Total Samples", '📊 Dataset Size', colors[0]),
+                 ('n_types', "Gene Types", '🏷️ Labels', colors[1]),
+                 ('leaked', "Leaked Sequences", '⚠️ Data Leakage', WARN_COLOR),
+                 ('mean_length', "Avg Sequence Length", '📏 Sequences', colors[2]))
+        for col, (key, caption, title, color) in enumerate(tiles):
+            ax = fig.add_subplot(gs[0, col])
+            self.tiles[key] = ax.text(0.5, 0.5, '', fontsize=40, ha='center', va='center', fontweight='bold',
+                                      color=color)
+            ax.text(0.5, 0.2, caption, fontsize=14, ha='center', va='center')
+            ax.axis('off')
+            ax.set_title(title, fontsize=12)
+
+        # 5. התפלגות סוגים - עמודה לכל סוג אפשרי, עמודות מיותרות מוסתרות
+        self.types_ax = ax = fig.add_subplot(gs[1, :2])
+        self.type_bars = ax.barh(np.arange(n_types), np.zeros(n_types),
+                                 color=[colors[i % len(colors)] for i in range(n_types)])
+        self.type_labels = [ax.annotate('', (0, i), xytext=(3, 0), textcoords='offset points', va='center')
+                            for i in range(n_types)]
+        ax.set_yticks(np.arange(n_types))
+        ax.set_xlabel('Count')
+        ax.set_title('Gene Type Distribution')
+
+        # 6. אורכי רצפים
+        self.hist_ax = ax = fig.add_subplot(gs[1, 2:])
+        self.hist_bars = ax.bar(np.arange(bins), np.zeros(bins), width=1, align='edge', color=colors[0],
+                                edgecolor='white', alpha=0.8)
+        self.mean_line = ax.axvline(0, color='red', linestyle='--', label='Mean')
+        self.legend = ax.legend()
+        ax.set_xlabel('Sequence Length')
+        ax.set_ylabel('Count')
+        ax.set_title('Sequence Length Distribution')
+
+        # 7. חלוקת הנתונים
+        ax = fig.add_subplot(gs[2, :2])
+        self.wedges, self.pie_labels, self.pie_pcts = ax.pie(
+            np.ones(len(SPLIT_LABELS)), labels=[''] * len(SPLIT_LABELS), colors=colors[:len(SPLIT_LABELS)],
+            autopct='%1.0f%%', explode=[0.02] * len(SPLIT_LABELS))
+        ax.set_title('Data Split')
+
+        # 8. בעיות שזוהו
+        ax = fig.add_subplot(gs[2, 2:])
+        self.issue_texts = [ax.text(0.05, 0.85 - i * 0.18, '', fontsize=11, va='top', fontweight='bold')
+                            for i in range(N_ISSUES)]
+        ax.axis('off')
+        ax.set_title('🔍 Issues Detected', fontsize=12)
+
+        fig.suptitle('🧬 DNA Dataset Summary Dashboard', fontsize=20, fontweight='bold', y=0.98)
+
+    def _update_types(self, labels, counts):
+        # הסוג הנפוץ למטה, כמו ב-barh על value_counts
+        n = min(len(labels), self.n_types)
+        for i, (bar, note) in enumerate(zip(self.type_bars, self.type_labels)):
+            width = counts[i] if i < n else 0
+            bar.set_width(width)
+            bar.set_visible(i < n)
+            note.xy = (width, i)
+            note.set_text(f"{width:d}" if i < n else '')
+        self.types_ax.set_yticks(np.arange(n), labels[:n])
+        self.types_ax.set_ylim(-0.6, max(n, 1) - 0.4)
+        self.types_ax.set_xlim(0, max(counts[:n], default=1) * 1.05)
+
+    def _update_hist(self, edges, counts, mean):
+        edges = np.asarray(edges, dtype=float)
+        for bar, left, width, height in zip(self.hist_bars, edges[:-1], np.diff(edges), counts):
+            bar.set_x(left)
+            bar.set_width(width)
+            bar.set_height(height)
+        self.mean_line.set_xdata([mean, mean])
+        self.legend.get_texts()[0].set_text(f'Mean: {mean:.0f}')
+        margin = (edges[-1] - edges[0]) * 0.05
+        self.hist_ax.set_xlim(edges[0] - margin, edges[-1] + margin)
+        self.hist_ax.set_ylim(0, max(max(counts, default=0), 1) * 1.05)
+
+    def _update_pie(self, labels, counts):
+        # אותה גאומטריה כמו ax.pie: מתחילים מ-0 מעלות נגד כיוון השעון, הזזה של 0.02 מהמרכז
+        counts = np.asarray(counts, dtype=float)
+        fractions = counts / counts.sum() if counts.sum() else np.full(len(counts), 1 / len(counts))
+        theta1 = 0.0
+        for wedge, label, pct, name, frac in zip(self.wedges, self.pie_labels, self.pie_pcts, labels, fractions):
+            theta2 = theta1 + frac * 360
+            mid = np.deg2rad((theta1 + theta2) / 2)
+            x, y = np.cos(mid), np.sin(mid)
+            wedge.set_center((0.02 * x, 0.02 * y))
+            wedge.set_theta1(theta1)
+            wedge.set_theta2(theta2)
+            label.set_position((1.12 * x, 1.12 * y))
+            label.set_horizontalalignment('left' if x > 0 else 'right')
+            label.set_text(f"{name}\n{frac:.0%}")
+            pct.set_position((0.612 * x, 0.612 * y))
+            pct.set_text(f"{frac * 100:.0f}%")
+            theta1 = theta2
+
+    def _tick_labels(self):
+        """הטקסטים של סימוני כל הצירים (בלי ציור) - רוחבם משתנה כשהספירות גדלות"""
+        return tuple(tuple(axis.get_major_formatter().format_ticks(axis.get_majorticklocs()))
+                     for ax in self.fig.axes for axis in (ax.xaxis, ax.yaxis))
+
+    def render(self, summary, save_path, formats=('png',), dpi=DPI, name=FILE_NAME):
+        """עדכון האובייקטים מהסיכום ושמירה - מחזיר את רשימת הקבצים שנכתבו"""
+        self.tiles['total_samples'].set_text(f"{summary['total_samples']:,}")
+        self.tiles['n_types'].set_text(f"{summary['n_types']}")
+        self.tiles['leaked'].set_text(f"{summary['leakage']['train_test']:,}")
+        self.tiles['mean_length'].set_text(f"{summary['mean_length']:.0f}")
+        self._update_types(summary['gene_types']['labels'], summary['gene_types']['counts'])
+        self._update_hist(summary['length_hist']['edges'], summary['length_hist']['counts'], summary['mean_length'])
+        self._update_pie(summary['splits']['labels'], summary['splits']['counts'])
+        for text, (issue, warning) in zip(self.issue_texts, summary['issues']):
+            text.set_text(issue)
+            text.set_color(WARN_COLOR if warning else OK_COLOR)
+
+        # גבולות ה-'tight' תלויים רק בטקסטים (תוויות, אריחים, סימוני הצירים, הבעיות) - מחשבים מחדש רק כשהם משתנים
+        layout = (tuple(summary['gene_types']['labels']), tuple(len(issue) for issue, _ in summary['issues']),
+                  tuple(tile.get_text() for tile in self.tiles.values()), self._tick_labels())
+        if self._bbox[0] != layout:
+            self._bbox = (layout, self.fig.get_tightbbox().padded(0.1))
+        paths = []
+        for fmt in formats:
+            if fmt not in FORMATS:
+                raise ValueError(f"format must be one of {FORMATS}")
+            path = os.path.join(save_path, f"{name}.{fmt}")
+            options = {'pil_kwargs': {'compress_level': PNG_COMPRESSION}} if fmt == 'png' else {}
+            self.fig.savefig(path, dpi=dpi, format=fmt, bbox_inches=self._bbox[1], **options)
+            paths.append(path)
+        return paths
+
+
+# תבנית אחת לכל תהליך - נבנית בציור הראשון
+_TEMPLATE = None
+
+
+def render_dashboard(summary, save_path, formats=('png',), dpi=DPI):
+    """ציור הדשבורד מסיכום מוכן, עם התבנית של התהליך"""
+    global _TEMPLATE
+    if _TEMPLATE is None:
+        _TEMPLATE = DashboardTemplate()
+    return _TEMPLATE.render(summary, save_path, formats, dpi)
+
+
+def main(argv=None):
+    from create_visualizations import load_figure_data, split_leakage
+
+    parser = argparse.ArgumentParser(description="Render the summary dashboard")
+    parser.add_argument('--data-dir', default=DATA_DIR, help="directory holding the split CSV files")
+    parser.add_argument('--output-dir', default=None,
+                        help="where the dashboard is written (default: <data-dir>/visualizations)")
+    parser.add_argument('--format', nargs='+', choices=FORMATS, default=['png'], dest='formats')
+    parser.add_argument('--dpi', type=int, default=DPI)
+    parser.add_argument('--exclude-flagged', action='store_true',
+                        help="leave records flagged by quality.py out of the feature-based panels")
+    args = parser.parse_args(argv)
+    save_path = args.output_dir or os.path.join(args.data_dir, "visualizations")
+    os.makedirs(save_path, exist_ok=True)
+
+    data = load_figure_data(args.data_dir, args.exclude_flagged)
+    start = time.perf_counter()
+    summary = dashboard_summary(data['features'], data['train'], data['test'], data['val'], data['ingest'],
+                                data['quality'], split_leakage(data['train'], data['test'], data['val']))
+    summary_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    paths = render_dashboard(summary, save_path, args.formats, args.dpi)
+    render_seconds = time.perf_counter() - start
+
+    print(f"📊 Summary computed in {summary_seconds:.2f}s, rendered in {render_seconds:.2f}s")
+    for path in paths:
+        print(f"✅ Saved: {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,277 @@
+"""
+DNA Dataset Loader
+טעינה משותפת של קבצי הנתונים עם מטמון עמודתי
+
+Every CSV first goes through the validating ingest stage (``ingest``), which
+writes a clean copy, a quarantine file and an error summary. The clean
+train/test/validation files are parsed once, and the loader keeps a binary columnar copy of every
+split (Parquet when pyarrow is installed, pickle otherwise) next to the CSVs.
+The cache is keyed per file on size and mtime (and optionally a content hash),
+so a warm start only reads the binary files.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from ingest import ingest_csv
+
+# ברירת המחדל לתיקיית הנתונים; אפשר לעקוף עם DNA_DATA_DIR או --data-dir
+DATA_DIR = os.environ.get('DNA_DATA_DIR', "/Users/ido.abramovitch/Documents/dna project")
+
+# שם הסט -> שם הקובץ
+SPLIT_FILES = {
+    'train': 'train.csv',
+    'test': 'test.csv',
+    'validation': 'validation.csv',
+}
+
+CACHE_DIR_NAME = '.dna_cache'
+CACHE_VERSION = 3
+INGEST_DIR_NAME = 'ingest'
+
+try:
+    import pyarrow  # noqa: F401
+    CACHE_FORMAT = 'parquet'
+except ImportError:
+    CACHE_FORMAT = 'pickle'
+
+
+def sequence_lengths(sequences):
+    """אורך רצף ללא סימוני < ו-> (0 לערך חסר)"""
+    return (sequences.fillna('').astype(str)
+            .str.strip('<>').str.strip()
+            .str.len().astype('int64'))
+
+
+def file_signature(path, with_hash=False):
+    """חתימת קובץ: גודל, זמן שינוי ו(אופציונלית) hash של התוכן"""
+    st = os.stat(path)
+    sig = {'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+    if with_hash:
+        h = hashlib.sha1()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                h.update(block)
+        sig['sha1'] = h.hexdigest()
+    return sig
+
+
+def _cache_dir(data_dir):
+    return os.path.join(data_dir, CACHE_DIR_NAME)
+
+
+def _manifest_path(data_dir):
+    return os.path.join(_cache_dir(data_dir), 'manifest.json')
+
+
+def _read_manifest(data_dir):
+    try:
+        with open(_manifest_path(data_dir)) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if manifest.get('version') != CACHE_VERSION or manifest.get('format') != CACHE_FORMAT:
+        return {}
+    return manifest.get('splits', {})
+
+
+def _write_manifest(data_dir, splits):
+    path = _manifest_path(data_dir)
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump({'version': CACHE_VERSION, 'format': CACHE_FORMAT, 'splits': splits}, f, indent=2)
+    os.replace(tmp, path)
+
+
+def cache_path(data_dir, *parts):
+    """נתיב בתוך תיקיית המטמון"""
+    return os.path.join(_cache_dir(data_dir), *parts)
+
+
+def _frame_path(data_dir, name):
+    ext = 'parquet' if CACHE_FORMAT == 'parquet' else 'pkl'
+    return os.path.join(_cache_dir(data_dir), f"{name}.{ext}")
+
+
+def write_frame(df, path):
+    """כתיבת טבלה בפורמט המטמון (Parquet או pickle)"""
+    tmp = path + '.tmp'
+    if CACHE_FORMAT == 'parquet':
+        df.to_parquet(tmp)
+    else:
+        df.to_pickle(tmp)
+    os.replace(tmp, path)
+
+
+def read_frame(path):
+    """קריאת טבלה בפורמט המטמון"""
+    if CACHE_FORMAT == 'parquet':
+        return pd.read_parquet(path)
+    return pd.read_pickle(path)
+
+
+def _signature_matches(cached, current):
+    return all(cached.get(k) == v for k, v in current.items())
+
+
+def _cache_hit(manifest, name, filename, signature, frame_path):
+    cached = manifest.get(name)
+    return bool(cached) and cached.get('file') == filename and _signature_matches(cached, signature) \
+        and os.path.exists(frame_path)
+
+
+def splits_cached(data_dir=DATA_DIR):
+    """האם המטמון מעודכן לכל קבצי הסטים - לפי החתימות ב-manifest, בלי לקרוא את הקבצים
+
+    When true, ``derived_key`` already reflects the current files, so derived
+    tables can be validated without calling ``load_splits`` first.
+    """
+    manifest = _read_manifest(data_dir)
+    for name, filename in SPLIT_FILES.items():
+        try:
+            signature = file_signature(os.path.join(data_dir, filename))
+        except OSError:
+            return False
+        if not _cache_hit(manifest, name, filename, signature, _frame_path(data_dir, name)):
+            return False
+    return True
+
+
+def ingest_split(data_dir, name, filename=None, signature=None):
+    """שלב ה-ingest לסט בודד (רק אם הקובץ השתנה) - מחזיר (נתיב הקובץ הנקי, סיכום)"""
+    filename = filename or SPLIT_FILES[name]
+    csv_path = os.path.join(data_dir, filename)
+    signature = signature or file_signature(csv_path)
+    out_dir = cache_path(data_dir, INGEST_DIR_NAME)
+    clean_path = os.path.join(out_dir, f"{name}.csv")
+    summary_path = os.path.join(out_dir, f"{name}.summary.json")
+
+    try:
+        with open(summary_path) as f:
+            summary = json.load(f)
+        if summary.get('file') == filename and _signature_matches(summary['signature'], signature) \
+                and os.path.exists(clean_path):
+            return clean_path, summary
+    except (OSError, ValueError, KeyError):
+        pass
+
+    os.makedirs(out_dir, exist_ok=True)
+    summary = ingest_csv(csv_path, clean_path, os.path.join(out_dir, f"{name}.quarantine.csv"))
+    summary.update(file=filename, signature=signature)
+    with open(summary_path + '.tmp', 'w') as f:
+        json.dump(summary, f, indent=2)
+    os.replace(summary_path + '.tmp', summary_path)
+    return clean_path, summary
+
+
+def ingest_table(data_dir=DATA_DIR):
+    """סיכום ה-ingest של כל הסטים - שורה לכל סט"""
+    summaries = {name: ingest_split(data_dir, name)[1] for name in SPLIT_FILES}
+    columns = ['rows', 'clean', 'repaired', 'quarantined']
+    return pd.DataFrame([[s[c] for c in columns] for s in summaries.values()],
+                        index=list(summaries), columns=columns)
+
+
+def load_split(data_dir, name, filename=None, use_cache=True, verify_hash=False, manifest=None):
+    """טעינת סט בודד - מהמטמון אם הקובץ לא השתנה, אחרת מה-CSV
+
+    The frame is read from the validated copy written by ``ingest_split``.
+    Returns the split frame with a derived ``seq_length`` column appended and
+    a flag telling whether the cache was hit.
+    """
+    filename = filename or SPLIT_FILES[name]
+    csv_path = os.path.join(data_dir, filename)
+    signature = file_signature(csv_path, with_hash=verify_hash)
+    frame_path = _frame_path(data_dir, name)
+
+    if use_cache:
+        if manifest is None:
+            manifest = _read_manifest(data_dir)
+        if _cache_hit(manifest, name, filename, signature, frame_path):
+            return read_frame(frame_path), True
+
+    clean_path, _ = ingest_split(data_dir, name, filename, signature)
+    df = pd.read_csv(clean_path, index_col=0)
+    df['seq_length'] = sequence_lengths(df['NucleotideSequence'])
+
+    if use_cache:
+        os.makedirs(_cache_dir(data_dir), exist_ok=True)
+        write_frame(df, frame_path)
+        splits = _read_manifest(data_dir)
+        splits[name] = dict(signature, file=filename)
+        _write_manifest(data_dir, splits)
+    return df, False
+
+
+def combine_splits(frames):
+    """איחוד סטים שנטענו (כל אחד עם seq_length) - כמו load_splits, בלי לקרוא מהדיסק
+
+    ``frames`` maps split name -> frame from ``load_split``; the frames are
+    not modified. Returns ``(train, test, val, all_data)``.
+    """
+    lengths = [df['seq_length'] for df in frames.values()]
+    splits = {name: df.drop(columns='seq_length') for name, df in frames.items()}
+
+    all_data = pd.concat(splits.values(), ignore_index=True)
+    codes = np.repeat(np.arange(len(splits), dtype='int8'), [len(df) for df in splits.values()])
+    all_data['source'] = pd.Categorical.from_codes(codes, categories=list(splits))
+    all_data['seq_length'] = pd.concat(lengths, ignore_index=True)
+
+    return splits['train'], splits['test'], splits['validation'], all_data
+
+
+def load_splits(data_dir=DATA_DIR, use_cache=True, verify_hash=False):
+    """טעינת שלושת הסטים ואיחודם
+
+    Returns ``(train, test, val, all_data)``. The split frames hold the
+    original CSV columns; ``all_data`` adds ``source`` and ``seq_length``.
+    """
+    manifest = _read_manifest(data_dir) if use_cache else None
+    frames = {name: load_split(data_dir, name, filename, use_cache=use_cache,
+                               verify_hash=verify_hash, manifest=manifest)[0]
+              for name, filename in SPLIT_FILES.items()}
+    return combine_splits(frames)
+
+
+def derived_key(data_dir, version):
+    """מפתח לטבלה נגזרת: חתימות הסטים במטמון וגרסת החישוב
+
+    Call after ``load_splits`` (or once ``splits_cached`` is true) so the
+    manifest reflects the current files.
+    """
+    payload = json.dumps({'splits': _read_manifest(data_dir), 'cache': CACHE_VERSION, 'version': version},
+                         sort_keys=True)
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+
+def load_derived(data_dir, name, key):
+    """טעינת טבלה נגזרת מהמטמון - None אם חסרה או שהמפתח השתנה"""
+    frame_path = _frame_path(data_dir, name)
+    try:
+        with open(frame_path + '.key') as f:
+            if f.read().strip() != key:
+                return None
+        return read_frame(frame_path)
+    except OSError:
+        return None
+
+
+def save_derived(data_dir, name, df, key):
+    """שמירת טבלה נגזרת (למשל פיצ'רים) ליד מטמון הנתונים"""
+    os.makedirs(_cache_dir(data_dir), exist_ok=True)
+    frame_path = _frame_path(data_dir, name)
+    write_frame(df, frame_path)
+    with open(frame_path + '.key', 'w') as f:
+        f.write(key)
+
+
+def clear_cache(data_dir=DATA_DIR):
+    """מחיקת קבצי המטמון"""
+    cache_dir = _cache_dir(data_dir)
+    if os.path.isdir(cache_dir):
+        shutil.rmtree(cache_dir)
@@ -0,0 +1,235 @@
+"""
+Tensor Export
+ייצוא הנתונים למודל: רצפים מקודדים, תוויות ו-batching לפי אורך
+
+Records are grouped per split into length buckets (quantiles of the length
+distribution, rounded up to a multiple of ``PAD_MULTIPLE``), so each shard
+is padded only to its bucket's length instead of the global maximum. Every
+shard is a plain ``.npy`` tensor - ``uint8`` base codes (A=0, C=1, G=2, T=3,
+N=4, other=5, padding=6) or one-hot ``(rows, length, 4)`` - that training
+code can open with ``mmap_mode='r'``, plus a small ``.npz`` with labels,
+true lengths and record ids. ``index.json`` lists the shards. ``--max-length``
+truncates at that length; the bucket edge above it only sets the padding.
+Shards are encoded in a process pool; each worker reads its records
+straight from the packed store.
+"""
+
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from composition import N_CLASSES
+from data_loader import DATA_DIR, cache_path, derived_key, load_splits
+from grouped_stats import group_codes
+from ingest import GENE_TYPES
+from packed_store import PackedStore, load_store
+from quality import load_quality
+
+EXPORT_VERSION = 2
+EXPORT_DIR_NAME = 'tensors'
+N_BUCKETS = 8
+PAD_MULTIPLE = 8
+SHARD_ROWS = 4096
+PAD = N_CLASSES
+SPLITS = ('train', 'test', 'validation')
+ENCODINGS = ('integer', 'onehot')
+
+# קוד בסיס -> וקטור one-hot (N, סימן אחר וריפוד = אפסים)
+_ONEHOT = np.zeros((PAD + 1, 4), dtype=np.uint8)
+_ONEHOT[np.arange(4), np.arange(4)] = 1
+
+
+def label_ids(gene_types):
+    """מספר תווית לכל רשומה לפי הסדר של GENE_TYPES (סוג לא ידוע = -1)"""
+    codes, _ = group_codes(gene_types, GENE_TYPES)
+    return codes.astype(np.int16)
+
+
+def bucket_edges(lengths, n_buckets=N_BUCKETS, multiple=PAD_MULTIPLE):
+    """אורך הריפוד של כל דלי: אחוזוני האורכים, מעוגלים למעלה לכפולה של multiple"""
+    lengths = np.asarray(lengths)
+    if len(lengths) == 0:
+        return np.array([multiple], dtype=np.int64)
+    q = np.quantile(lengths, np.linspace(0, 1, n_buckets + 1)[1:], method='higher')
+    return np.unique(np.maximum(np.ceil(q / multiple), 1).astype(np.int64) * multiple)
+
+
+def plan_shards(lengths, splits, n_buckets=N_BUCKETS, shard_rows=SHARD_ROWS):
+    """חלוקת הרשומות לשארדים: (סט, דלי, אורך ריפוד, מספר שארד בדלי, אינדקסי רשומות ממוינים לפי אורך)"""
+    shards = []
+    for split in SPLITS:
+        records = np.flatnonzero(splits == split)
+        if len(records) == 0:
+            continue
+        records = records[np.argsort(lengths[records], kind='stable')]
+        edges = bucket_edges(lengths[records], n_buckets)
+        buckets = np.searchsorted(edges, lengths[records], side='left')
+        bounds = np.searchsorted(buckets, np.arange(len(edges) + 1))
+        for bucket, pad_length in enumerate(edges):
+            members = records[bounds[bucket]:bounds[bucket + 1]]
+            for part, start in enumerate(range(0, len(members), shard_rows)):
+                shards.append((split, bucket, int(pad_length), part, members[start:start + shard_rows]))
+    return shards
+
+
+def encode_batch(bases, offsets, pad_length, encoding='integer'):
+    """מטריצה (rows, pad_length) של קודים עם ריפוד, או (rows, pad_length, 4) ב-one-hot"""
+    lengths = np.diff(offsets)
+    tokens = np.full((len(lengths), pad_length), PAD, dtype=np.uint8)
+    rows = np.repeat(np.arange(len(lengths)), lengths)
+    columns = np.arange(len(bases)) - np.repeat(offsets[:-1], lengths)
+    tokens[rows, columns] = bases
+    return _ONEHOT[tokens] if encoding == 'onehot' else tokens
+
+
+def _write_shard(store_dir, records, labels, pad_length, encoding, prefix, max_length=None):
+    """קידוד וכתיבה של שארד אחד (רץ בתהליך עובד) - מחזיר (מספר הבסיסים האמיתיים, האורך הארוך ביותר)"""
+    # חיתוך ב-max_length - העיגול למעלה של הדלי הוא רק ריפוד
+    cut = pad_length if max_length is None else min(pad_length, max_length)
+    bases, offsets = PackedStore(store_dir).take(records, max_length=cut)
+    lengths = np.diff(offsets).astype(np.int32)
+    np.save(prefix + '.npy', encode_batch(bases, offsets, pad_length, encoding))
+    np.savez(prefix + '.npz', labels=labels, lengths=lengths, records=records)
+    return int(offsets[-1]), int(lengths.max(initial=0))
+
+
+def export_path(data_dir=DATA_DIR):
+    return cache_path(data_dir, EXPORT_DIR_NAME)
+
+
+def export_tensors(all_data, data_dir=DATA_DIR, output_dir=None, encoding='integer', n_buckets=N_BUCKETS,
+                   max_length=None, shard_rows=SHARD_ROWS, exclude_flagged=False, workers=1, force=False):
+    """כתיבת השארדים ו-index.json - מחזיר את האינדקס (מדלג אם הכל כבר קיים ועדכני)"""
+    if encoding not in ENCODINGS:
+        raise ValueError(f"encoding must be one of {ENCODINGS}")
+    output_dir = output_dir or export_path(data_dir)
+    store = load_store(data_dir, all_data)
+    settings = {'encoding': encoding, 'n_buckets': n_buckets, 'max_length': max_length,
+                'shard_rows': shard_rows, 'exclude_flagged': exclude_flagged}
+    key = derived_key(data_dir, EXPORT_VERSION)
+    index_file = os.path.join(output_dir, 'index.json')
+    if os.path.exists(index_file):
+        with open(index_file) as f:
+            index = json.load(f)
+        if not force and index.get('key') == key and index.get('settings') == settings and all(
+                os.path.exists(os.path.join(output_dir, s['file'])) for s in index['shards']):
+            return index
+        # שארדים של ייצוא קודם (למשל עם דליים אחרים) לא יישארו ליד החדשים
+        for shard in index.get('shards', []):
+            for name in (shard['file'], shard['meta']):
+                if os.path.exists(os.path.join(output_dir, name)):
+                    os.remove(os.path.join(output_dir, name))
+
+    lengths = np.asarray(store.lengths)
+    if max_length is not None:
+        lengths = np.minimum(lengths, max_length)
+    splits = all_data['source'].to_numpy()
+    if exclude_flagged:
+        splits = np.where(load_quality(all_data, data_dir)['flagged'].to_numpy(), None, splits)
+    labels = label_ids(all_data['GeneType'])
+    shards = plan_shards(lengths, splits, n_buckets, shard_rows)
+
+    jobs = []
+    entries = []
+    for split, bucket, pad_length, part, records in shards:
+        name = f"{split}/bucket{bucket:02d}_len{pad_length}_{part:03d}"
+        os.makedirs(os.path.join(output_dir, split), exist_ok=True)
+        jobs.append((store.path, records, labels[records], pad_length, encoding, os.path.join(output_dir, name),
+                     max_length))
+        entries.append({'split': split, 'bucket': bucket, 'pad_length': pad_length, 'rows': len(records),
+                        'file': name + '.npy', 'meta': name + '.npz'})
+
+    if workers <= 1 or len(jobs) <= 1:
+        written = [_write_shard(*job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+            written = list(pool.map(_write_shard, *zip(*jobs)))
+    for entry, (n_tokens, longest) in zip(entries, written):
+        if max_length is not None and longest > max_length:
+            raise ValueError(f"{entry['file']}: exported length {longest} exceeds max_length={max_length}")
+        entry['tokens'], entry['longest'] = n_tokens, longest
+
+    stats = {}
+    for split in SPLITS:
+        split_entries = [e for e in entries if e['split'] == split]
+        if not split_entries:
+            continue
+        real = sum(e['tokens'] for e in split_entries)
+        rows = sum(e['rows'] for e in split_entries)
+        stats[split] = {
+            'rows': rows,
+            'tokens': real,
+            'padded': sum(e['rows'] * e['pad_length'] for e in split_entries),
+            'padded_to_max': rows * max(e['pad_length'] for e in split_entries),
+        }
+    index = {
+        'version': EXPORT_VERSION,
+        'key': key,
+        'settings': settings,
+        'alphabet': ['A', 'C', 'G', 'T', 'N', 'other', 'pad'],
+        'pad_value': PAD,
+        'labels': GENE_TYPES,
+        'shards': entries,
+        'stats': stats,
+    }
+    with open(index_file, 'w') as f:
+        json.dump(index, f, indent=2)
+    return index
+
+
+def iter_batches(output_dir, split='train', batch_size=256, shuffle=True, seed=42):
+    """batches של (x, y, lengths) מהשארדים - כל batch מתוך דלי אחד, כך שהריפוד מינימלי"""
+    with open(os.path.join(output_dir, 'index.json')) as f:
+        index = json.load(f)
+    rng = np.random.default_rng(seed)
+    batches = []
+    for shard in index['shards']:
+        if shard['split'] == split:
+            batches += [(shard, start) for start in range(0, shard['rows'], batch_size)]
+    if shuffle:
+        batches = [batches[i] for i in rng.permutation(len(batches))]
+    for shard, start in batches:
+        x = np.load(os.path.join(output_dir, shard['file']), mmap_mode='r')
+        meta = np.load(os.path.join(output_dir, shard['meta']))
+        stop = start + batch_size
+        yield np.asarray(x[start:stop]), meta['labels'][start:stop], meta['lengths'][start:stop]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export length-bucketed tensor shards for training")
+    parser.add_argument('--data-dir', default=DATA_DIR, help="directory holding the split CSV files")
+    parser.add_argument('--output-dir', default=None, help="where the shards go (default: next to the data cache)")
+    parser.add_argument('--encoding', choices=ENCODINGS, default='integer')
+    parser.add_argument('--buckets', type=int, default=N_BUCKETS, help="length buckets per split")
+    parser.add_argument('--max-length', type=int, default=None, help="truncate longer sequences")
+    parser.add_argument('--shard-rows', type=int, default=SHARD_ROWS)
+    parser.add_argument('--exclude-flagged', action='store_true', help="skip records flagged by quality.py")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--force', action='store_true', help="rewrite the shards even if they are up to date")
+    args = parser.parse_args()
+
+    _, _, _, all_data = load_splits(args.data_dir)
+    start = time.perf_counter()
+    index = export_tensors(all_data, args.data_dir, args.output_dir, args.encoding, args.buckets,
+                           args.max_length, args.shard_rows, args.exclude_flagged, args.workers, args.force)
+    seconds = time.perf_counter() - start
+
+    print("=" * 60)
+    print("📦 Tensor Export")
+    print("=" * 60)
+    print(f"{'Split':<12} | {'Rows':>8} | {'Shards':>6} | {'Padding used':>12} | {'Pad-to-max':>10}")
+    print("-" * 60)
+    for split, s in index['stats'].items():
+        n_shards = sum(e['split'] == split for e in index['shards'])
+        print(f"{split:<12} | {s['rows']:>8,} | {n_shards:>6} | {s['tokens'] / max(s['padded'], 1):>12.1%} "
+              f"| {s['tokens'] / max(s['padded_to_max'], 1):>10.1%}")
+    print("-" * 60)
+    print(f"✅ {len(index['shards'])} shards in {args.output_dir or export_path(args.data_dir)} ({seconds:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Feature Table
+טבלת פיצ'רים משותפת לכל הגרפים והדוחות
+
+Every derived feature is computed once, with vectorized string operations
+and compact dtypes, and stored next to the data cache. Length and
+composition come from the packed store when it is given. Plots read from this
+table instead of adding columns to ``all_data`` as a side effect.
+"""
+
+import numpy as np
+import pandas as pd
+
+from composition import composition_table
+from data_loader import DATA_DIR, derived_key, load_derived, save_derived
+from packed_store import load_store
+from rule_features import match_rules
+
+# יש להעלות כשמשנים את אופן חישוב הפיצ'רים
+FEATURES_VERSION = 1
+
+FEATURE_COLUMNS = [
+    'GeneType', 'source', 'seq_length',
+    'symbol_prefix', 'symbol_length', 'ends_with_P', 'starts_with_LOC', 'desc_length',
+    'A_pct', 'C_pct', 'G_pct', 'T_pct', 'gc_content',
+]
+
+
+def build_features(all_data, store=None):
+    """חישוב כל הפיצ'רים הנגזרים מ-all_data (אורך והרכב מה-store הארוז אם ניתן)"""
+    symbol = all_data['Symbol']
+    description = all_data['Description']
+    if store is not None:
+        composition = store.composition_table(all_data.index)
+        seq_length = store.lengths
+    else:
+        composition = composition_table(all_data['NucleotideSequence'])
+        seq_length = all_data['seq_length'].to_numpy()
+    rules = match_rules(all_data)
+
+    features = pd.DataFrame({
+        'GeneType': all_data['GeneType'],
+        'source': all_data['source'],
+        'seq_length': seq_length.astype(np.int32),
+        'symbol_prefix': symbol.str.extract(r'^([A-Z]+)', expand=False).astype('category'),
+        'symbol_length': symbol.str.len().fillna(0).astype(np.int32),
+        'ends_with_P': rules.column('symbol_ends_P'),
+        'starts_with_LOC': rules.column('symbol_LOC'),
+        'desc_length': description.str.len().fillna(0).astype(np.int32),
+    }, index=all_data.index)
+    for col in ['A_pct', 'C_pct', 'G_pct', 'T_pct', 'gc_content']:
+        features[col] = composition[col].to_numpy(dtype=np.float32)
+    return features[FEATURE_COLUMNS]
+
+
+def load_features(all_data, data_dir=DATA_DIR, use_cache=True):
+    """טבלת הפיצ'רים - מהמטמון אם קבצי הנתונים לא השתנו"""
+    if not use_cache:
+        return build_features(all_data, load_store(data_dir, all_data))
+    key = derived_key(data_dir, FEATURES_VERSION)
+    features = load_derived(data_dir, 'features', key)
+    if features is None or len(features) != len(all_data):
+        features = build_features(all_data, load_store(data_dir, all_data))
+        save_derived(data_dir, 'features', features, key)
+    return features
@@ -1,200 +1,479 @@
 """
 DNA Data Summary Report Generator
 Generates a comprehensive summary of variables and labels from the DNA dataset
+
+With ``--exclude-flagged`` the records flagged by ``quality.py`` are left out
+of every section, and a quality section reports how many were flagged per
+flag and per file.
 """
 
-import pandas as pd
+import argparse
+import contextlib
+import io
+import json
 import os
+from concurrent.futures import ProcessPoolExecutor
 
-def generate_summary_report():
-    # Load the datasets
-    data_dir = "/Users/ido.abramovitch/Documents/dna project"
-    
-    print("=" * 80)
-    print("דוח מסכם - נתוני DNA")
-    print("DNA Dataset Summary Report")
-    print("=" * 80)
+import numpy as np
+import pandas as pd
+
+import instrumentation
+from accumulators import ColumnProfile, GroupedMoments, LengthHistogram, Moments, ValueCounter
+from build_cache import BuildCache, code_digest, digest, module_digest
+from data_loader import (CACHE_VERSION, DATA_DIR, SPLIT_FILES, file_signature, ingest_split, load_split,
+                         load_splits, sequence_lengths)
+from instrumentation import stage
+from quality import FLAG_COLUMNS, load_quality, quality_summary
+from sketches import SketchCounter, SketchProfile
+
+# מספר שורות בכל מנה במצב streaming
+CHUNK_SIZE = 20000
+
+# מספר שורות הדוגמה בסעיף 6
+SAMPLE_SIZE = 5
+
+OUTPUT_FORMATS = ('text', 'json', 'csv')
+
+# עמודות נגזרות שאינן חלק מקובץ ה-CSV
+DERIVED_COLUMNS = ('source', 'seq_length')
+# המודולים שהסיכום החלקי תלוי בהם - שינוי בהם מבטל את הסיכומים השמורים (pickle)
+PARTIAL_MODULES = ('accumulators', 'sketches', 'grouped_stats', 'ingest', 'data_loader')
+
+
+def summarize_file(chunks, sample_size=SAMPLE_SIZE, sketch=False, keep=None):
+    """סיכום חלקי של קובץ בודד מתוך מנות (ניתן למיזוג ולשמירה במטמון)
+
+    A chunk may already carry ``seq_length``; otherwise it is computed. Only
+    mergeable accumulators and the first ``sample_size`` rows are kept. With
+    ``sketch`` distinct counts come from HyperLogLog and value counts from
+    Count-Min heavy hitters (constant memory, approximate). ``keep`` is a
+    boolean mask over the rows of the file (in order); rows outside it are
+    left out, e.g. the records flagged by ``quality.py``.
+    """
+    profile = SketchProfile if sketch else ColumnProfile
+    counter = SketchCounter if sketch else ValueCounter
+    partial = {
+        'rows': 0,
+        'sketch': sketch,
+        'columns': None,
+        'profiles': {},
+        'gene_types': counter(),
+        'methods': counter(),
+        'lengths': Moments(),
+        'histogram': LengthHistogram(),
+        'length_by_type': GroupedMoments(),
+        'sample': None,
+    }
+    start = 0
+    for chunk in chunks:
+        if keep is not None:
+            start, chunk = start + len(chunk), chunk[keep[start:start + len(chunk)]]
+        if 'seq_length' in chunk:
+            seq_length = chunk['seq_length']
+        else:
+            seq_length = sequence_lengths(chunk['NucleotideSequence'])
+        chunk = chunk.drop(columns=[c for c in DERIVED_COLUMNS if c in chunk])
+        if partial['columns'] is None:
+            partial['columns'] = chunk.columns.tolist()
+            partial['sample'] = chunk.head(sample_size).copy()
+        elif len(partial['sample']) < sample_size:
+            missing = sample_size - len(partial['sample'])
+            partial['sample'] = pd.concat([partial['sample'], chunk.head(missing)])
+        partial['rows'] += len(chunk)
+
+        for col in partial['columns']:
+            partial['profiles'].setdefault(col, profile()).update(chunk[col])
+        partial['gene_types'].update(chunk['GeneType'])
+        partial['methods'].update(chunk['GeneGroupMethod'])
+        partial['lengths'].update(seq_length)
+        partial['histogram'].update(seq_length)
+        partial['length_by_type'].update(chunk['GeneType'], seq_length)
+    return partial
+
+
+def combine(partials):
+    """מיזוג הסיכומים החלקיים של כל הקבצים לאובייקט הסיכום של הדוח"""
+    sketch = any(p.get('sketch') for p in partials.values())
+    counter = SketchCounter if sketch else ValueCounter
+    gene_types = counter()
+    methods = counter()
+    lengths = Moments()
+    histogram = LengthHistogram()
+    length_by_type = GroupedMoments()
+    for partial in partials.values():
+        gene_types.merge(partial['gene_types'])
+        methods.merge(partial['methods'])
+        lengths.merge(partial['lengths'])
+        histogram.merge(partial['histogram'])
+        length_by_type.merge(partial['length_by_type'])
+
+    first = next(iter(partials.values()))
+    length_rows = {
+        gt: {'mean': m.mean, 'min': m.min, 'max': m.max, 'count': m.count}
+        for gt, m in length_by_type.groups.items()
+    }
+    seq_by_type = pd.DataFrame.from_dict(length_rows, orient='index', columns=['mean', 'min', 'max', 'count'])
+
+    summary = {
+        'files': {
+            fname: {'rows': p['rows'], 'columns': len(p['columns'] or [])}
+            for fname, p in partials.items()
+        },
+        'total_samples': sum(p['rows'] for p in partials.values()),
+        'columns': [
+            {'name': col, 'dtype': prof.dtype, 'unique': prof.unique, 'missing': prof.null}
+            for col, prof in first['profiles'].items()
+        ],
+        'gene_type_counts': gene_types.result(),
+        'gene_type_by_file': {fname: p['gene_types'].counts for fname, p in partials.items()},
+        'method_counts': methods.result(),
+        'length': {
+            'min': int(lengths.min),
+            'max': int(lengths.max),
+            'mean': lengths.mean,
+            'median': histogram.median(),
+            'std': lengths.std,
+        },
+        'length_by_type': seq_by_type.sort_values('count', ascending=False, kind='stable'),
+        'sample': first['sample'],
+    }
+    if sketch:
+        # גבולות השגיאה של האומדנים (מופיעים בדוח וב-JSON)
+        hll = next(iter(first['profiles'].values())).hll
+        summary['sketch'] = {
+            'distinct_relative_error': hll.relative_error,
+            'frequency_error': gene_types.sketch.error_bound,
+            'frequency_confidence': gene_types.sketch.confidence,
+            'method_frequency_error': methods.sketch.error_bound,
+        }
+    return summary
+
+
+def _summarize_split(data_dir, name, fname, chunk_size=None, sample_size=SAMPLE_SIZE, sketch=False, keep=None,
+                     use_cache=True):
+    """סיכום חלקי של סט בודד - במנות מה-CSV הנקי, או בבת אחת דרך המטמון"""
+    with stage(f"summarize:{fname}") as span:
+        if chunk_size:
+            chunks = pd.read_csv(ingest_split(data_dir, name, fname)[0], index_col=0, chunksize=chunk_size)
+        else:
+            chunks = [load_split(data_dir, name, fname, use_cache=use_cache)[0]]
+        partial = summarize_file(chunks, sample_size, sketch, keep)
+        span.rows = partial['rows']
+    return partial
+
+
+def _summarize_in_worker(*args):
+    return _summarize_split(*args), instrumentation.drain()
+
+
+def summarize_splits(data_dir=DATA_DIR, split_files=None, chunk_size=None, sample_size=SAMPLE_SIZE, workers=1,
+                     sketch=False, keep=None):
+    """סיכום חלקי לכל סט - סדרתי, או קובץ לכל תהליך במאגר תהליכים
+
+    Workers never write the shared cache manifest (``use_cache=False``);
+    they read the validated CSV that ``ingest_split`` keeps per split.
+    ``keep`` maps split name -> mask of the rows to summarize.
+    """
+    split_files = SPLIT_FILES if split_files is None else split_files
+    keep = keep or {}
+    jobs = [(data_dir, name, fname, chunk_size, sample_size, sketch, keep.get(name))
+            for name, fname in split_files.items()]
+    if workers <= 1 or len(jobs) <= 1:
+        return {job[2]: _summarize_split(*job) for job in jobs}
+
+    partials = {}
+    with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+        results = pool.map(_summarize_in_worker, *zip(*[job + (False,) for job in jobs]))
+        for job, (partial, events) in zip(jobs, results):
+            partials[job[2]] = partial
+            instrumentation.extend(events)
+    return partials
+
+
+def summarize_stream(data_dir=DATA_DIR, chunk_size=CHUNK_SIZE, split_files=None,
+                     sample_size=SAMPLE_SIZE, workers=1, sketch=False, keep=None):
+    """סיכום במנות ישירות מקבצי ה-CSV (אחרי ingest) - זיכרון קבוע"""
+    partials = summarize_splits(data_dir, split_files, chunk_size, sample_size, workers, sketch, keep)
+    with stage('combine'):
+        return combine(partials)
+
+
+def partial_key(data_dir, fname, sample_size=SAMPLE_SIZE, sketch=False, keep=None):
+    """מפתח המטמון של הסיכום החלקי של קובץ: הקוד (כולל המודולים שהוא תלוי בהם), ההגדרות וחתימת הקובץ"""
+    parts = [code_digest(summarize_file), module_digest(*PARTIAL_MODULES), CACHE_VERSION, sample_size, sketch,
+             file_signature(os.path.join(data_dir, fname))]
+    if keep is not None:
+        # השורות שסוננו תלויות בכל הסטים (z של אורך לפי GeneType) - המסכה עצמה היא חלק מהמפתח
+        parts.append(np.packbits(keep).tobytes())
+    return digest(*parts)
+
+
+def summarize_incremental(data_dir=DATA_DIR, split_files=None, sample_size=SAMPLE_SIZE, workers=1,
+                          sketch=False, keep=None):
+    """סיכום עם מטמון לכל קובץ: רק קבצים שהשתנו נטענים ומסוכמים מחדש
+
+    Returns the summary and the list of files that were recomputed.
+    """
+    split_files = SPLIT_FILES if split_files is None else split_files
+    keep = keep or {}
+    cache = BuildCache(data_dir)
+    keys = {fname: partial_key(data_dir, fname, sample_size, sketch, keep.get(name))
+            for name, fname in split_files.items()}
+    # סיכום בלי הרשומות המסומנות נשמר בנפרד, כדי שמעבר בין המצבים לא ידרוס את המטמון
+    entry = 'report:{}:unflagged' if keep else 'report:{}'
+    partials = {fname: cache.load_object(entry.format(fname), keys[fname]) for fname in split_files.values()}
+    stale = {name: fname for name, fname in split_files.items() if partials[fname] is None}
+
+    for fname, partial in summarize_splits(data_dir, stale, sample_size=sample_size, workers=workers,
+                                           sketch=sketch, keep=keep).items():
+        cache.store_object(entry.format(fname), keys[fname], partial)
+        partials[fname] = partial
+    cache.save()
+    with stage('combine'):
+        return combine(partials), list(stale.values())
+
+
+def flagged_records(data_dir=DATA_DIR, split_files=None):
+    """הרשומות שסומנו ב-quality.py: ({שם סט: מסכת השורות שנשארות}, מספרי הדגלים לדוח)"""
+    split_files = SPLIT_FILES if split_files is None else split_files
+    if not split_files.items() <= SPLIT_FILES.items():
+        raise ValueError(f"quality flags exist only for the split files {SPLIT_FILES}")
+    _, _, _, all_data = load_splits(data_dir)
+    quality = load_quality(all_data, data_dir)
+    flagged = quality['flagged'].to_numpy()
+    source = all_data['source'].to_numpy()
+    keep = {name: ~flagged[source == name] for name in split_files}
+    totals, _ = quality_summary(quality, all_data['GeneType'])
+    counts = {
+        'flagged': int(sum((~mask).sum() for mask in keep.values())),
+        'by_flag': {flag: int(totals[flag]) for flag in FLAG_COLUMNS},
+        'by_file': {fname: int((~keep[name]).sum()) for name, fname in split_files.items()},
+    }
+    return keep, counts
+
+
+def _print_frequency_note(error, confidence):
+    print(f"ספירות משוערות (Count-Min): לכל היותר +{error:,.0f} מעל הספירה האמיתית בהסתברות {confidence:.1%}")
+    print(f"Counts are Count-Min estimates: at most +{error:,.0f} above the true count "
+          f"with {confidence:.1%} probability")
     print()
-    
-    # Load all three datasets
-    train_df = pd.read_csv(os.path.join(data_dir, "train.csv"), index_col=0)
-    test_df = pd.read_csv(os.path.join(data_dir, "test.csv"), index_col=0)
-    val_df = pd.read_csv(os.path.join(data_dir, "validation.csv"), index_col=0)
-    
-    # ========== SECTION 1: Dataset Overview ==========
+
+
+def _print_overview(summary):
+    """סקירת הנתונים: שורות ועמודות לכל קובץ"""
     print("=" * 80)
     print("1. סקירת הנתונים | Dataset Overview")
     print("=" * 80)
     print()
-    
+
     print(f"{'קובץ':<20} | {'מספר שורות':<15} | {'מספר עמודות':<15}")
     print(f"{'File':<20} | {'Rows':<15} | {'Columns':<15}")
     print("-" * 60)
-    print(f"{'train.csv':<20} | {len(train_df):<15,} | {len(train_df.columns):<15}")
-    print(f"{'test.csv':<20} | {len(test_df):<15,} | {len(test_df.columns):<15}")
-    print(f"{'validation.csv':<20} | {len(val_df):<15,} | {len(val_df.columns):<15}")
+    for fname, info in summary['files'].items():
+        print(f"{fname:<20} | {info['rows']:<15,} | {info['columns']:<15}")
     print("-" * 60)
-    print(f"{'סה\"כ | Total':<20} | {len(train_df) + len(test_df) + len(val_df):<15,} |")
+    print(f"{'סה\"כ | Total':<20} | {summary['total_samples']:<15,} |")
     print()
-    
-    # ========== SECTION 2: Variables (Columns) ==========
+
+
+def _print_variables(summary):
+    """המשתנים: סוג, ערכים ייחודיים וחסרים לכל עמודה"""
     print("=" * 80)
     print("2. משתנים (עמודות) | Variables (Columns)")
     print("=" * 80)
     print()
-    
-    columns = train_df.columns.tolist()
+
+    columns = summary['columns']
     print(f"מספר משתנים: {len(columns)}")
     print(f"Number of variables: {len(columns)}")
     print()
-    
+
+    sketch = summary.get('sketch')
+    if sketch:
+        error = sketch['distinct_relative_error']
+        print(f"ערכים ייחודיים משוערים (HyperLogLog, שגיאת תקן ±{error:.2%})")
+        print(f"Unique values are HyperLogLog estimates (±{error:.2%} standard error)")
+        print()
+
     for i, col in enumerate(columns, 1):
-        dtype = train_df[col].dtype
-        non_null = train_df[col].notna().sum()
-        null_count = train_df[col].isna().sum()
-        unique = train_df[col].nunique()
-        
-        print(f"{i}. {col}")
+        dtype = col['dtype']
+        null_count = col['missing']
+        unique = col['unique']
+
+        print(f"{i}. {col['name']}")
         print(f"   סוג: {dtype} | Type: {dtype}")
         print(f"   ערכים ייחודיים: {unique:,} | Unique values: {unique:,}")
         print(f"   ערכים חסרים: {null_count:,} | Missing values: {null_count:,}")
         print()
-    
-    # ========== SECTION 3: Label Analysis (GeneType) ==========
+
+
+def _print_labels(summary):
+    """התפלגות GeneType בכל הנתונים ולפי קובץ"""
+    sketch = summary.get('sketch')
     print("=" * 80)
     print("3. ניתוח התיוגים (GeneType) | Label Analysis (GeneType)")
     print("=" * 80)
     print()
-    
-    # Combine all datasets for comprehensive label analysis
-    all_data = pd.concat([train_df, test_df, val_df], ignore_index=True)
-    
+
     print("התפלגות התיוגים בכל הנתונים:")
     print("Label distribution across all data:")
     print()
-    
-    gene_type_counts = all_data['GeneType'].value_counts()
-    total_samples = len(all_data)
-    
+    if sketch:
+        _print_frequency_note(sketch['frequency_error'], sketch['frequency_confidence'])
+
+    gene_type_counts = summary['gene_type_counts']
+    total_samples = summary['total_samples']
+
     print(f"{'GeneType':<30} | {'כמות':<12} | {'אחוז':<10}")
     print(f"{'GeneType':<30} | {'Count':<12} | {'Percent':<10}")
     print("-" * 60)
-    
+
     for gene_type, count in gene_type_counts.items():
         pct = (count / total_samples) * 100
         print(f"{gene_type:<30} | {count:<12,} | {pct:<10.2f}%")
-    
+
     print("-" * 60)
     print(f"{'סה\"כ | Total':<30} | {total_samples:<12,} | {'100.00':<10}%")
     print()
-    
+
     # Label distribution per dataset
     print("התפלגות התיוגים לפי קובץ:")
     print("Label distribution by file:")
     print()
-    
-    datasets = {
-        'train.csv': train_df,
-        'test.csv': test_df,
-        'validation.csv': val_df
-    }
-    
-    gene_types = gene_type_counts.index.tolist()
-    
+
+    datasets = summary['gene_type_by_file']
+
     # Print header
     header = f"{'GeneType':<25}"
     for ds_name in datasets.keys():
         header += f" | {ds_name:<15}"
     print(header)
     print("-" * (25 + 18 * len(datasets)))
-    
-    for gt in gene_types:
+
+    for gt in gene_type_counts.index:
         row = f"{gt:<25}"
-        for ds_name, ds in datasets.items():
-            count = (ds['GeneType'] == gt).sum()
+        for ds_counts in datasets.values():
+            count = int(ds_counts.get(gt, 0))
             row += f" | {count:<15,}"
         print(row)
-    
+
     print()
-    
-    # ========== SECTION 4: GeneGroupMethod Analysis ==========
+
+
+def _print_methods(summary):
+    """התפלגות GeneGroupMethod"""
+    sketch = summary.get('sketch')
+    total_samples = summary['total_samples']
     print("=" * 80)
     print("4. ניתוח GeneGroupMethod | GeneGroupMethod Analysis")
     print("=" * 80)
     print()
-    
-    method_counts = all_data['GeneGroupMethod'].value_counts()
-    
+
+    method_counts = summary['method_counts']
+
+    if sketch:
+        _print_frequency_note(sketch['method_frequency_error'], sketch['frequency_confidence'])
     print(f"{'GeneGroupMethod':<30} | {'כמות':<12} | {'אחוז':<10}")
     print(f"{'GeneGroupMethod':<30} | {'Count':<12} | {'Percent':<10}")
     print("-" * 60)
-    
+
     for method, count in method_counts.items():
         pct = (count / total_samples) * 100
         print(f"{method:<30} | {count:<12,} | {pct:<10.2f}%")
-    
+
     print()
-    
-    # ========== SECTION 5: Sequence Analysis ==========
+
+
+def _print_sequences(summary):
+    """סטטיסטיקות אורך הרצפים"""
     print("=" * 80)
     print("5. ניתוח רצפי DNA | DNA Sequence Analysis")
     print("=" * 80)
     print()
-    
-    # Calculate sequence lengths (removing < and > markers)
-    def get_seq_length(seq):
-        if pd.isna(seq):
-            return 0
-        seq = str(seq).strip('<>').strip()
-        return len(seq)
-    
-    all_data['seq_length'] = all_data['NucleotideSequence'].apply(get_seq_length)
-    
+
+    # seq_length excludes the < and > markers
+    length = summary['length']
+
     print("סטטיסטיקות אורך הרצפים:")
     print("Sequence length statistics:")
     print()
-    print(f"  אורך מינימלי | Min length:    {all_data['seq_length'].min():,}")
-    print(f"  אורך מקסימלי | Max length:    {all_data['seq_length'].max():,}")
-    print(f"  אורך ממוצע | Mean length:     {all_data['seq_length'].mean():,.2f}")
-    print(f"  חציון | Median length:        {all_data['seq_length'].median():,.0f}")
-    print(f"  סטיית תקן | Std deviation:   {all_data['seq_length'].std():,.2f}")
+    print(f"  אורך מינימלי | Min length:    {length['min']:,}")
+    print(f"  אורך מקסימלי | Max length:    {length['max']:,}")
+    print(f"  אורך ממוצע | Mean length:     {length['mean']:,.2f}")
+    print(f"  חציון | Median length:        {length['median']:,.0f}")
+    print(f"  סטיית תקן | Std deviation:   {length['std']:,.2f}")
     print()
-    
+
     # Sequence length by GeneType
     print("אורך רצף ממוצע לפי סוג גן:")
     print("Average sequence length by GeneType:")
     print()
-    
-    seq_by_type = all_data.groupby('GeneType')['seq_length'].agg(['mean', 'min', 'max', 'count'])
-    seq_by_type = seq_by_type.sort_values('count', ascending=False)
-    
+
+    seq_by_type = summary['length_by_type']
+
     print(f"{'GeneType':<25} | {'ממוצע':<10} | {'מינ':<8} | {'מקס':<10} | {'כמות':<10}")
     print(f"{'GeneType':<25} | {'Mean':<10} | {'Min':<8} | {'Max':<10} | {'Count':<10}")
     print("-" * 75)
-    
+
     for gt, row in seq_by_type.iterrows():
         print(f"{gt:<25} | {row['mean']:<10.1f} | {row['min']:<8.0f} | {row['max']:<10.0f} | {row['count']:<10.0f}")
-    
+
     print()
-    
-    # ========== SECTION 6: Sample Data ==========
+
+
+def _print_sample(summary):
+    """שורות לדוגמה"""
     print("=" * 80)
     print("6. דוגמאות מהנתונים | Sample Data")
     print("=" * 80)
     print()
-    
-    print("5 שורות ראשונות מקובץ train.csv:")
-    print("First 5 rows from train.csv:")
+
+    first_file = next(iter(summary['files']))
+    n_sample = len(summary['sample'])
+    print(f"{n_sample} שורות ראשונות מקובץ {first_file}:")
+    print(f"First {n_sample} rows from {first_file}:")
     print()
-    
-    sample_df = train_df.head().copy()
+
+    sample_df = summary['sample'].copy()
     sample_df['NucleotideSequence'] = sample_df['NucleotideSequence'].apply(
         lambda x: str(x)[:50] + '...' if len(str(x)) > 50 else x
     )
     print(sample_df.to_string())
     print()
-    
-    # ========== SUMMARY ==========
+
+
+def _print_quality(summary):
+    """מספר הרשומות שסומנו ב-quality.py והוצאו מהדוח"""
+    quality = summary.get('quality')
+    if quality is None:
+        return
+    print("=" * 80)
+    print("7. דגלי איכות | Quality Flags")
+    print("=" * 80)
+    print()
+    print(f"רשומות מסומנות שהוצאו מהדוח: {quality['flagged']:,}")
+    print(f"Flagged records left out of this report: {quality['flagged']:,}")
+    print()
+
+    print(f"{'דגל | Flag':<30} | {'כמות | Count':<15}")
+    print("-" * 50)
+    for flag, count in quality['by_flag'].items():
+        print(f"{flag:<30} | {count:<15,}")
+    print("(רשומה יכולה לשאת כמה דגלים | a record can carry several flags)")
+    print()
+
+    print(f"{'קובץ | File':<30} | {'כמות | Count':<15}")
+    print("-" * 50)
+    for fname, count in quality['by_file'].items():
+        print(f"{fname:<30} | {count:<15,}")
+    print()
+
+
+def _print_conclusion(summary):
+    """סיכום במספרים"""
+    total_samples = summary['total_samples']
+    gene_type_counts = summary['gene_type_counts']
+    length = summary['length']
     print("=" * 80)
     print("סיכום | Summary")
     print("=" * 80)
@@ -208,14 +487,201 @@ def generate_summary_report():
     print(f"• סוג הגן הנפוץ ביותר: {gene_type_counts.index[0]} ({gene_type_counts.iloc[0]:,} דגימות)")
     print(f"  Most common gene type: {gene_type_counts.index[0]} ({gene_type_counts.iloc[0]:,} samples)")
     print()
-    print(f"• אורך רצף ממוצע: {all_data['seq_length'].mean():.1f} נוקלאוטידים")
-    print(f"  Average sequence length: {all_data['seq_length'].mean():.1f} nucleotides")
+    print(f"• אורך רצף ממוצע: {length['mean']:.1f} נוקלאוטידים")
+    print(f"  Average sequence length: {length['mean']:.1f} nucleotides")
+    print()
+
+
+# חלקי הדוח לפי הסדר - כל חלק נמדד כשלב נפרד
+REPORT_SECTIONS = [
+    ('overview', _print_overview),
+    ('variables', _print_variables),
+    ('labels', _print_labels),
+    ('methods', _print_methods),
+    ('sequences', _print_sequences),
+    ('sample', _print_sample),
+    ('quality', _print_quality),
+    ('conclusion', _print_conclusion),
+]
+
+
+def print_report(summary):
+    """הדפסת הדוח הדו-לשוני מתוך אובייקט הסיכום"""
+    print("=" * 80)
+    print("דוח מסכם - נתוני DNA")
+    print("DNA Dataset Summary Report")
+    print("=" * 80)
     print()
-    
+
+    for name, section in REPORT_SECTIONS:
+        with stage(f"print_report:{name}"):
+            section(summary)
+
     print("=" * 80)
     print("סוף הדוח | End of Report")
     print("=" * 80)
 
-if __name__ == "__main__":
-    generate_summary_report()
+def _json_default(value):
+    if isinstance(value, np.integer):
+        return int(value)
+    if isinstance(value, np.floating):
+        return float(value)
+    if isinstance(value, np.bool_):
+        return bool(value)
+    return str(value)
+
+
+def summary_to_dict(summary):
+    """אובייקט הסיכום כמבנה JSON (ללא pandas)"""
+    total = summary['total_samples']
+    return {
+        'files': summary['files'],
+        'total_samples': total,
+        'columns': summary['columns'],
+        'gene_type_counts': {gt: {'count': int(c), 'percent': c / total * 100}
+                             for gt, c in summary['gene_type_counts'].items()},
+        'gene_type_by_file': {fname: {gt: int(c) for gt, c in counts.items()}
+                              for fname, counts in summary['gene_type_by_file'].items()},
+        'method_counts': {m: {'count': int(c), 'percent': c / total * 100}
+                          for m, c in summary['method_counts'].items()},
+        'length': summary['length'],
+        'length_by_type': summary['length_by_type'].to_dict(orient='index'),
+        'sample': summary['sample'].reset_index().to_dict(orient='records'),
+        **({'sketch': summary['sketch']} if 'sketch' in summary else {}),
+        **({'quality': summary['quality']} if 'quality' in summary else {}),
+    }
+
+
+def summary_tables(summary):
+    """אובייקט הסיכום כטבלאות (שם קובץ CSV -> DataFrame)"""
+    total = summary['total_samples']
+
+    def counts_table(counts, name):
+        table = counts.rename('count').rename_axis(name).to_frame()
+        table['percent'] = table['count'] / total * 100
+        return table
+
+    by_file = pd.DataFrame(summary['gene_type_by_file']).reindex(summary['gene_type_counts'].index)
+    tables = {
+        'files.csv': pd.DataFrame.from_dict(summary['files'], orient='index').rename_axis('file'),
+        'columns.csv': pd.DataFrame(summary['columns']).set_index('name'),
+        'gene_type_counts.csv': counts_table(summary['gene_type_counts'], 'GeneType'),
+        'gene_type_by_file.csv': by_file.fillna(0).astype('int64').rename_axis('GeneType'),
+        'method_counts.csv': counts_table(summary['method_counts'], 'GeneGroupMethod'),
+        'length.csv': pd.Series(summary['length'], name='value').rename_axis('statistic').to_frame(),
+        'length_by_type.csv': summary['length_by_type'].rename_axis('GeneType'),
+    }
+    if 'quality' in summary:
+        tables['quality_flags.csv'] = pd.Series(summary['quality']['by_flag'], name='count').rename_axis('flag') \
+            .to_frame()
+    return tables
+
+
+def write_outputs(summary, text, output_dir, formats=OUTPUT_FORMATS):
+    """שמירת הדוח: טקסט דו-לשוני, JSON ו/או טבלאות CSV - מחזיר את הנתיבים"""
+    os.makedirs(output_dir, exist_ok=True)
+    written = []
+    if 'text' in formats:
+        path = os.path.join(output_dir, 'summary_report.txt')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        written.append(path)
+    if 'json' in formats:
+        path = os.path.join(output_dir, 'summary.json')
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(summary_to_dict(summary), f, indent=2, ensure_ascii=False, default=_json_default)
+        written.append(path)
+    if 'csv' in formats:
+        for fname, table in summary_tables(summary).items():
+            path = os.path.join(output_dir, fname)
+            table.to_csv(path)
+            written.append(path)
+    return written
 
+
+def generate_summary_report(data_dir=DATA_DIR, streaming=False, chunk_size=CHUNK_SIZE, incremental=True,
+                            split_files=None, sample_size=SAMPLE_SIZE, workers=1,
+                            output_dir=None, formats=OUTPUT_FORMATS, sketch=False, exclude_flagged=False):
+    """בניית הסיכום, הדפסת הדוח ושמירת הפלטים (אם ניתנה תיקיית פלט)"""
+    keep = quality = None
+    if exclude_flagged:
+        with stage('quality'):
+            keep, quality = flagged_records(data_dir, split_files)
+    if streaming:
+        # Read the CSVs in chunks and keep only mergeable accumulators
+        summary = summarize_stream(data_dir, chunk_size, split_files, sample_size, workers, sketch, keep)
+    elif incremental:
+        # Reuse the cached per-file partials of every split that did not change
+        summary, _ = summarize_incremental(data_dir, split_files, sample_size, workers, sketch, keep)
+    else:
+        # Load every split (parsed once, then served from the columnar cache)
+        partials = summarize_splits(data_dir, split_files, sample_size=sample_size, workers=workers,
+                                    sketch=sketch, keep=keep)
+        with stage('combine'):
+            summary = combine(partials)
+    if quality is not None:
+        summary['quality'] = quality
+
+    with stage('print_report', rows=summary['total_samples']):
+        buffer = io.StringIO()
+        with contextlib.redirect_stdout(buffer):
+            print_report(summary)
+        text = buffer.getvalue()
+        print(text, end='')
+
+    if output_dir:
+        for path in write_outputs(summary, text, output_dir, formats):
+            print(f"✅ Saved: {path}")
+    return summary
+
+def parse_split_files(items):
+    """--files: 'train.csv' (שם הסט מתוך שם הקובץ) או 'train=my_train.csv'"""
+    split_files = {}
+    for item in items:
+        name, sep, fname = item.partition('=')
+        if not sep:
+            fname = item
+            name = os.path.splitext(os.path.basename(item))[0]
+        split_files[name] = fname
+    return split_files
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="DNA Data Summary Report Generator")
+    parser.add_argument('--data-dir', default=DATA_DIR, help="directory holding the split CSV files")
+    parser.add_argument('--output-dir', default=None,
+                        help="also save the report and machine-readable summary here")
+    parser.add_argument('--files', nargs='+', metavar='[NAME=]FILE',
+                        help="split files to summarize (default: train.csv test.csv validation.csv)")
+    parser.add_argument('--format', nargs='+', choices=OUTPUT_FORMATS, default=list(OUTPUT_FORMATS),
+                        dest='formats', help="outputs written to --output-dir")
+    parser.add_argument('--sample-size', type=int, default=SAMPLE_SIZE, help="rows shown in the sample section")
+    parser.add_argument('--workers', type=int, default=1, help="summarize files in parallel processes")
+    parser.add_argument('--stream', action='store_true', help="read the CSVs in chunks (constant memory)")
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help="rows per chunk with --stream")
+    parser.add_argument('--force', action='store_true', help="recompute every file instead of reusing partials")
+    parser.add_argument('--sketch', action='store_true',
+                        help="approximate unique/value counts with HyperLogLog and Count-Min (constant memory)")
+    parser.add_argument('--exclude-flagged', action='store_true',
+                        help="leave out records flagged by quality.py and report how many were flagged")
+    parser.add_argument('--trace', metavar='PATH',
+                        help="write per-stage timings (*.jsonl = JSON lines, otherwise Chrome trace)")
+    parser.add_argument('--trace-memory', action='store_true', help="also record tracemalloc peaks (slower)")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.trace:
+        instrumentation.enable(args.trace, memory=args.trace_memory)
+    split_files = parse_split_files(args.files) if args.files else None
+    if args.exclude_flagged and split_files and not split_files.items() <= SPLIT_FILES.items():
+        raise SystemExit("❌ --exclude-flagged works only with the default split files")
+    with stage('report'):
+        generate_summary_report(args.data_dir, streaming=args.stream, chunk_size=args.chunk_size,
+                                incremental=not args.force, split_files=split_files,
+                                sample_size=args.sample_size, workers=args.workers,
+                                output_dir=args.output_dir, formats=args.formats, sketch=args.sketch,
+                                exclude_flagged=args.exclude_flagged)
+    instrumentation.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Grouped Statistics
+סטטיסטיקות לכל קבוצה (GeneType, סט) במעבר אחד על קודים קטגוריאליים
+
+Groups are turned into integer codes once; counts and moments come from
+``bincount`` over those codes, and min/max/quantiles from a single sort by
+(group, value). Histograms use one ``bincount`` over (group, bin) keys with
+the same binning rule as ``np.histogram``. Nothing loops over the classes,
+so the cost does not grow with the number of GeneTypes or splits.
+"""
+
+import numpy as np
+import pandas as pd
+
+QUANTILES = (0.25, 0.5, 0.75)
+
+
+def group_codes(values, order=None):
+    """קוד שלם לכל ערך ורשימת הקבוצות (לפי order, או ממוין); חסר/לא ידוע = -1"""
+    if isinstance(getattr(values, 'dtype', None), pd.CategoricalDtype) and order is None:
+        return np.asarray(values.cat.codes, dtype=np.int64), list(values.cat.categories)
+    codes, uniques = pd.factorize(pd.Series(values, copy=False), sort=order is None)
+    codes = codes.astype(np.int64)
+    if order is None:
+        return codes, list(uniques)
+    # מיפוי הקודים של factorize לסדר המבוקש (ערך שלא ברשימה = -1)
+    remap = np.append(pd.Index(list(order)).get_indexer(uniques), -1)
+    return remap[codes], list(order)
+
+
+def _keys(groups, splits, group_order, split_order):
+    """קוד משולב (קבוצה, סט) ותוויות האינדקס"""
+    codes, labels = group_codes(groups, group_order)
+    if splits is None:
+        return codes, len(labels), pd.Index(labels, name=getattr(groups, 'name', None))
+    split_ids, split_labels = group_codes(splits, split_order)
+    keys = np.where((codes >= 0) & (split_ids >= 0), codes * len(split_labels) + split_ids, -1)
+    index = pd.MultiIndex.from_product(
+        [labels, split_labels], names=[getattr(groups, 'name', None), getattr(splits, 'name', None)])
+    return keys, len(labels) * len(split_labels), index
+
+
+def group_moments(values, keys, n_keys):
+    """count, mean, m2, min, max לכל מפתח 0..n_keys-1 (ערכים עם מפתח שלילי מושמטים)"""
+    values = np.asarray(values, dtype=np.float64)
+    keys = np.asarray(keys, dtype=np.int64)
+    valid = (keys >= 0) & ~np.isnan(values)
+    values, keys = values[valid], keys[valid]
+
+    count = np.bincount(keys, minlength=n_keys)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.bincount(keys, weights=values, minlength=n_keys) / count
+    m2 = np.bincount(keys, weights=(values - mean[keys]) ** 2, minlength=n_keys)
+
+    # מיון לפי ערך ואז מיון יציב לפי מפתח (radix על מספר שלם קטן) - מהיר בהרבה מ-lexsort
+    order = np.argsort(values)
+    small = np.min_scalar_type(max(n_keys - 1, 0))
+    order = order[np.argsort(keys[order].astype(small), kind='stable')]
+    ordered = values[order]
+    starts = np.cumsum(count) - count
+    present = count > 0
+    minimum = np.full(n_keys, np.nan)
+    maximum = np.full(n_keys, np.nan)
+    minimum[present] = ordered[starts[present]]
+    maximum[present] = ordered[starts[present] + count[present] - 1]
+    return {'count': count, 'mean': mean, 'm2': m2, 'min': minimum, 'max': maximum,
+            '_sorted': ordered, '_starts': starts}
+
+
+def _quantile(moments, q):
+    """אחוזון מדויק עם אינטרפולציה לינארית (כמו pandas) לכל מפתח"""
+    count, ordered, starts = moments['count'], moments['_sorted'], moments['_starts']
+    result = np.full(len(count), np.nan)
+    present = count > 0
+    pos = q * (count[present] - 1)
+    lo = np.floor(pos).astype(np.int64)
+    hi = np.ceil(pos).astype(np.int64)
+    base = starts[present]
+    result[present] = ordered[base + lo] + (ordered[base + hi] - ordered[base + lo]) * (pos - lo)
+    return result
+
+
+def quantile_label(q):
+    return 'median' if q == 0.5 else f"q{round(q * 100):02d}"
+
+
+def grouped_stats(values, groups, splits=None, quantiles=QUANTILES, group_order=None, split_order=None):
+    """count/mean/std/min/max ואחוזונים לכל קבוצה (או לכל קבוצה וסט)
+
+    Returns a DataFrame indexed by group (or by (group, split) when
+    ``splits`` is given); groups without values are left out, like
+    ``groupby``. ``std`` is the sample standard deviation (ddof=1).
+    """
+    keys, n_keys, index = _keys(groups, splits, group_order, split_order)
+    moments = group_moments(values, keys, n_keys)
+    count = moments['count']
+    with np.errstate(invalid='ignore', divide='ignore'):
+        std = np.where(count > 1, np.sqrt(moments['m2'] / (count - 1)), np.nan)
+
+    stats = pd.DataFrame({'count': count, 'mean': moments['mean'], 'std': std,
+                          'min': moments['min'], 'max': moments['max']}, index=index)
+    for q in quantiles:
+        stats[quantile_label(q)] = _quantile(moments, q)
+    return stats[count > 0]
+
+
+def grouped_histogram(values, groups, bins=30, group_order=None, value_range=None):
+    """היסטוגרמה לכל קבוצה - מחזיר (ספירות [קבוצות x bins], גבולות [קבוצות x bins+1], תוויות)
+
+    By default each group gets its own range (its min..max), exactly like
+    calling ``np.histogram(group_values, bins)`` per group; pass
+    ``value_range`` for shared edges.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    codes, labels = group_codes(groups, group_order)
+    valid = (codes >= 0) & ~np.isnan(values)
+    values, codes = values[valid], codes[valid]
+    n_groups = len(labels)
+
+    if value_range is not None:
+        lo = np.full(n_groups, float(value_range[0]))
+        hi = np.full(n_groups, float(value_range[1]))
+    else:
+        moments = group_moments(values, codes, n_groups)
+        lo = np.where(moments['count'] > 0, moments['min'], 0.0)
+        hi = np.where(moments['count'] > 0, moments['max'], 1.0)
+        flat = lo == hi
+        lo[flat] -= 0.5
+        hi[flat] += 0.5
+    edges = np.linspace(lo, hi, bins + 1, axis=1)
+
+    # אותו כלל כמו np.histogram: bin לפי נרמול ותיקון לפי הגבולות
+    inside = (values >= lo[codes]) & (values <= hi[codes])
+    values, codes = values[inside], codes[inside]
+    index = ((values - lo[codes]) * (bins / (hi - lo))[codes]).astype(np.int64)
+    index[index == bins] -= 1
+    index -= values < edges[codes, index]
+    index += (values >= edges[codes, index + 1]) & (index != bins - 1)
+
+    counts = np.bincount(codes * bins + index, minlength=n_groups * bins)
+    return counts.reshape(n_groups, bins), edges, labels
@@ -0,0 +1,327 @@
+"""
+Interactive HTML Report
+בניית interactive_report.html ישירות מהנתונים
+
+The page is rendered from ``report_template.html``. Only pre-aggregated data
+is embedded: class and split counts, leakage overlaps, a fixed-size length
+histogram, per-GeneType length quantiles (``grouped_stats``) and a stratified
+sample of (length, GC) points - so the file stays a few tens of KB no matter
+how many rows the dataset has. Chart.js is inlined from a local copy
+(``--chartjs`` / ``DNA_CHARTJS`` / ``vendor/chart.umd.min.js``) so the page
+works without network access; without one the build fails unless a script URL
+is given explicitly with ``--chartjs-url``.
+
+Chart.js is not shipped with the repository: download ``chart.umd.min.js``
+(e.g. from the Chart.js releases) into ``vendor/`` or pass its path with
+``--chartjs``, or build a page that loads it from the network with
+``--chartjs-url``. The page itself is a build output and is not tracked.
+"""
+
+import argparse
+import datetime
+import html
+import json
+import os
+from string import Template
+
+import numpy as np
+import pandas as pd
+
+from data_loader import DATA_DIR, ingest_table, load_splits
+from features import load_features
+from grouped_stats import group_codes, grouped_stats
+from ingest import GENE_TYPES
+import instrumentation
+from instrumentation import stage
+from leakage import exact_overlap, sequence_fingerprints
+from quality import FLAG_COLUMNS, MIN_LENGTH, load_quality
+
+TEMPLATE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'report_template.html')
+CHARTJS_ENV = 'DNA_CHARTJS'
+CHARTJS_DEFAULT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'vendor', 'chart.umd.min.js')
+CHARTJS_CDN = 'https://cdn.jsdelivr.net/npm/chart.js'
+
+LENGTH_BINS = 40
+# נקודות לכל GeneType בתרשים הפיזור (דגימה אקראית, כדי שגם סוגים נדירים יופיעו)
+POINTS_PER_TYPE = 250
+PIE_TYPES = 5
+SPLIT_LABELS = {'train': 'Train', 'test': 'Test', 'validation': 'Validation'}
+
+
+def _sample_per_group(codes, n_groups, per_group, seed=42):
+    """אינדקסים של עד per_group שורות אקראיות מכל קבוצה (לפי הסדר האקראי)"""
+    rng = np.random.default_rng(seed)
+    order = rng.permutation(len(codes))
+    order = order[codes[order] >= 0]
+    order = order[np.argsort(codes[order], kind='stable')]
+    counts = np.bincount(codes[order], minlength=n_groups)
+    starts = np.cumsum(counts) - counts
+    rank = np.arange(len(order)) - starts[codes[order]]
+    return order[rank < per_group]
+
+
+def redundant_columns(splits):
+    """עמודות בלי מידע למודל: ערך יחיד בכל הנתונים, או מזהה מספרי ייחודי לכל שורה בכל סט"""
+    frames = list(splits.values())
+    redundant = []
+    for col in frames[0].columns:
+        if col in ('GeneType', 'NucleotideSequence'):
+            continue
+        constant = len(set().union(*(df[col].unique().tolist() for df in frames))) <= 1
+        identifier = pd.api.types.is_integer_dtype(frames[0][col]) and all(df[col].is_unique for df in frames)
+        if constant or identifier:
+            redundant.append(col)
+    return redundant
+
+
+def report_payload(features, splits, ingest, leakage=None, bins=LENGTH_BINS,
+                   points_per_type=POINTS_PER_TYPE, seed=42, quality=None):
+    """הנתונים המצומצמים שהדף צריך (מבנה JSON קטן, בלי שורות גולמיות)
+
+    ``splits`` maps split name -> frame with ``NucleotideSequence``;
+    ``quality`` is the optional flag table from ``quality.load_quality``.
+    Returns a dict; its size depends on the number of classes and bins, not rows.
+    """
+    lengths = features['seq_length'].to_numpy()
+    codes, labels = group_codes(features['GeneType'], GENE_TYPES)
+    counts = np.bincount(codes[codes >= 0], minlength=len(labels))
+    present = [i for i in np.argsort(-counts, kind='stable') if counts[i] > 0]
+    total = int(counts.sum())
+
+    top = present[:PIE_TYPES]
+    rest = counts[present[PIE_TYPES:]].sum()
+    share_labels = [labels[i] for i in top] + (['Other types'] if rest else [])
+    share = [counts[i] / total * 100 for i in top] + ([rest / total * 100] if rest else [])
+
+    fingerprints = {name: sequence_fingerprints(df['NucleotideSequence']) for name, df in splits.items()}
+    if leakage is None:
+        leakage = exact_overlap(fingerprints)
+    # חלק השורות בכל סט שהרצף שלהן כבר מופיע ב-train
+    in_train = {name: round(float(np.isin(fp, fingerprints['train']).mean()), 4) if len(fp) else 0.0
+                for name, fp in fingerprints.items() if name != 'train' and 'train' in fingerprints}
+
+    hist_counts, edges = np.histogram(lengths, bins=np.linspace(0, max(int(lengths.max(initial=0)), 1), bins + 1))
+    by_type = grouped_stats(features['seq_length'], features['GeneType'], group_order=GENE_TYPES)
+    by_type = by_type.loc[[labels[i] for i in present]]
+
+    sample = _sample_per_group(codes, len(labels), points_per_type, seed)
+    gc = features['gc_content'].to_numpy()
+    points = [[[int(x), round(float(y), 1)] for x, y in zip(lengths[sample[codes[sample] == i]],
+                                                              gc[sample[codes[sample] == i]])]
+              for i in present]
+
+    bad_rows = int(ingest['repaired'].sum() + ingest['quarantined'].sum()) if len(ingest) else 0
+    return {
+        'summary': {
+            'total_samples': len(features),
+            'n_types': len(present),
+            'mean_length': round(float(lengths.mean()), 1) if len(lengths) else 0.0,
+            'min_length': int(lengths.min(initial=0)),
+            'max_length': int(lengths.max(initial=0)),
+            'short_sequences': int((lengths < MIN_LENGTH).sum()),
+            'ingest_rows': int(ingest['rows'].sum()) if len(ingest) else 0,
+            'bad_rows': bad_rows,
+            'in_train': in_train,
+            'redundant_columns': redundant_columns(splits),
+            'quality': ({flag: int(quality[flag].sum()) for flag in FLAG_COLUMNS + ['flagged']}
+                        if quality is not None else None),
+        },
+        'gene_types': {'labels': [labels[i] for i in present], 'counts': [int(counts[i]) for i in present]},
+        'gene_type_share': {'labels': share_labels, 'percent': [round(float(p), 1) for p in share]},
+        'splits': {'labels': [SPLIT_LABELS.get(name, name) for name in splits],
+                   'counts': [len(df) for df in splits.values()]},
+        'leakage': {'labels': [f"{SPLIT_LABELS.get(a, a)} ∩ {SPLIT_LABELS.get(b, b)}" for a, b in leakage],
+                    'counts': [int(c) for c in leakage.values()],
+                    'pairs': [list(pair) for pair in leakage]},
+        'length_hist': {'edges': [int(round(e)) for e in edges], 'counts': hist_counts.tolist()},
+        'length_by_type': {'labels': list(by_type.index),
+                           **{col: [round(float(v), 1) for v in by_type[col]]
+                              for col in ('mean', 'median', 'q25', 'q75')}},
+        'scatter': {'labels': [labels[i] for i in present], 'points': points,
+                    'shown': int(len(sample)), 'total': len(features)},
+    }
+
+
+def chart_script(chart_js=None, chart_url=None):
+    """תגית ה-script של Chart.js - מוטמעת מקובץ מקומי, או קישור רק אם ביקשו במפורש
+
+    Without a local copy (``--chartjs``, ``$DNA_CHARTJS`` or
+    ``vendor/chart.umd.min.js``) this raises instead of silently linking the
+    CDN, since such a page shows no charts on a machine without network.
+    """
+    if chart_url is not None:
+        return f'<script src="{html.escape(chart_url)}"></script>', False
+    path = chart_js or os.environ.get(CHARTJS_ENV) or CHARTJS_DEFAULT
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Chart.js not found: {path} - pass --chartjs PATH, set ${CHARTJS_ENV}, "
+                                f"or use --chartjs-url {CHARTJS_CDN} for a page that needs network access")
+    with open(path, encoding='utf-8') as f:
+        source = f.read().replace('</script', '<\\/script')
+    return f"<script>{source}</script>", True
+
+
+def _issue_row(issue, severity, badge, extent, fix):
+    return (f"                    <tr>\n"
+            f"                        <td>{issue}</td>\n"
+            f"                        <td><span class=\"badge badge-{badge}\">{severity}</span></td>\n"
+            f"                        <td>{extent}</td>\n"
+            f"                        <td>{fix}</td>\n"
+            f"                    </tr>")
+
+
+def render_html(payload, script):
+    """מילוי התבנית - טקסטים ומספרים מהנתונים, והנתונים לתרשימים כ-JSON"""
+    s = payload['summary']
+    types = payload['gene_types']
+    by_type = payload['length_by_type']
+    leakage = dict(zip(map(tuple, payload['leakage']['pairs']), payload['leakage']['counts']))
+    leaked = leakage.get(('train', 'test'), 0)
+    in_train = s['in_train']
+
+    if len(types['counts']) >= 2:
+        top_two = (types['counts'][0] + types['counts'][1]) / max(s['total_samples'], 1) * 100
+        gene_type_insight = (f"שני סוגי הגנים הנפוצים ביותר - {types['labels'][0]} ו-{types['labels'][1]} - "
+                             f"מהווים יחד כ-{top_two:.0f}% מכלל הנתונים.\n"
+                             f"                   זה מצביע על חוסר איזון משמעותי שדורש טיפול מיוחד בבניית המודל.")
+    else:
+        gene_type_insight = "יש פחות משני סוגי גנים בנתונים."
+
+    if any(leakage.values()):
+        lines = [f"<strong>{in_train['test']:.0%} מהרצפים ב-Test כבר נמצאים ב-Train!</strong>"] \
+            if 'test' in in_train else []
+        lines += [f"{share:.0%} מהרצפים ב-{SPLIT_LABELS.get(name, name)} נמצאים ב-Train!"
+                  for name, share in in_train.items() if name != 'test']
+        leakage_box = ('<div class="warning-box">\n'
+                       '                <h4>⚠️ בעיה קריטית: זליגת נתונים</h4>\n'
+                       f"                <p>{'<br>'.join(lines)}<br>\n"
+                       '                   זה הופך את הערכת המודל לחסרת משמעות - יש ליצור חלוקה חדשה.</p>\n'
+                       '            </div>')
+    else:
+        leakage_box = ('<div class="success-box">\n'
+                       '                <h4>✅ אין זליגת נתונים</h4>\n'
+                       '                <p>אין רצפים משותפים בין הסטים.</p>\n'
+                       '            </div>')
+
+    findings = [f"• אורך רצפים נע בין {s['min_length']:,} ל-{s['max_length']:,} נוקלאוטידים"]
+    if by_type['labels']:
+        longest = int(np.argmax(by_type['mean']))
+        shortest = int(np.argmin(by_type['mean']))
+        findings += [f"• רצפי {by_type['labels'][longest]} הם הארוכים ביותר (ממוצע: {by_type['mean'][longest]:.0f})",
+                     f"• רצפי {by_type['labels'][shortest]} הם הקצרים ביותר (ממוצע: {by_type['mean'][shortest]:.0f})"]
+    findings.append(f"• {s['short_sequences']:,} רצפים קצרים מ-{MIN_LENGTH} נוקלאוטידים שכדאי לסנן")
+
+    ratio = types['counts'][0] / types['counts'][-1] if types['counts'] else 0
+    imbalance_insight = (f"יחס בין הקטגוריה הגדולה ({types['labels'][0]}: {types['counts'][0]:,}) "
+                         f"לקטנה ({types['labels'][-1]}: {types['counts'][-1]:,}) הוא <strong>{ratio:,.0f}:1</strong><br>\n"
+                         f"                   מומלץ להשתמש ב-class weights, SMOTE, או מיזוג קטגוריות נדירות."
+                         if types['counts'] else "אין נתונים.")
+
+    bad_share = s['bad_rows'] / s['ingest_rows'] if s['ingest_rows'] else 0
+    redundant = s['redundant_columns']
+    issues = [
+        _issue_row('זליגת נתונים (Data Leakage)', *(('קריטי', 'critical') if leaked else ('תקין', 'success')),
+                   f"{in_train.get('test', 0):.0%} מ-Test", 'יצירת חלוקה חדשה'),
+        _issue_row('שגיאות פרסור CSV', *(('קריטי', 'critical') if s['bad_rows'] else ('תקין', 'success')),
+                   f"{s['bad_rows']:,} רשומות ({bad_share:.1%})", 'תיקון אוטומטי והסגר (ingest)'),
+        _issue_row('חוסר איזון קטגוריות', 'גבוה', 'warning', f"{ratio:,.0f}:1 יחס", 'Class weights / SMOTE'),
+        _issue_row('רצפים קצרים מדי', 'בינוני', 'info', f"{s['short_sequences']:,} רשומות",
+                   f"סינון רצפים &lt; {MIN_LENGTH}"),
+        *([_issue_row('ארטיפקטים ברצפים', *(('בינוני', 'info') if s['quality']['flagged'] else ('תקין', 'success')),
+                      f"{s['quality']['flagged']:,} רשומות ({s['quality']['low_complexity']:,} מורכבות נמוכה, "
+                      f"{s['quality']['homopolymer']:,} הומופולימרים, {s['quality']['length_outlier']:,} אורך חריג)",
+                      'סינון לפי quality.py (--exclude-flagged)')] if s['quality'] else []),
+        _issue_row('משתנים מיותרים', *(('בינוני', 'info') if redundant else ('תקין', 'success')),
+                   f"{len(redundant)} משתנים", f"הסרת {', '.join(redundant)}" if redundant else '-'),
+    ]
+
+    with open(TEMPLATE_PATH, encoding='utf-8') as f:
+        template = Template(f.read())
+    # "</" בתוך ה-JSON היה סוגר את תגית ה-script
+    data = json.dumps(payload, ensure_ascii=False, separators=(',', ':')).replace('</', '<\\/')
+    return template.substitute(
+        total_samples=f"{s['total_samples']:,}",
+        n_types=s['n_types'],
+        mean_length=f"{s['mean_length']:.0f}",
+        leaked=f"{leaked:,}",
+        leakage_card='warning' if leaked else 'success',
+        bad_rows=f"{s['bad_rows']:,}",
+        parsing_card='warning' if s['bad_rows'] else 'success',
+        gene_type_insight=gene_type_insight,
+        leakage_box=leakage_box,
+        length_insight='<br>\n                   '.join(findings),
+        imbalance_insight=imbalance_insight,
+        issue_rows='\n'.join(issues),
+        generated=datetime.date.today().isoformat(),
+        chart_script=script,
+        payload=data,
+    )
+
+
+def build_report(data_dir=DATA_DIR, output='interactive_report.html', script=None,
+                 points_per_type=POINTS_PER_TYPE, seed=42, exclude_flagged=False):
+    """טעינת הנתונים (מהמטמון), חישוב הנתונים המצומצמים וכתיבת הדף"""
+    if script is None:
+        script, _ = chart_script()
+    with stage('load_data') as span:
+        train, test, val, all_data = load_splits(data_dir)
+        span.rows = len(all_data)
+    with stage('features', rows=len(all_data)):
+        features = load_features(all_data, data_dir)
+    with stage('quality', rows=len(all_data)):
+        quality = load_quality(all_data, data_dir)
+    if exclude_flagged:
+        features = features[~quality['flagged'].to_numpy()]
+    with stage('payload', rows=len(all_data)):
+        splits = {'train': train, 'test': test, 'validation': val}
+        payload = report_payload(features, splits, ingest_table(data_dir),
+                                 points_per_type=points_per_type, seed=seed, quality=quality)
+    with stage('render_html'):
+        page = render_html(payload, script)
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        f.write(page)
+    return output, len(page.encode('utf-8'))
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Build interactive_report.html from the data",
+        epilog=f"Chart.js is not shipped: put chart.umd.min.js in {os.path.dirname(CHARTJS_DEFAULT)}, pass "
+               f"--chartjs PATH or set ${CHARTJS_ENV} - or use --chartjs-url {CHARTJS_CDN} for a page that "
+               f"needs network access.")
+    parser.add_argument('--data-dir', default=DATA_DIR, help="directory holding the split CSV files")
+    parser.add_argument('--output', default='interactive_report.html')
+    parser.add_argument('--chartjs', metavar='PATH',
+                        help=f"Chart.js file to inline (default: ${CHARTJS_ENV} or vendor/chart.umd.min.js, "
+                             f"which is not shipped - one of them is required unless --chartjs-url is given)")
+    parser.add_argument('--chartjs-url', metavar='URL',
+                        help=f"load Chart.js from this URL instead of inlining it (e.g. {CHARTJS_CDN})")
+    parser.add_argument('--points-per-type', type=int, default=POINTS_PER_TYPE,
+                        help="sampled scatter points per GeneType")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--exclude-flagged', action='store_true',
+                        help="leave records flagged by quality.py out of the length/GC charts")
+    parser.add_argument('--trace', metavar='PATH',
+                        help="write per-stage timings (*.jsonl = JSON lines, otherwise Chrome trace)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.trace:
+        instrumentation.enable(args.trace)
+    try:
+        script, inlined = chart_script(args.chartjs, args.chartjs_url)
+    except FileNotFoundError as e:
+        raise SystemExit(f"❌ {e}")
+    path, size = build_report(args.data_dir, args.output, script, args.points_per_type, args.seed,
+                              args.exclude_flagged)
+    if not inlined:
+        print(f"⚠️  Chart.js is not inlined - the page loads it from {args.chartjs_url} "
+              f"(pass --chartjs or put it in {CHARTJS_DEFAULT} for offline viewing)")
+    print(f"✅ Saved: {path} ({size / 1024:,.0f} KB)")
+    instrumentation.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""
+Validating CSV Ingest
+בדיקה ותיקון של שורות פגומות בקבצי ה-CSV לפני הטעינה
+
+The raw files contain rows whose ``Description`` holds unquoted commas, which
+shifts every following field ("GeneType" values such as `` pseudogene"``).
+Each file is streamed once through the C ``csv`` reader and every row is
+checked for arity, the ``<...>`` sequence marker, a numeric gene ID and the
+GeneType and GeneGroupMethod vocabularies. Shifted rows are repaired by
+folding the surplus fields back into ``Description`` and stray quotes are
+stripped from the categorical fields; rows that cannot be repaired go to a
+quarantine file, with the raw fields re-quoted so the row reads back as it
+was. The summary counts every repair and error type.
+"""
+
+import csv
+import io
+import os
+import re
+import sys
+from collections import Counter
+
+# אוצר המילים של GeneType (לפי סדר השכיחות בנתונים)
+GENE_TYPES = [
+    'PSEUDO', 'BIOLOGICAL_REGION', 'ncRNA', 'snoRNA', 'PROTEIN_CODING',
+    'tRNA', 'OTHER', 'rRNA', 'snRNA', 'scRNA',
+]
+
+# אוצר המילים של GeneGroupMethod (ערכים אחרים הם שדות שזזו)
+GENE_GROUP_METHODS = ['NCBI Ortholog']
+
+# סוג השגיאה לערך שאינו באוצר המילים של העמודה
+CATEGORICAL_ERRORS = {'GeneType': 'unknown_gene_type', 'GeneGroupMethod': 'unknown_gene_group_method'}
+
+REQUIRED_COLUMNS = ('NCBIGeneID', 'Description', 'GeneType', 'NucleotideSequence')
+
+# העמודה שמכילה טקסט חופשי - אליה מוחזרים שדות עודפים
+FREE_TEXT_COLUMN = 'Description'
+
+SEQUENCE_RE = re.compile(r'<[A-Za-z]*>')
+
+csv.field_size_limit(min(sys.maxsize, 2 ** 31 - 1))
+
+
+def _strip_quotes(value):
+    """הסרת רווחים ומרכאות שנשארו מציטוט שבור"""
+    value = value.strip()
+    if len(value) >= 2 and value[0] == '"' and value[-1] == '"':
+        value = value[1:-1]
+    return value.replace('""', '"').strip().strip('"').strip()
+
+
+def _merge_free_text(row, column, n_columns):
+    """איחוד השדות העודפים חזרה לעמודת הטקסט החופשי"""
+    extra = len(row) - n_columns
+    merged = _strip_quotes(','.join(row[column:column + extra + 1]))
+    return row[:column] + [merged] + row[column + extra + 1:]
+
+
+def _raw_line(fields):
+    """השדות הגולמיים כשורת CSV אחת (עם ציטוט, כך שפסיקים בשדה נשמרים)"""
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator='').writerow(fields)
+    return buffer.getvalue()
+
+
+def ingest_csv(src, clean_path, quarantine_path, gene_types=GENE_TYPES, group_methods=GENE_GROUP_METHODS):
+    """מעבר יחיד על קובץ גולמי: שורות תקינות/מתוקנות לקובץ נקי, השאר להסגר
+
+    Returns a summary dict: ``rows``, ``clean``, ``repaired``, ``quarantined``
+    and per-type counters ``repairs`` and ``errors``.
+    """
+    vocabularies = {'GeneType': set(gene_types), 'GeneGroupMethod': set(group_methods)}
+    repairs = Counter()
+    errors = Counter()
+    rows = 0
+
+    clean_tmp = clean_path + '.tmp'
+    quarantine_tmp = quarantine_path + '.tmp'
+    with open(src, newline='', encoding='utf-8') as f_in, \
+            open(clean_tmp, 'w', newline='', encoding='utf-8') as f_clean, \
+            open(quarantine_tmp, 'w', newline='', encoding='utf-8') as f_quarantine:
+        reader = csv.reader(f_in)
+        header = next(reader, None)
+        if header is None:
+            raise ValueError(f"{src}: empty file")
+        missing = [col for col in REQUIRED_COLUMNS if col not in header]
+        if missing:
+            raise ValueError(f"{src}: missing columns {missing}")
+
+        n_columns = len(header)
+        free_text = header.index(FREE_TEXT_COLUMN)
+        gene_id = header.index('NCBIGeneID')
+        # (עמודה, אוצר מילים, סוג השגיאה) - GeneGroupMethod נבדקת רק אם קיימת
+        categorical = [(header.index(col), vocabulary, CATEGORICAL_ERRORS[col])
+                       for col, vocabulary in vocabularies.items() if col in header]
+        sequence = header.index('NucleotideSequence')
+
+        clean_writer = csv.writer(f_clean)
+        clean_writer.writerow(header)
+        quarantine_writer = csv.writer(f_quarantine)
+        quarantine_writer.writerow(['line', 'error', 'raw'])
+
+        for raw in reader:
+            if not raw:
+                continue
+            rows += 1
+            row = raw
+            repair = error = None
+
+            if len(row) > n_columns:
+                row = _merge_free_text(row, free_text, n_columns)
+                repair = 'shifted_description'
+            elif len(row) < n_columns:
+                error = 'missing_fields'
+
+            for column, vocabulary, unknown in categorical:
+                if error is None and row[column] not in vocabulary:
+                    fixed = _strip_quotes(row[column])
+                    if fixed in vocabulary:
+                        row[column] = fixed
+                        repair = repair or 'stray_quotes'
+                    else:
+                        error = unknown
+            if error is None and not SEQUENCE_RE.fullmatch(row[sequence]):
+                error = 'bad_sequence_marker'
+            if error is None and not row[gene_id].isdigit():
+                error = 'bad_gene_id'
+
+            if error is not None:
+                errors[error] += 1
+                quarantine_writer.writerow([reader.line_num, error, _raw_line(raw)])
+                continue
+            if repair is not None:
+                repairs[repair] += 1
+            clean_writer.writerow(row)
+
+    os.replace(clean_tmp, clean_path)
+    os.replace(quarantine_tmp, quarantine_path)
+    quarantined = sum(errors.values())
+    return {
+        'rows': rows,
+        'clean': rows - quarantined,
+        'repaired': sum(repairs.values()),
+        'quarantined': quarantined,
+        'repairs': dict(repairs),
+        'errors': dict(errors),
+    }
+
+
+def main():
+    from data_loader import DATA_DIR, SPLIT_FILES, ingest_split
+
+    print("🔍 Validating CSV files...")
+    for name in SPLIT_FILES:
+        path, summary = ingest_split(DATA_DIR, name)
+        print(f"   {SPLIT_FILES[name]:<16} {summary['rows']:>8,} rows | "
+              f"{summary['repaired']:>6,} repaired | {summary['quarantined']:>6,} quarantined")
+        for kind, count in sorted({**summary['repairs'], **summary['errors']}.items()):
+            print(f"      {kind:<24} {count:>8,}")
+    print(f"✅ Clean files and quarantine in: {os.path.dirname(path)}")
+
+
+if __name__ == "__main__":
+    main()
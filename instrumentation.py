@@ -0,0 +1,170 @@
+"""
+Stage Instrumentation
+מדידת זמן, CPU, זיכרון ושורות לכל שלב - נכתב לקובץ trace
+
+Wrap a stage with ``with stage('name', rows=n):``. While tracing is off it
+is a no-op. When it is on (``enable(path)``, or the ``DNA_TRACE``
+environment variable) every span records wall time, CPU time, rows
+processed with throughput and, with ``memory=True``, the stage's own
+tracemalloc peak. ``process_peak_rss_mb`` is the process-wide high-water
+mark (``ru_maxrss``) when the stage ended - it never goes down, so only its
+growth during a stage says anything about that stage. Spans are kept in memory and written
+once by ``close()``: JSON lines for ``*.jsonl``, otherwise the Chrome trace
+format (open in chrome://tracing or Perfetto). Worker processes hand their
+spans back with ``drain()`` and the parent adds them with ``extend()``.
+"""
+
+import atexit
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+TRACE_ENV = 'DNA_TRACE'
+TRACE_MEMORY_ENV = 'DNA_TRACE_MEMORY'
+# התהליך שכותב את הקובץ - תהליכים עובדים רק מעבירים את השלבים שלהם
+TRACE_OWNER_ENV = 'DNA_TRACE_OWNER'
+
+_state = {'path': None, 'memory': False, 'owner': None, 'events': [], 'stack': []}
+
+
+def _peak_rss_mb():
+    """שיא ה-RSS של כל התהליך מתחילתו (MB) - לא של שלב מסוים"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1 << 20 if sys.platform == 'darwin' else 1 << 10), 1)
+
+
+def enabled():
+    return _state['path'] is not None
+
+
+def enable(path, memory=False, owner=None):
+    """הפעלת המדידה; הקובץ נכתב ב-close() או ביציאה מהתוכנית
+
+    Settings are exported to the environment so spawned workers trace too;
+    only the ``owner`` process (default: this one) writes the file.
+    """
+    first = _state['path'] is None
+    _state.update(path=path, memory=memory, owner=owner or os.getpid())
+    os.environ.update({TRACE_ENV: path, TRACE_MEMORY_ENV: '1' if memory else '',
+                       TRACE_OWNER_ENV: str(_state['owner'])})
+    if memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    if first:
+        atexit.register(close)
+
+
+class Span:
+    """שלב פתוח - אפשר לעדכן את rows או להוסיף שדות בתוך הבלוק"""
+
+    def __init__(self, name, rows=None, args=None):
+        self.name = name
+        self.rows = rows
+        self.args = dict(args or {})
+        self.traced_peak = 0
+
+
+@contextmanager
+def stage(name, rows=None, **args):
+    """מדידת בלוק קוד כשלב בשם name"""
+    if not enabled():
+        yield Span(name, rows, args)
+        return
+
+    span = Span(name, rows, args)
+    stack = _state['stack']
+    memory = _state['memory'] and tracemalloc.is_tracing()
+    if memory:
+        if stack:
+            stack[-1].traced_peak = max(stack[-1].traced_peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.reset_peak()
+    stack.append(span)
+    rss_before = _peak_rss_mb()
+    start_wall = time.time()
+    start = time.perf_counter()
+    start_cpu = time.process_time()
+    try:
+        yield span
+    finally:
+        wall = time.perf_counter() - start
+        cpu = time.process_time() - start_cpu
+        stack.pop()
+        event = {
+            'name': name,
+            'start': round(start_wall, 6),
+            'wall_s': round(wall, 6),
+            'cpu_s': round(cpu, 6),
+            'pid': os.getpid(),
+            'tid': threading.get_ident(),
+            'depth': len(stack),
+        }
+        rss_after = _peak_rss_mb()
+        if rss_after is not None:
+            event['process_peak_rss_mb'] = rss_after
+            event['process_rss_growth_mb'] = round(rss_after - rss_before, 1)
+        if memory:
+            span.traced_peak = max(span.traced_peak, tracemalloc.get_traced_memory()[1])
+            event['traced_peak_mb'] = round(span.traced_peak / 1e6, 2)
+            if stack:
+                stack[-1].traced_peak = max(stack[-1].traced_peak, span.traced_peak)
+        if span.rows is not None:
+            event['rows'] = int(span.rows)
+            event['rows_per_s'] = round(span.rows / wall, 1) if wall > 0 else None
+        if span.args:
+            event['args'] = span.args
+        _state['events'].append(event)
+
+
+def drain():
+    """השלבים שנמדדו בתהליך הזה (ומחיקתם) - להעברה מתהליך עובד"""
+    events, _state['events'] = _state['events'], []
+    return events
+
+
+def extend(events):
+    """הוספת שלבים שנמדדו בתהליך אחר"""
+    _state['events'].extend(events)
+
+
+def _chrome_trace(events):
+    """המרה לפורמט Chrome trace (אירועי 'X' עם זמנים במיקרו-שניות)"""
+    origin = min(event['start'] for event in events)
+    trace = []
+    for event in events:
+        args = {k: v for k, v in event.items() if k not in ('name', 'start', 'wall_s', 'pid', 'tid', 'args')}
+        args.update(event.get('args', {}))
+        trace.append({'name': event['name'], 'ph': 'X', 'ts': round((event['start'] - origin) * 1e6),
+                      'dur': round(event['wall_s'] * 1e6), 'pid': event['pid'], 'tid': event['tid'],
+                      'args': args})
+    return {'traceEvents': trace, 'displayTimeUnit': 'ms'}
+
+
+def close():
+    """כתיבת כל השלבים לקובץ ה-trace"""
+    path = _state['path']
+    if path is None or not _state['events'] or _state['owner'] != os.getpid():
+        return
+    events = sorted(_state['events'], key=lambda e: e['start'])
+    with open(path, 'w') as f:
+        if path.endswith('.jsonl'):
+            for event in events:
+                f.write(json.dumps(event) + '\n')
+        else:
+            json.dump(_chrome_trace(events), f)
+    _state['events'] = []
+    print(f"⏱️  Trace written to: {path}", file=sys.stderr)
+
+
+if os.environ.get(TRACE_ENV):
+    enable(os.environ[TRACE_ENV], memory=bool(os.environ.get(TRACE_MEMORY_ENV)),
+           owner=int(os.environ.get(TRACE_OWNER_ENV) or os.getpid()))
@@ -0,0 +1,224 @@
+"""
+k-mer Spectrum Engine
+ספירת k-mers לכל רשומה ולפי GeneType וסט
+
+Sequences are packed into one uint8 buffer (see ``composition``) and every
+window of k bases is rolled into a 2-bit code (A=0, C=1, G=2, T=3).
+Windows touching N or any other symbol are skipped. Counting is limited to
+k <= 8 (65,536 columns): per-record counts come back as a CSR-style sparse
+matrix and aggregated spectra per group are one ``bincount``. Large inputs
+are split across a process pool.
+"""
+
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+
+import numpy as np
+import pandas as pd
+
+from composition import BASE_LUT, encode_sequences
+
+MAX_K = 8
+CHUNK_SIZE = 50000
+
+
+def _check_k(k):
+    if not 1 <= k <= MAX_K:
+        raise ValueError(f"k must be between 1 and {MAX_K}")
+
+
+def kmer_labels(k):
+    """שמות ה-k-mers לפי סדר הקודים (AA..A עד TT..T)"""
+    return [''.join(p) for p in product('ACGT', repeat=k)]
+
+
+def reverse_complement_codes(codes, k):
+    """קוד ה-reverse complement של כל קוד k-mer"""
+    codes = np.asarray(codes, dtype=np.int64)
+    rc = np.zeros_like(codes)
+    for j in range(k):
+        rc = (rc << 2) | (3 - ((codes >> (2 * j)) & 3))
+    return rc
+
+
+def canonical_mask(k):
+    """True עבור k-mers שהם הקנוניים (קטנים או שווים ל-reverse complement)"""
+    codes = np.arange(4 ** k)
+    return codes <= reverse_complement_codes(codes, k)
+
+
+def kmer_codes(buffer, offsets, k, canonical=False):
+    """קוד 2-ביט לכל חלון תקין של k בסיסים, ומזהה הרשומה שלו
+
+    A window is valid when it lies inside one record and holds only A/C/G/T.
+    With ``canonical`` each code is replaced by min(code, reverse complement).
+    """
+    return kmer_codes_from_bases(BASE_LUT[buffer], offsets, k, canonical)
+
+
+def kmer_codes_from_bases(bases, offsets, k, canonical=False):
+    """כמו kmer_codes, אבל על קודי בסיסים (0-5) שכבר פוענחו"""
+    if not 1 <= k <= 31:
+        raise ValueError("k must be between 1 and 31")
+    n_pos = len(bases) - k + 1
+    if n_pos <= 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+
+    bad = np.r_[0, np.cumsum(bases > 3)]
+    bits = (bases & 3).astype(np.int64)
+    codes = np.zeros(n_pos, dtype=np.int64)
+    for j in range(k):
+        codes = (codes << 2) | bits[j:j + n_pos]
+    if canonical:
+        rc = np.zeros(n_pos, dtype=np.int64)
+        for j in range(k):
+            rc |= (3 - bits[j:j + n_pos]) << (2 * j)
+        codes = np.minimum(codes, rc)
+
+    lengths = np.diff(offsets)
+    record_ids = np.repeat(np.arange(len(lengths), dtype=np.int64), lengths)[:n_pos]
+    start = np.arange(n_pos)
+    valid = (start + k <= offsets[1:][record_ids]) & (bad[start + k] == bad[start])
+    return codes[valid], record_ids[valid]
+
+
+class KmerCounts:
+    """מטריצת ספירות דלילה (CSR) - שורה לכל רשומה, עמודה לכל k-mer"""
+
+    def __init__(self, indptr, indices, counts, k, index=None):
+        self.indptr = indptr
+        self.indices = indices
+        self.counts = counts
+        self.k = k
+        self.index = index
+
+    @property
+    def shape(self):
+        return len(self.indptr) - 1, 4 ** self.k
+
+    def to_dense(self, dtype=np.int32):
+        dense = np.zeros(self.shape, dtype=dtype)
+        rows = np.repeat(np.arange(self.shape[0]), np.diff(self.indptr))
+        dense[rows, self.indices] = self.counts
+        return dense
+
+    def to_frame(self):
+        """טבלה צפופה עם שמות ה-k-mers כעמודות"""
+        return pd.DataFrame(self.to_dense(), index=self.index, columns=kmer_labels(self.k))
+
+
+def _count_chunk(sequences, k, canonical):
+    buffer, offsets = encode_sequences(sequences)
+    codes, record_ids = kmer_codes(buffer, offsets, k, canonical)
+    keys, counts = np.unique(record_ids * 4 ** k + codes, return_counts=True)
+    rows = keys // 4 ** k
+    indptr = np.zeros(len(offsets), dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=len(offsets) - 1), out=indptr[1:])
+    return indptr, (keys % 4 ** k).astype(np.int32), counts.astype(np.int32)
+
+
+def _spectra_chunk(sequences, group_codes, n_groups, k, canonical):
+    buffer, offsets = encode_sequences(sequences)
+    codes, record_ids = kmer_codes(buffer, offsets, k, canonical)
+    keys = group_codes[record_ids] * 4 ** k + codes
+    return np.bincount(keys, minlength=n_groups * 4 ** k).reshape(n_groups, 4 ** k)
+
+
+def _chunks(n, chunk_size):
+    return [(start, min(start + chunk_size, n)) for start in range(0, n, chunk_size)]
+
+
+def _map(func, jobs, workers):
+    if workers <= 1 or len(jobs) <= 1:
+        return [func(*job) for job in jobs]
+    with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+        return list(pool.map(func, *zip(*jobs)))
+
+
+def count_kmers(sequences, k=4, canonical=False, workers=1, chunk_size=CHUNK_SIZE):
+    """ספירת k-mers לכל רשומה - מחזיר KmerCounts (דליל)"""
+    _check_k(k)
+    sequences = pd.Series(sequences)
+    jobs = [(sequences.iloc[lo:hi], k, canonical) for lo, hi in _chunks(len(sequences), chunk_size)]
+    parts = _map(_count_chunk, jobs, workers)
+
+    indptr = [np.zeros(1, dtype=np.int64)]
+    offset = 0
+    for part_indptr, part_indices, _ in parts:
+        indptr.append(part_indptr[1:] + offset)
+        offset += len(part_indices)
+    return KmerCounts(
+        np.concatenate(indptr),
+        np.concatenate([p[1] for p in parts]) if parts else np.empty(0, dtype=np.int32),
+        np.concatenate([p[2] for p in parts]) if parts else np.empty(0, dtype=np.int32),
+        k,
+        sequences.index,
+    )
+
+
+def kmer_spectra(sequences, groups, k=4, canonical=False, workers=1, chunk_size=CHUNK_SIZE):
+    """ספקטרום k-mers מצטבר לכל קבוצה - טבלה (קבוצות x k-mers)
+
+    ``groups`` is one label (or a tuple of labels) per record. With
+    ``canonical`` only the canonical k-mer columns are returned.
+    """
+    sequences = pd.Series(sequences)
+    _check_k(k)
+    group_codes, uniques = pd.factorize(pd.Series(list(groups)), sort=True)
+    group_codes = group_codes.astype(np.int64)
+    valid = group_codes >= 0
+    sequences = sequences[valid]
+    group_codes = group_codes[valid]
+
+    jobs = [(sequences.iloc[lo:hi], group_codes[lo:hi], len(uniques), k, canonical)
+            for lo, hi in _chunks(len(sequences), chunk_size)]
+    totals = np.zeros((len(uniques), 4 ** k), dtype=np.int64)
+    for part in _map(_spectra_chunk, jobs, workers):
+        totals += part
+
+    spectra = pd.DataFrame(totals, index=uniques, columns=kmer_labels(k))
+    if canonical:
+        spectra = spectra.loc[:, canonical_mask(k)]
+    return spectra
+
+
+def spectra_by_type_and_split(all_data, k=4, canonical=False, workers=1):
+    """ספקטרום לכל צירוף (GeneType, סט) - אינדקס דו-רמתי"""
+    groups = pd.MultiIndex.from_arrays(
+        [all_data['GeneType'].astype(str), all_data['source'].astype(str)],
+        names=['GeneType', 'source'])
+    spectra = kmer_spectra(all_data['NucleotideSequence'], groups, k, canonical, workers)
+    spectra.index = pd.MultiIndex.from_tuples(spectra.index, names=['GeneType', 'source'])
+    return spectra
+
+
+def main():
+    from data_loader import DATA_DIR, load_splits
+
+    parser = argparse.ArgumentParser(description="k-mer spectra per GeneType and split")
+    parser.add_argument('--data-dir', default=DATA_DIR, help="directory holding the split CSV files")
+    parser.add_argument('-k', type=int, default=4)
+    parser.add_argument('--canonical', action='store_true', help="merge each k-mer with its reverse complement")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--output', default=None,
+                        help="CSV path for the spectra table (default: <data-dir>/kmer_spectra_k<k>.csv)")
+    args = parser.parse_args()
+
+    _, _, _, all_data = load_splits(args.data_dir)
+    spectra = spectra_by_type_and_split(all_data, args.k, args.canonical, args.workers)
+    output = args.output or os.path.join(args.data_dir, f"kmer_spectra_k{args.k}.csv")
+    spectra.to_csv(output)
+
+    print(f"🧬 {args.k}-mer spectra: {spectra.shape[0]} groups x {spectra.shape[1]} k-mers")
+    by_type = spectra.groupby(level='GeneType').sum()
+    freqs = by_type.div(by_type.sum(axis=1).replace(0, 1), axis=0)
+    for gene_type, row in freqs.iterrows():
+        top = ', '.join(f"{kmer} {value:.2%}" for kmer, value in row.nlargest(3).items())
+        print(f"   {gene_type:<20} {top}")
+    print(f"✅ Saved to: {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,306 @@
+"""
+Cross-Split Leakage Detector
+זיהוי זליגת נתונים בין train/test/validation
+
+Exact mode compares 64-bit fingerprints of the cleaned sequences instead of
+sets of full strings. Near-duplicate mode builds MinHash signatures over
+2-bit encoded k-mers (see ``kmers``) and uses banded LSH to find pairs from
+different splits. A pair is reported when its estimated Jaccard similarity
+or its containment - the share of the shorter record's k-mers found in the
+longer one, from the Jaccard estimate and the k-mer counts - passes the
+threshold. That catches one-base differences in records of roughly 75 bp
+and up (with k=12 one substitution removes up to 12 k-mers, too large a
+share of a shorter record) and a record that lies inside a longer one.
+Both modes are linear in the total number of bases.
+"""
+
+import argparse
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+
+from composition import clean_sequences, encode_sequences
+from kmers import kmer_codes
+
+MAX_UINT64 = np.iinfo(np.uint64).max
+# רצועות של 2 שורות (מתוך 32): גם זוג עם Jaccard של 0.3-0.5 - רצף קצר בתוך ארוך - נהיה מועמד
+BANDS = 16
+
+
+def sequence_fingerprints(sequences):
+    """טביעת אצבע של 64 ביט לכל רצף (אחרי ניקוי והמרה לאותיות גדולות)"""
+    cleaned = clean_sequences(pd.Series(sequences)).str.upper()
+    return pd.util.hash_pandas_object(cleaned, index=False).to_numpy()
+
+
+def exact_overlap(fingerprints):
+    """מספר הרצפים הייחודיים המשותפים לכל זוג סטים
+
+    ``fingerprints`` maps split name -> fingerprint array. Returns
+    ``{(split_a, split_b): count}`` - the same numbers a set intersection of
+    the sequence strings gives.
+    """
+    unique = {name: np.unique(fp) for name, fp in fingerprints.items()}
+    return {
+        (a, b): len(np.intersect1d(unique[a], unique[b], assume_unique=True))
+        for a, b in combinations(unique, 2)
+    }
+
+
+def exact_overlap_pairs(fingerprints, index=None):
+    """זוגות רשומות זהות בין סטים שונים
+
+    Returns a frame with ``split_a, index_a, split_b, index_b``. ``index``
+    optionally maps split name -> the row labels of that split.
+    """
+    frames = []
+    for name, fp in fingerprints.items():
+        labels = index[name] if index is not None else np.arange(len(fp))
+        frames.append(pd.DataFrame({'fp': fp, 'split': name, 'index': np.asarray(labels)}))
+
+    pairs = []
+    for (a, fa), (b, fb) in combinations(zip(fingerprints, frames), 2):
+        merged = fa.merge(fb, on='fp', suffixes=('_a', '_b'))
+        pairs.append(merged[['split_a', 'index_a', 'split_b', 'index_b']])
+    if not pairs:
+        return pd.DataFrame(columns=['split_a', 'index_a', 'split_b', 'index_b'])
+    return pd.concat(pairs, ignore_index=True)
+
+
+def _splitmix64(x):
+    """ערבול ביטים של מערך uint64"""
+    with np.errstate(over='ignore'):
+        x = x + np.uint64(0x9E3779B97F4A7C15)
+        x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        return x ^ (x >> np.uint64(31))
+
+
+def minhash_signatures(sequences, k=12, num_perm=32, seed=42, chunk_size=20000):
+    """חתימות MinHash מעל k-mers לכל רצף - מערך (n, num_perm) של uint64
+
+    Sequences shorter than ``k`` keep the all-ones signature and are never
+    reported as near duplicates.
+    """
+    if not 1 <= k <= 31:
+        raise ValueError("k must be between 1 and 31")
+    sequences = pd.Series(sequences)
+    rng = np.random.default_rng(seed)
+    mult = rng.integers(1, 2**63, size=num_perm, dtype=np.uint64) | np.uint64(1)
+    add = rng.integers(0, 2**63, size=num_perm, dtype=np.uint64)
+
+    signatures = np.full((len(sequences), num_perm), MAX_UINT64, dtype=np.uint64)
+    for start in range(0, len(sequences), chunk_size):
+        buffer, offsets = encode_sequences(sequences.iloc[start:start + chunk_size])
+        codes, record_ids = kmer_codes(buffer, offsets, k)
+        codes = codes.astype(np.uint64)
+        if len(codes) == 0:
+            continue
+        mixed = _splitmix64(codes)
+        group_starts = np.flatnonzero(np.r_[True, record_ids[1:] != record_ids[:-1]])
+        rows = start + record_ids[group_starts]
+        with np.errstate(over='ignore'):
+            for p in range(num_perm):
+                hashed = mixed * mult[p] + add[p]
+                signatures[rows, p] = np.minimum.reduceat(hashed, group_starts)
+    return signatures
+
+
+def kmer_windows(sequences, k=12):
+    """מספר חלונות ה-k-mer בכל רצף (גודל קבוצת ה-k-mers, בלי להוריד חזרות)"""
+    lengths = clean_sequences(pd.Series(sequences)).str.len().to_numpy(dtype=np.int64)
+    return np.maximum(lengths - k + 1, 0)
+
+
+def pair_scores(signatures, pairs, sizes):
+    """Jaccard משוער מהחתימות ו-containment: החלק של הקבוצה הקטנה מבין השתיים שנמצא בגדולה
+
+    With the estimated Jaccard ``J`` and set sizes ``a`` and ``b`` the shared
+    k-mers are ``J * (a + b) / (1 + J)``; containment divides them by the
+    smaller set, so a record that lies inside a longer one scores near 1.
+    """
+    similarity = (signatures[pairs[:, 0]] == signatures[pairs[:, 1]]).mean(axis=1)
+    a, b = sizes[pairs[:, 0]], sizes[pairs[:, 1]]
+    shared = similarity * (a + b) / (1 + similarity)
+    containment = np.minimum(np.divide(shared, np.minimum(a, b), out=np.zeros(len(pairs)),
+                                       where=np.minimum(a, b) > 0), 1.0)
+    return similarity, containment
+
+
+def _bucket_pairs(bounds, max_bucket):
+    """כל הזוגות (מיקומים בסדר הממוין) בתוך כל דלי בגודל 2 עד max_bucket"""
+    sizes = np.diff(bounds)
+    keep = (sizes >= 2) & (sizes <= max_bucket)
+    starts, sizes = bounds[:-1][keep], sizes[keep]
+    # כל איבר בדלי מתחבר לכל האיברים שאחריו באותו דלי
+    position = np.repeat(starts, sizes) + np.arange(sizes.sum()) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+    partners = np.repeat(starts + sizes, sizes) - position - 1
+    left = np.repeat(position, partners)
+    right = left + 1 + np.arange(partners.sum()) - np.repeat(np.cumsum(partners) - partners, partners)
+    return left, right
+
+
+def lsh_candidate_pairs(signatures, bands=BANDS, max_bucket=1000, split_ids=None):
+    """זוגות מועמדים מ-LSH: רשומות שחולקות דלי באחת הרצועות לפחות
+
+    Returns a sorted ``(m, 2)`` array of row pairs ``i < j``. With
+    ``split_ids`` only pairs from different splits are kept. Rows whose
+    signature is still all-ones (shorter than ``k``) are never indexed.
+    Pairs are generated per bucket with index arithmetic and deduplicated
+    across bands as packed ``i * n + j`` keys.
+    """
+    n, num_perm = signatures.shape
+    if num_perm % bands:
+        raise ValueError("num_perm must be divisible by bands")
+    rows_per_band = num_perm // bands
+    indexed = np.flatnonzero(signatures[:, 0] != MAX_UINT64)
+
+    packed = []
+    for band in range(bands):
+        block = signatures[indexed, band * rows_per_band:(band + 1) * rows_per_band]
+        keys = pd.util.hash_pandas_object(pd.DataFrame(block), index=False).to_numpy()
+        order = np.argsort(keys, kind='stable')
+        sorted_keys = keys[order]
+        bounds = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1], True])
+        left, right = _bucket_pairs(bounds, max_bucket)
+        a, b = indexed[order[left]], indexed[order[right]]
+        if split_ids is not None:
+            cross = split_ids[a] != split_ids[b]
+            a, b = a[cross], b[cross]
+        packed.append(np.minimum(a, b) * n + np.maximum(a, b))
+
+    keys = np.unique(np.concatenate(packed)) if packed else np.empty(0, dtype=np.int64)
+    return np.column_stack([keys // n, keys % n]).astype(np.int64)
+
+
+def near_duplicate_clusters(sequences, k=12, num_perm=32, bands=BANDS, threshold=0.8,
+                            seed=42, max_bucket=1000):
+    """מזהה אשכול לכל רשומה: רשומות כמעט-זהות מקבלות אותו מזהה
+
+    Pairs whose estimated Jaccard similarity or containment passes the
+    threshold are merged with union-find; the cluster id is the position of the cluster's first record, so it is
+    stable for a fixed input order.
+    """
+    signatures = minhash_signatures(sequences, k=k, num_perm=num_perm, seed=seed)
+    pairs = lsh_candidate_pairs(signatures, bands=bands, max_bucket=max_bucket)
+    if len(pairs):
+        similarity, containment = pair_scores(signatures, pairs, kmer_windows(sequences, k))
+        pairs = pairs[(similarity >= threshold) | (containment >= threshold)]
+
+    parent = np.arange(len(signatures), dtype=np.int64)
+
+    def find(i):
+        root = i
+        while parent[root] != root:
+            root = parent[root]
+        while parent[i] != root:
+            parent[i], i = root, parent[i]
+        return root
+
+    for i, j in pairs.tolist():
+        ri, rj = find(i), find(j)
+        if ri != rj:
+            parent[max(ri, rj)] = min(ri, rj)
+
+    # קיצור מסלולים וקטורי עד שכל רשומה מצביעה על השורש
+    while True:
+        grand = parent[parent]
+        if np.array_equal(grand, parent):
+            return parent
+        parent = grand
+
+
+def near_duplicate_pairs(splits, k=12, num_perm=32, bands=BANDS, threshold=0.8,
+                         seed=42, max_bucket=1000):
+    """זוגות כמעט-זהים בין סטים שונים (MinHash + LSH)
+
+    ``splits`` maps split name -> sequences (a Series; its index labels are
+    reported). Returns ``split_a, index_a, pos_a, split_b, index_b, pos_b,
+    similarity, containment`` where ``pos_*`` is the row position inside the
+    split, ``similarity`` is the estimated Jaccard similarity of the k-mer
+    sets and ``containment`` the estimated share of the smaller set found in
+    the larger one. A pair is kept when either passes ``threshold``. Buckets larger than ``max_bucket`` (low-complexity repeats) are skipped
+    to keep the candidate step linear.
+    """
+    names, labels, positions, sigs, sizes = [], [], [], [], []
+    for split_id, (name, seqs) in enumerate(splits.items()):
+        seqs = pd.Series(seqs)
+        sigs.append(minhash_signatures(seqs, k=k, num_perm=num_perm, seed=seed))
+        sizes.append(kmer_windows(seqs, k))
+        names.append(np.full(len(seqs), split_id, dtype=np.int8))
+        labels.append(np.asarray(seqs.index))
+        positions.append(np.arange(len(seqs)))
+    signatures = np.vstack(sigs)
+    split_ids = np.concatenate(names)
+    row_labels = np.concatenate(labels)
+    row_positions = np.concatenate(positions)
+
+    pairs = lsh_candidate_pairs(signatures, bands=bands, max_bucket=max_bucket,
+                                split_ids=split_ids)
+    if not len(pairs):
+        return pd.DataFrame(columns=['split_a', 'index_a', 'pos_a', 'split_b', 'index_b', 'pos_b',
+                                     'similarity', 'containment'])
+    similarity, containment = pair_scores(signatures, pairs, np.concatenate(sizes))
+    keep = (similarity >= threshold) | (containment >= threshold)
+    pairs, similarity, containment = pairs[keep], similarity[keep], containment[keep]
+    split_names = np.array(list(splits), dtype=object)
+    return pd.DataFrame({
+        'split_a': split_names[split_ids[pairs[:, 0]]],
+        'index_a': row_labels[pairs[:, 0]],
+        'pos_a': row_positions[pairs[:, 0]],
+        'split_b': split_names[split_ids[pairs[:, 1]]],
+        'index_b': row_labels[pairs[:, 1]],
+        'pos_b': row_positions[pairs[:, 1]],
+        'similarity': similarity,
+        'containment': containment,
+    })
+
+
+def leakage_report(splits, near=False, **near_kwargs):
+    """סיכום זליגה לכל זוג סטים
+
+    Returns ``{(split_a, split_b): {'exact': n, 'near': m}}`` where ``exact``
+    counts shared unique sequences and ``near`` counts near-duplicate record
+    pairs that are not exact copies (only when ``near=True``).
+    """
+    fingerprints = {name: sequence_fingerprints(seqs) for name, seqs in splits.items()}
+    report = {pair: {'exact': count} for pair, count in exact_overlap(fingerprints).items()}
+    if near:
+        pairs = near_duplicate_pairs(splits, **near_kwargs)
+        for pair in report:
+            sub = pairs[(pairs['split_a'] == pair[0]) & (pairs['split_b'] == pair[1])]
+            same = (fingerprints[pair[0]][sub['pos_a'].to_numpy(dtype=np.int64)]
+                    == fingerprints[pair[1]][sub['pos_b'].to_numpy(dtype=np.int64)])
+            report[pair]['near'] = int((~same).sum())
+    return report
+
+
+def main():
+    """הדפסת דוח זליגה עבור שלושת הסטים"""
+    from data_loader import DATA_DIR, load_splits
+
+    parser = argparse.ArgumentParser(description="Exact and near-duplicate leakage between the splits")
+    parser.add_argument('--data-dir', default=DATA_DIR, help="directory holding the split CSV files")
+    args = parser.parse_args()
+
+    train, test, val, _ = load_splits(args.data_dir)
+    splits = {
+        'train': train['NucleotideSequence'],
+        'test': test['NucleotideSequence'],
+        'validation': val['NucleotideSequence'],
+    }
+    report = leakage_report(splits, near=True)
+
+    print("=" * 60)
+    print("זליגת נתונים בין הסטים | Cross-Split Leakage")
+    print("=" * 60)
+    print(f"{'Pair':<25} | {'Exact':<10} | {'Near-duplicate':<15}")
+    print("-" * 60)
+    for (a, b), counts in report.items():
+        print(f"{a + ' ∩ ' + b:<25} | {counts['exact']:<10,} | {counts['near']:<15,}")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
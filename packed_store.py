@@ -0,0 +1,225 @@
+"""
+Packed Sequence Store
+אחסון רצפים בדחיסת 2 ביט לבסיס עם גישה ממופת-זיכרון
+
+Layout of a store directory:
+
+    packed.bin       4 bases per byte (A=0, C=1, G=2, T=3, high bits first)
+    offsets.npy      int64, record i spans bases offsets[i]:offsets[i + 1]
+    exc_pos.npy      int64 base positions that are not upper-case A/C/G/T
+    exc_sym.npy      uint8 original symbol at each exception position
+    metadata.*       every other column (Parquet or pickle, like the cache)
+    store.json       record/base counts and the data cache key
+
+Everything is opened with ``np.memmap`` / ``np.load(mmap_mode='r')``, so
+lengths, composition and k-mer passes read the packed bytes without parsing
+strings. Sequences are stored without the ``<...>`` markers.
+"""
+
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from composition import BASE_LUT, BASES, clean_sequences, composition_from_counts, count_bases, encode_sequences
+from data_loader import CACHE_FORMAT, DATA_DIR, cache_path, derived_key, load_splits, read_frame, splits_cached, \
+    write_frame
+from kmers import kmer_codes_from_bases
+
+STORE_VERSION = 1
+STORE_DIR_NAME = 'packed'
+CHUNK_SIZE = 50000
+
+# בתים שנשמרים ישירות בקוד 2 ביט; כל השאר נשמר ברשימת החריגים
+_PLAIN = np.zeros(256, dtype=bool)
+_PLAIN[[ord(b) for b in 'ACGT']] = True
+_ASCII = np.frombuffer(b'ACGT', dtype=np.uint8)
+_SHIFTS = np.array([6, 4, 2, 0], dtype=np.uint8)
+
+
+def _pack(codes):
+    """אריזת קודים (0-3) ל-4 קודים בבית; אורך הקלט חייב להתחלק ב-4"""
+    quads = codes.reshape(-1, 4)
+    return ((quads[:, 0] << 6) | (quads[:, 1] << 4) | (quads[:, 2] << 2) | quads[:, 3]).astype(np.uint8)
+
+
+def build_store(sequences, metadata, path, key=None, chunk_size=CHUNK_SIZE):
+    """כתיבת store חדש מסדרת רצפים וטבלת מטא-דאטה תואמת"""
+    sequences = pd.Series(sequences)
+    os.makedirs(path, exist_ok=True)
+    lengths = clean_sequences(sequences).str.len().to_numpy(dtype=np.int64)
+    offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+
+    exc_pos, exc_sym = [], []
+    carry = np.empty(0, dtype=np.uint8)
+    with open(os.path.join(path, 'packed.bin'), 'wb') as out:
+        for start in range(0, len(sequences), chunk_size):
+            buffer, _ = encode_sequences(sequences.iloc[start:start + chunk_size])
+            plain = _PLAIN[buffer]
+            odd = np.flatnonzero(~plain)
+            exc_pos.append(odd + offsets[start])
+            exc_sym.append(buffer[odd])
+            codes = np.concatenate([carry, BASE_LUT[buffer] & 3])
+            usable = len(codes) - len(codes) % 4
+            out.write(_pack(codes[:usable]).tobytes())
+            carry = codes[usable:]
+        if len(carry):
+            out.write(_pack(np.pad(carry, (0, 4 - len(carry)))).tobytes())
+
+    np.save(os.path.join(path, 'offsets.npy'), offsets)
+    np.save(os.path.join(path, 'exc_pos.npy'), np.concatenate(exc_pos) if exc_pos else np.empty(0, np.int64))
+    np.save(os.path.join(path, 'exc_sym.npy'), np.concatenate(exc_sym) if exc_sym else np.empty(0, np.uint8))
+    metadata_file = 'metadata.parquet' if CACHE_FORMAT == 'parquet' else 'metadata.pkl'
+    write_frame(metadata.reset_index(drop=True), os.path.join(path, metadata_file))
+    with open(os.path.join(path, 'store.json'), 'w') as f:
+        json.dump({'version': STORE_VERSION, 'records': len(lengths), 'bases': int(offsets[-1]),
+                   'metadata': metadata_file, 'key': key}, f, indent=2)
+    return PackedStore(path)
+
+
+class PackedStore:
+    """גישה לקריאה בלבד ל-store ארוז, ללא העתקת הנתונים לזיכרון"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, 'store.json')) as f:
+            self.info = json.load(f)
+        self.offsets = np.load(os.path.join(path, 'offsets.npy'), mmap_mode='r')
+        self.exc_pos = np.load(os.path.join(path, 'exc_pos.npy'), mmap_mode='r')
+        self.exc_sym = np.load(os.path.join(path, 'exc_sym.npy'), mmap_mode='r')
+        packed_path = os.path.join(path, 'packed.bin')
+        if os.path.getsize(packed_path):
+            self.packed = np.memmap(packed_path, dtype=np.uint8, mode='r')
+        else:
+            self.packed = np.empty(0, dtype=np.uint8)
+        self._metadata = None
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    @property
+    def lengths(self):
+        """אורך כל רצף (בלי סימוני < ו->)"""
+        return np.diff(self.offsets)
+
+    @property
+    def metadata(self):
+        """עמודות המטא-דאטה (נטענות בפעם הראשונה שמבקשים אותן)"""
+        if self._metadata is None:
+            self._metadata = read_frame(os.path.join(self.path, self.info['metadata']))
+        return self._metadata
+
+    def _base_range(self, lo, hi):
+        """קודי בסיסים 0-5 (כמו composition.BASES) לטווח מיקומים [lo, hi)"""
+        first, last = lo // 4, (hi + 3) // 4
+        quads = (self.packed[first:last, None] >> _SHIFTS) & 3
+        bases = quads.reshape(-1)[lo - first * 4:hi - first * 4]
+        a, b = np.searchsorted(self.exc_pos, [lo, hi])
+        if b > a:
+            bases = bases.copy()
+            bases[np.asarray(self.exc_pos[a:b]) - lo] = BASE_LUT[np.asarray(self.exc_sym[a:b])]
+        return bases
+
+    def bases(self, start=0, stop=None):
+        """קודי הבסיסים ו-offsets יחסיים לטווח רשומות [start, stop)"""
+        stop = len(self) if stop is None else stop
+        offsets = np.asarray(self.offsets[start:stop + 1])
+        return self._base_range(int(offsets[0]), int(offsets[-1])), offsets - offsets[0]
+
+    def take(self, records, max_length=None):
+        """קודי הבסיסים ו-offsets לרשומות בסדר כלשהו (אופציונלית רק max_length הבסיסים הראשונים)"""
+        records = np.asarray(records, dtype=np.int64)
+        starts = np.asarray(self.offsets[records])
+        lengths = np.asarray(self.offsets[records + 1]) - starts
+        if max_length is not None:
+            lengths = np.minimum(lengths, max_length)
+        offsets = np.zeros(len(records) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        positions = np.repeat(starts - offsets[:-1], lengths) + np.arange(offsets[-1])
+        bases = (self.packed[positions >> 2] >> _SHIFTS[positions & 3]) & 3
+        # החריגים של כל רשומה הם טווח רציף ב-exc_pos - מחפשים רק את גבולות הרשומות
+        first = np.searchsorted(self.exc_pos, starts)
+        counts = np.searchsorted(self.exc_pos, starts + lengths) - first
+        if counts.sum():
+            owner = np.repeat(np.arange(len(records)), counts)
+            index = np.repeat(first - (np.cumsum(counts) - counts), counts) + np.arange(counts.sum())
+            target = np.asarray(self.exc_pos[index]) - starts[owner] + offsets[owner]
+            bases[target] = BASE_LUT[np.asarray(self.exc_sym[index])]
+        return bases, offsets
+
+    def iter_chunks(self, chunk_size=CHUNK_SIZE):
+        """מעבר על כל ה-store במנות: (start, bases, offsets)"""
+        for start in range(0, len(self), chunk_size):
+            bases, offsets = self.bases(start, min(start + chunk_size, len(self)))
+            yield start, bases, offsets
+
+    def sequence(self, i):
+        """הרצף המקורי של רשומה i (אחרי ניקוי הסימונים)"""
+        lo, hi = int(self.offsets[i]), int(self.offsets[i + 1])
+        first, last = lo // 4, (hi + 3) // 4
+        codes = ((self.packed[first:last, None] >> _SHIFTS) & 3).reshape(-1)[lo - first * 4:hi - first * 4]
+        text = _ASCII[codes]
+        a, b = np.searchsorted(self.exc_pos, [lo, hi])
+        text[np.asarray(self.exc_pos[a:b]) - lo] = self.exc_sym[a:b]
+        return text.tobytes().decode('ascii', 'replace')
+
+    def base_counts(self, chunk_size=CHUNK_SIZE):
+        """ספירת A/C/G/T/N/אחר לכל רשומה - מערך (n, 6)"""
+        parts = [count_bases(bases, offsets) for _, bases, offsets in self.iter_chunks(chunk_size)]
+        return np.vstack(parts) if parts else np.zeros((0, len(BASES)), dtype=np.int64)
+
+    def composition_table(self, index=None, chunk_size=CHUNK_SIZE):
+        """טבלת הרכב כמו composition.composition_table, מהבסיסים הארוזים"""
+        return composition_from_counts(self.base_counts(chunk_size), self.lengths, index)
+
+    def kmer_codes(self, k, canonical=False, chunk_size=CHUNK_SIZE):
+        """מעבר על קודי ה-k-mers במנות: (קודים, מזהי רשומה גלובליים)"""
+        for start, bases, offsets in self.iter_chunks(chunk_size):
+            codes, record_ids = kmer_codes_from_bases(bases, offsets, k, canonical)
+            yield codes, record_ids + start
+
+
+def store_path(data_dir=DATA_DIR):
+    return cache_path(data_dir, STORE_DIR_NAME)
+
+
+def load_store(data_dir=DATA_DIR, all_data=None):
+    """פתיחת ה-store של תיקיית הנתונים; נבנה מחדש אם קבצי הנתונים השתנו
+
+    Without ``all_data`` the store is checked against the cache manifest
+    only; the splits are loaded just when the store has to be rebuilt.
+    """
+    if all_data is None and not splits_cached(data_dir):
+        all_data = load_splits(data_dir)[3]  # מעדכן גם את ה-manifest
+    key = derived_key(data_dir, STORE_VERSION)
+    path = store_path(data_dir)
+    try:
+        store = PackedStore(path)
+        if store.info.get('key') == key and store.info.get('version') == STORE_VERSION \
+                and (all_data is None or len(store) == len(all_data)):
+            return store
+    except (OSError, ValueError, KeyError):
+        pass
+    if all_data is None:
+        all_data = load_splits(data_dir)[3]
+    metadata = all_data.drop(columns=['NucleotideSequence'])
+    return build_store(all_data['NucleotideSequence'], metadata, path, key=key)
+
+
+def main():
+    _, _, _, all_data = load_splits(DATA_DIR)
+    store = load_store(DATA_DIR, all_data)
+    packed_bytes = sum(os.path.getsize(os.path.join(store.path, name))
+                       for name in ('packed.bin', 'offsets.npy', 'exc_pos.npy', 'exc_sym.npy'))
+    string_bytes = all_data['NucleotideSequence'].memory_usage(deep=True)
+
+    print(f"📦 Packed store: {len(store):,} records, {store.info['bases']:,} bases")
+    print(f"   Sequences as strings: {string_bytes / 1e6:,.1f} MB")
+    print(f"   Packed on disk:       {packed_bytes / 1e6:,.1f} MB ({len(store.exc_pos):,} exceptions)")
+    print(f"✅ Saved to: {store.path}")
+
+
+if __name__ == "__main__":
+    main()
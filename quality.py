@@ -0,0 +1,201 @@
+"""
+Sequence Quality Flags
+סימון רצפים חריגים: אורך קיצוני, מורכבות נמוכה, הומופולימרים ובסיסים שאינם ACGT
+
+One chunked pass over the packed store computes, for every record, its
+length, non-ACGT count, base entropy, a DUST-style triplet score and the
+longest homopolymer run - all with ``bincount``/``maximum.at`` over the
+chunk, no per-record Python. Length outliers use a robust z-score of log
+length within each GeneType (median and MAD from ``grouped_stats``). The
+result is a per-record table of scores and boolean flags, cached next to
+the data, that the report and the plots can filter on.
+"""
+
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from composition import BASE_LUT, count_bases, encode_sequences
+from data_loader import DATA_DIR, derived_key, load_derived, load_splits, save_derived
+from grouped_stats import group_codes, grouped_stats
+from kmers import kmer_codes_from_bases
+from packed_store import CHUNK_SIZE, load_store
+
+# יש להעלות כשמשנים את אופן החישוב או את הספים
+QUALITY_VERSION = 1
+
+MIN_LENGTH = 30
+# |z| רובסטי של log(אורך) בתוך ה-GeneType
+LENGTH_Z = 3.5
+# רצפת MAD (ביחידות log): סוגים שכמעט כל האורכים בהם זהים (tRNA) לא יסמנו כל סטייה קטנה
+MIN_MAD = 0.2
+# הסתברות (באחוזים) ששני טריפלטים אקראיים ברצף זהים; ברצף אקראי ~1.6, בהומופולימר 100
+DUST_THRESHOLD = 10.0
+HOMOPOLYMER_MIN = 15
+
+FLAG_COLUMNS = ['too_short', 'length_outlier', 'low_complexity', 'homopolymer', 'non_acgt']
+
+
+def _longest_runs(bases, offsets):
+    """אורך ההומופולימר הארוך ביותר (A/C/G/T בלבד) בכל רשומה"""
+    n = len(offsets) - 1
+    longest = np.zeros(n, dtype=np.int64)
+    if len(bases) == 0:
+        return longest
+    lengths = np.diff(offsets)
+    # ריצה מתחילה בשינוי בסיס או בתחילת רשומה
+    new_run = np.r_[True, bases[1:] != bases[:-1]]
+    new_run[offsets[:-1][lengths > 0]] = True
+    starts = np.flatnonzero(new_run)
+    run_lengths = np.diff(np.r_[starts, len(bases)])
+    record_ids = np.repeat(np.arange(n, dtype=np.int64), lengths)[starts]
+    acgt = bases[starts] <= 3
+    np.maximum.at(longest, record_ids[acgt], run_lengths[acgt])
+    return longest
+
+
+def _dust_scores(bases, offsets):
+    """ציון DUST לכל רשומה: sum c(c-1) / l(l-1) * 100 על ספירות הטריפלטים"""
+    n = len(offsets) - 1
+    codes, record_ids = kmer_codes_from_bases(bases, offsets, 3)
+    counts = np.bincount(record_ids * 64 + codes, minlength=n * 64).reshape(n, 64)
+    pairs = (counts * (counts - 1)).sum(axis=1)
+    total = counts.sum(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(total > 1, pairs / (total * (total - 1.0)) * 100, 0.0)
+
+
+def _entropy(counts):
+    """אנטרופיית שאנון (ביטים, 0-2) של הרכב A/C/G/T"""
+    total = counts.sum(axis=1, keepdims=True)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        p = counts / total
+        terms = np.where(p > 0, -p * np.log2(p), 0.0)
+    return terms.sum(axis=1)
+
+
+def _empty_scores(n):
+    return {
+        'length': np.zeros(n, dtype=np.int32),
+        'non_acgt_bases': np.zeros(n, dtype=np.int32),
+        'entropy': np.zeros(n, dtype=np.float32),
+        'dust': np.zeros(n, dtype=np.float32),
+        'max_homopolymer': np.zeros(n, dtype=np.int32),
+    }
+
+
+def _score_chunk(scores, start, bases, offsets):
+    """ציוני האיכות של מנה אחת (קודי בסיסים ו-offsets) לתוך המערכים מ-start"""
+    stop = start + len(offsets) - 1
+    counts = count_bases(bases, offsets)
+    scores['length'][start:stop] = np.diff(offsets)
+    scores['non_acgt_bases'][start:stop] = counts[:, 4:].sum(axis=1)
+    scores['entropy'][start:stop] = _entropy(counts[:, :4])
+    scores['dust'][start:stop] = _dust_scores(bases, offsets)
+    scores['max_homopolymer'][start:stop] = _longest_runs(bases, offsets)
+
+
+def sequence_scores(store, chunk_size=CHUNK_SIZE):
+    """ציוני האיכות לכל רשומה ב-store - מעבר אחד במנות"""
+    scores = _empty_scores(len(store))
+    for start, bases, offsets in store.iter_chunks(chunk_size):
+        _score_chunk(scores, start, bases, offsets)
+    return scores
+
+
+def string_scores(sequences, chunk_size=CHUNK_SIZE):
+    """אותם ציונים ישירות ממחרוזות הרצפים (לטבלה קטנה, בלי store)"""
+    sequences = pd.Series(sequences)
+    scores = _empty_scores(len(sequences))
+    for start in range(0, len(sequences), chunk_size):
+        buffer, offsets = encode_sequences(sequences.iloc[start:start + chunk_size])
+        _score_chunk(scores, start, BASE_LUT[buffer], offsets)
+    return scores
+
+
+def _group_median(values, codes, n_groups):
+    """החציון של הקבוצה של כל שורה (NaN לשורה בלי קבוצה)"""
+    medians = grouped_stats(values, codes, quantiles=(0.5,), group_order=range(n_groups))['median']
+    return np.append(medians.reindex(range(n_groups)).to_numpy(), np.nan)[codes]
+
+
+def robust_length_z(lengths, gene_types):
+    """z רובסטי של log(אורך) לכל רשומה ביחס לחציון ול-MAD של ה-GeneType שלה"""
+    values = np.log(np.maximum(np.asarray(lengths, dtype=np.float64), 1))
+    codes, labels = group_codes(gene_types)
+    deviation = values - _group_median(values, codes, len(labels))
+    mad = np.maximum(_group_median(np.abs(deviation), codes, len(labels)), MIN_MAD)
+    return 0.6745 * deviation / mad
+
+
+def build_quality(all_data, store, chunk_size=CHUNK_SIZE):
+    """טבלת ציונים ודגלים לכל רשומה ב-all_data (באותו סדר ואינדקס)"""
+    return quality_table(sequence_scores(store, chunk_size), all_data['GeneType'], all_data.index)
+
+
+def quality_table(scores, gene_types, index=None):
+    """הדגלים מציוני הרשומות - ה-z של האורך מחושב מול כל הרשומות יחד"""
+    length = scores['length']
+    z = robust_length_z(length, gene_types)
+
+    quality = pd.DataFrame(scores, index=index)
+    quality['non_acgt_frac'] = (scores['non_acgt_bases'] / np.maximum(length, 1)).astype(np.float32)
+    quality['length_z'] = z.astype(np.float32)
+    quality['too_short'] = length < MIN_LENGTH
+    quality['length_outlier'] = np.abs(z) > LENGTH_Z
+    quality['low_complexity'] = scores['dust'] > DUST_THRESHOLD
+    quality['homopolymer'] = scores['max_homopolymer'] >= HOMOPOLYMER_MIN
+    quality['non_acgt'] = scores['non_acgt_bases'] > 0
+    quality['flagged'] = quality[FLAG_COLUMNS].any(axis=1)
+    return quality
+
+
+def load_quality(all_data, data_dir=DATA_DIR, use_cache=True):
+    """טבלת הדגלים - מהמטמון אם קבצי הנתונים לא השתנו"""
+    if not use_cache:
+        return build_quality(all_data, load_store(data_dir, all_data))
+    key = derived_key(data_dir, QUALITY_VERSION)
+    quality = load_derived(data_dir, 'quality', key)
+    if quality is None or len(quality) != len(all_data):
+        quality = build_quality(all_data, load_store(data_dir, all_data))
+        save_derived(data_dir, 'quality', quality, key)
+    return quality
+
+
+def quality_summary(quality, gene_types):
+    """מספר הרשומות המסומנות לכל דגל ולכל GeneType"""
+    flags = quality[FLAG_COLUMNS + ['flagged']]
+    by_type = flags.groupby(pd.Series(gene_types, index=quality.index).rename('GeneType'), observed=True).sum()
+    return flags.sum(), by_type
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Flag length outliers and low-complexity sequences")
+    parser.add_argument('--data-dir', default=DATA_DIR, help="directory holding the split CSV files")
+    parser.add_argument('--output', default=None,
+                        help="CSV of the flagged records (default: <data-dir>/quality_flags.csv)")
+    args = parser.parse_args()
+
+    _, _, _, all_data = load_splits(args.data_dir)
+    quality = load_quality(all_data, args.data_dir)
+    totals, by_type = quality_summary(quality, all_data['GeneType'])
+
+    print("=" * 60)
+    print("🔬 Sequence Quality Flags")
+    print("=" * 60)
+    for flag, count in totals.items():
+        print(f"   {flag:<16} {count:>8,} ({count / max(len(quality), 1):.2%})")
+    print("-" * 60)
+    print(by_type[by_type['flagged'] > 0].sort_values('flagged', ascending=False).to_string())
+
+    output = args.output or os.path.join(args.data_dir, 'quality_flags.csv')
+    columns = ['Symbol', 'GeneType', 'source']
+    flagged = all_data.loc[quality['flagged'], columns].join(quality[quality['flagged']])
+    flagged.to_csv(output)
+    print(f"✅ Saved {len(flagged):,} flagged records to: {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+"""
+Leakage-Free Re-Split Tool
+חלוקה מחדש של הנתונים ללא זליגה, מרובדת לפי GeneType
+
+Records are grouped by sequence fingerprint (or, with ``--near``, by
+near-duplicate cluster) and whole groups are assigned to train/test/
+validation, stratified on the GeneType of each group. Assignment depends
+only on the group fingerprint and the seed, so the same input and seed
+always give the same split. The input is read twice in chunks: once for
+fingerprints and labels, once to stream every row to its output file.
+"""
+
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from data_loader import DATA_DIR, SPLIT_FILES, ingest_split
+from leakage import _splitmix64, near_duplicate_clusters, sequence_fingerprints
+
+# שם הסט -> חלק מהנתונים (כמו ב-DATA_ISSUES_REPORT: 70/15/15)
+DEFAULT_FRACTIONS = {'train': 0.70, 'validation': 0.15, 'test': 0.15}
+CHUNK_SIZE = 50000
+
+
+def _iter_chunks(paths, chunk_size=CHUNK_SIZE, columns=None):
+    """קריאת כל הקבצים במנות (עם עמודות נבחרות בלבד אם ניתנו)"""
+    for path in paths:
+        if columns is None:
+            yield from pd.read_csv(path, index_col=0, chunksize=chunk_size)
+        else:
+            yield from pd.read_csv(path, chunksize=chunk_size, usecols=lambda c: c in columns)
+
+
+def scan_inputs(paths, chunk_size=CHUNK_SIZE):
+    """מעבר ראשון: טביעת אצבע וקוד GeneType לכל רשומה
+
+    Returns ``(fingerprints, label_codes, label_names)``.
+    """
+    fingerprints, codes = [], []
+    vocab = {}
+    for chunk in _iter_chunks(paths, chunk_size, columns=('GeneType', 'NucleotideSequence')):
+        fingerprints.append(sequence_fingerprints(chunk['NucleotideSequence']))
+        local_codes, uniques = pd.factorize(chunk['GeneType'].fillna(''))
+        mapping = np.array([vocab.setdefault(u, len(vocab)) for u in uniques], dtype=np.int32)
+        codes.append(mapping[local_codes] if len(mapping) else local_codes.astype(np.int32))
+    if not fingerprints:
+        return np.empty(0, dtype=np.uint64), np.empty(0, dtype=np.int32), []
+    return np.concatenate(fingerprints), np.concatenate(codes), list(vocab)
+
+
+def group_keys(fingerprints, sequences=None, **near_kwargs):
+    """מפתח קבוצה לכל רשומה: טביעת האצבע, או טביעת האשכול כשמועברים רצפים
+
+    Near-duplicate clustering runs on the unique sequences only, so exact
+    copies never blow up the LSH buckets.
+    """
+    if sequences is None:
+        return fingerprints
+    unique_fp, first, inverse = np.unique(fingerprints, return_index=True, return_inverse=True)
+    clusters = near_duplicate_clusters(sequences.iloc[first].reset_index(drop=True), **near_kwargs)
+    return unique_fp[clusters][inverse]
+
+
+def assign_splits(keys, labels, fractions=None, seed=42):
+    """שיוך קבוצות לסטים, מרובד לפי התיוג של כל קבוצה
+
+    Every group takes the label of its first record. Inside each label the
+    groups are ordered by a seeded hash of the group key and cut at the
+    cumulative record fractions. Returns an int8 split id per record,
+    indexing into ``list(fractions)``.
+    """
+    fractions = fractions or DEFAULT_FRACTIONS
+    bounds = np.cumsum(list(fractions.values()))
+    bounds = bounds / bounds[-1]
+    if len(keys) == 0:
+        return np.empty(0, dtype=np.int8)
+
+    group_key, first, inverse, sizes = np.unique(
+        keys, return_index=True, return_inverse=True, return_counts=True)
+    group_label = labels[first]
+    shuffle_key = _splitmix64(group_key ^ np.uint64(seed))
+    order = np.lexsort((shuffle_key, group_label))
+
+    sorted_labels = group_label[order]
+    sorted_sizes = sizes[order]
+    cum = np.cumsum(sorted_sizes)
+    label_start = np.flatnonzero(np.r_[True, sorted_labels[1:] != sorted_labels[:-1]])
+    label_end = np.r_[label_start[1:], len(order)]
+    offset = np.repeat(np.r_[0, cum][label_start], label_end - label_start)
+    total = np.repeat(cum[label_end - 1] - np.r_[0, cum][label_start], label_end - label_start)
+    position = (cum - offset - sorted_sizes / 2) / total
+
+    group_split = np.empty(len(order), dtype=np.int8)
+    group_split[order] = np.searchsorted(bounds, position, side='right')
+    return group_split[inverse]
+
+
+def write_splits(paths, assignment, output_dir, names, keep=None, chunk_size=CHUNK_SIZE):
+    """מעבר שני: כתיבת כל שורה לקובץ היעד שלה - מחזיר מספר שורות לכל סט"""
+    os.makedirs(output_dir, exist_ok=True)
+    handles = {name: open(os.path.join(output_dir, f"{name}.csv"), 'w', newline='') for name in names}
+    written = dict.fromkeys(names, 0)
+    header_done = set()
+    position = 0
+    try:
+        for chunk in _iter_chunks(paths, chunk_size):
+            split = assignment[position:position + len(chunk)]
+            mask = keep[position:position + len(chunk)] if keep is not None else None
+            position += len(chunk)
+            for split_id, name in enumerate(names):
+                selected = split == split_id
+                if mask is not None:
+                    selected &= mask
+                part = chunk[selected]
+                part.index = pd.RangeIndex(written[name], written[name] + len(part))
+                part.to_csv(handles[name], header=name not in header_done)
+                header_done.add(name)
+                written[name] += len(part)
+    finally:
+        for handle in handles.values():
+            handle.close()
+    return written
+
+
+def resplit(data_dir=DATA_DIR, output_dir=None, fractions=None, seed=42,
+            near=False, drop_duplicates=False, chunk_size=CHUNK_SIZE):
+    """חלוקה מחדש של כל קבצי הסטים לתיקיית פלט"""
+    fractions = fractions or DEFAULT_FRACTIONS
+    output_dir = output_dir or os.path.join(data_dir, 'resplit')
+    paths = [ingest_split(data_dir, name)[0] for name in SPLIT_FILES]
+
+    fingerprints, labels, label_names = scan_inputs(paths, chunk_size)
+    sequences = None
+    if near:
+        sequences = pd.concat(
+            [chunk['NucleotideSequence'] for chunk in
+             _iter_chunks(paths, chunk_size, columns=('NucleotideSequence',))],
+            ignore_index=True)
+    keys = group_keys(fingerprints, sequences)
+    assignment = assign_splits(keys, labels, fractions, seed)
+
+    keep = None
+    if drop_duplicates:
+        keep = np.zeros(len(fingerprints), dtype=bool)
+        keep[np.unique(fingerprints, return_index=True)[1]] = True
+
+    written = write_splits(paths, assignment, output_dir, list(fractions), keep, chunk_size)
+    return written, assignment, labels, label_names
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Leakage-free, grouped, stratified re-split")
+    parser.add_argument('--data-dir', default=DATA_DIR)
+    parser.add_argument('--output-dir', default=None)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--train', type=float, default=DEFAULT_FRACTIONS['train'])
+    parser.add_argument('--validation', type=float, default=DEFAULT_FRACTIONS['validation'])
+    parser.add_argument('--test', type=float, default=DEFAULT_FRACTIONS['test'])
+    parser.add_argument('--near', action='store_true',
+                        help="group near-duplicate sequences (MinHash clusters), not only exact copies")
+    parser.add_argument('--drop-duplicates', action='store_true',
+                        help="keep a single record per exact sequence")
+    args = parser.parse_args()
+
+    fractions = {'train': args.train, 'validation': args.validation, 'test': args.test}
+    output_dir = args.output_dir or os.path.join(args.data_dir, 'resplit')
+
+    print("=" * 60)
+    print("🔀 Leakage-Free Re-Split")
+    print("=" * 60)
+    written, _, _, _ = resplit(args.data_dir, output_dir, fractions, args.seed,
+                               near=args.near, drop_duplicates=args.drop_duplicates)
+    total = sum(written.values())
+    for name, count in written.items():
+        pct = count / total * 100 if total else 0
+        print(f"   {name + '.csv':<16} {count:>10,} ({pct:.1f}%)")
+    print(f"✅ Saved to: {output_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,266 @@
+"""
+Rule-Table Pattern Features
+פיצ'רים בוליאניים מ-Symbol ו-Description לפי טבלת חוקים הצהרתית
+
+Each rule is a literal with a kind: ``prefix`` (start of the value),
+``suffix`` (end of the value) or ``keyword`` (anywhere). The table is
+compiled once per column. Prefix and suffix rules become one hash lookup
+per distinct literal length over a fixed-width slice of every value. For
+keyword rules the column is joined into one UTF-8 byte buffer and indexed
+once in a single pass: a lookup table maps the pair of bytes at every
+position to the literals starting with it, and one stable sort groups the
+matching positions by pair. Each literal's candidates are its slice of
+that index, narrowed by comparing its next bytes with numpy, so a new rule
+adds no scan of the column. Every occurrence is found (overlapping ones
+too) with no per-match Python, and the row of a hit is the number of
+separators before it. The hits become a sparse (CSR) boolean matrix. Symbol rules are
+case-sensitive; Description rules are matched case-insensitively.
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+KINDS = ('prefix', 'suffix', 'keyword')
+
+# (שם הפיצ'ר, עמודה, סוג, טקסט) - ראו CORRELATION_ANALYSIS.md
+RULES = [
+    ('symbol_LOC', 'Symbol', 'prefix', 'LOC'),
+    ('symbol_LINC', 'Symbol', 'prefix', 'LINC'),
+    ('symbol_RPL', 'Symbol', 'prefix', 'RPL'),
+    ('symbol_RPS', 'Symbol', 'prefix', 'RPS'),
+    ('symbol_MIR', 'Symbol', 'prefix', 'MIR'),
+    ('symbol_TRNA', 'Symbol', 'prefix', 'TRNA'),
+    ('symbol_SNORD', 'Symbol', 'prefix', 'SNORD'),
+    ('symbol_SNORA', 'Symbol', 'prefix', 'SNORA'),
+    ('symbol_RNU', 'Symbol', 'prefix', 'RNU'),
+    ('symbol_RN7S', 'Symbol', 'prefix', 'RN7S'),
+    ('symbol_ends_P', 'Symbol', 'suffix', 'P'),
+    ('symbol_AS', 'Symbol', 'keyword', '-AS'),
+    ('desc_pseudogene', 'Description', 'keyword', 'pseudogene'),
+    ('desc_sharpr_mpra', 'Description', 'prefix', 'sharpr-mpra regulatory region'),
+    ('desc_regulatory_region', 'Description', 'keyword', 'regulatory region'),
+    ('desc_regulatory_element', 'Description', 'keyword', 'regulatory element'),
+    ('desc_enhancer', 'Description', 'keyword', 'enhancer'),
+    ('desc_uncharacterized', 'Description', 'prefix', 'uncharacterized'),
+    ('desc_microrna', 'Description', 'keyword', 'microrna'),
+    ('desc_small_nucleolar', 'Description', 'keyword', 'small nucleolar'),
+    ('desc_small_nuclear', 'Description', 'keyword', 'small nuclear'),
+    ('desc_ribosomal', 'Description', 'keyword', 'ribosomal'),
+    ('desc_transfer_rna', 'Description', 'keyword', 'transfer rna'),
+    ('desc_long_intergenic', 'Description', 'keyword', 'long intergenic'),
+    ('desc_antisense', 'Description', 'keyword', 'antisense'),
+]
+
+# עמודות שמותאמות בלי תלות ברישיות (גם הטקסטים של החוקים מומרים לאותיות קטנות)
+IGNORE_CASE = {'Description'}
+# מפריד בין הערכים במחרוזת המאוחדת - לא יכול להופיע בטקסט של חוק
+_SEPARATOR = '\x00'
+# גודל טבלת החיפוש של האינדקס - כל זוגות הבתים האפשריים
+_N_PAIRS = 1 << 16
+
+
+def _expand(literal_ids, indptr, rule):
+    """מזהה טקסט -> כל החוקים שלו (לפי טבלת CSR); מחזיר גם את מספר החוקים לכל טקסט"""
+    counts = np.diff(indptr)[literal_ids]
+    first = np.repeat(indptr[literal_ids] - (np.cumsum(counts) - counts), counts)
+    return rule[first + np.arange(counts.sum())], counts
+
+
+def _csr(groups):
+    """רשימת רשימות -> (indptr, values)"""
+    indptr = np.r_[0, np.cumsum([len(g) for g in groups])].astype(np.int64)
+    return indptr, np.array([i for g in groups for i in g], dtype=np.int64)
+
+
+class RuleSet:
+    """טבלת החוקים אחרי קומפילציה: מילות המפתח כבתים לאינדקס זוגות הבתים וטבלאות hash לתחיליות/סיומות"""
+
+    def __init__(self, rules=RULES):
+        for name, column, kind, literal in rules:
+            if kind not in KINDS:
+                raise ValueError(f"rule {name!r}: kind must be one of {KINDS}")
+            if not literal or _SEPARATOR in literal:
+                raise ValueError(f"rule {name!r}: invalid text {literal!r}")
+        self.rules = list(rules)
+        self.names = [rule[0] for rule in self.rules]
+        self.columns = {}
+        for column in dict.fromkeys(rule[1] for rule in self.rules):
+            fold = column in IGNORE_CASE
+            spec = {'fold': fold, 'anchored': []}
+            for kind in ('prefix', 'suffix'):
+                ids = [i for i, rule in enumerate(self.rules) if rule[1:3] == (column, kind)]
+                for length in sorted({len(self.rules[i][3]) for i in ids}):
+                    literals = sorted({self._literal(i, fold) for i in ids if len(self.rules[i][3]) == length})
+                    groups = [[i for i in ids if self._literal(i, fold) == literal] for literal in literals]
+                    spec['anchored'].append((kind, length, {literal: j for j, literal in enumerate(literals)},
+                                             *_csr(groups)))
+            ids = [i for i, rule in enumerate(self.rules) if rule[1:3] == (column, 'keyword')]
+            if ids:
+                literals = sorted({self._literal(i, fold) for i in ids})
+                groups = [[i for i in ids if self._literal(i, fold) == literal] for literal in literals]
+                spec['keyword'] = ([np.frombuffer(literal.encode(), dtype=np.uint8) for literal in literals],
+                                   *_csr(groups))
+            self.columns[column] = spec
+
+    def _literal(self, i, fold):
+        return self.rules[i][3].lower() if fold else self.rules[i][3]
+
+    @staticmethod
+    def _anchored_hits(values, kind, length, lookup, indptr, rule):
+        """תחילית/סיומת באורך אחד: חיתוך באורך קבוע וחיפוש ב-hash לכל הטקסטים באותו אורך"""
+        keys = values.str[:length] if kind == 'prefix' else values.str[-length:]
+        literal_ids = keys.map(lookup).to_numpy(dtype=np.float64)
+        rows = np.flatnonzero(~np.isnan(literal_ids))
+        rule_ids, counts = _expand(literal_ids[rows].astype(np.int64), indptr, rule)
+        return np.repeat(rows, counts), rule_ids
+
+    @staticmethod
+    def _keyword_hits(values, literals, indptr, rule):
+        """מילות מפתח: אינדקס אחד של זוגות בתים על הבאפר המאוחד, ואימות המועמדים של כל טקסט ב-numpy"""
+        if len(values) == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        pad = max(len(literal) for literal in literals)
+        # ריפוד במפרידים כדי שהשוואת הבתים הבאים לא תחרוג מהבאפר (מפריד לא מופיע בטקסט של חוק)
+        buffer = np.frombuffer((_SEPARATOR.join(values.tolist()) + _SEPARATOR * pad).encode(), dtype=np.uint8)
+        separators = np.flatnonzero(buffer == ord(_SEPARATOR))
+        if len(separators) != len(values) - 1 + pad:
+            # המפריד מופיע בתוך ערך - מחליפים אותו ברווח כדי שמספור השורות יישאר נכון
+            values = values.str.replace(_SEPARATOR, ' ', regex=False)
+            buffer = np.frombuffer((_SEPARATOR.join(values.tolist()) + _SEPARATOR * pad).encode(), dtype=np.uint8)
+            separators = np.flatnonzero(buffer == ord(_SEPARATOR))
+        # האינדקס נבנה פעם אחת: טבלה מזוג בתים (או בית בודד) -> קבוצה, מעבר אחד על הבאפר,
+        # ומיון יציב רק של המיקומים שנפלו בקבוצה כלשהי
+        keys = [int(literal[0]) << 8 | int(literal[1]) if len(literal) > 1 else int(literal[0])
+                for literal in literals]
+        index = {}
+        for size, codes in ((2, buffer[:-1].astype(np.uint16) << 8 | buffer[1:]), (1, buffer)):
+            wanted = sorted({key for key, literal in zip(keys, literals) if min(len(literal), 2) == size})
+            if not wanted:
+                continue
+            table = np.full(_N_PAIRS, -1, dtype=np.int32)
+            table[wanted] = np.arange(len(wanted))
+            groups = table[codes]
+            positions = np.flatnonzero(groups >= 0)
+            order = np.argsort(groups[positions], kind='stable')
+            positions = positions[order]
+            bounds = np.searchsorted(groups[positions], np.arange(len(wanted) + 1))
+            index.update({(size, key): positions[bounds[g]:bounds[g + 1]] for g, key in enumerate(wanted)})
+        rows, literal_ids = [], []
+        for j, (literal, key) in enumerate(zip(literals, keys)):
+            found = index[min(len(literal), 2), key]
+            for k in range(2, len(literal)):
+                found = found[buffer[found + k] == literal[k]]
+            rows.append(np.searchsorted(separators, found))
+            literal_ids.append(np.full(len(found), j, dtype=np.int64))
+        rule_ids, counts = _expand(np.concatenate(literal_ids), indptr, rule)
+        return np.repeat(np.concatenate(rows), counts), rule_ids
+
+    def _column_hits(self, values, column):
+        """(שורה, חוק) לכל התאמה בעמודה אחת"""
+        spec = self.columns[column]
+        values = pd.Series(values).fillna('').astype(str)
+        if spec['fold']:
+            values = values.str.lower()
+        hits = [self._anchored_hits(values, *anchored) for anchored in spec['anchored']]
+        if 'keyword' in spec:
+            hits.append(self._keyword_hits(values, *spec['keyword']))
+        if not hits:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        return np.concatenate([h[0] for h in hits]), np.concatenate([h[1] for h in hits])
+
+    def match(self, frame):
+        """מטריצה דלילה (שורה לכל רשומה, עמודה לכל חוק) - מעבר אחד על כל עמודה"""
+        hits = [self._column_hits(frame[column], column) for column in self.columns]
+        rows = np.concatenate([h[0] for h in hits])
+        rule_ids = np.concatenate([h[1] for h in hits])
+        # סימון במערך בוליאני במקום np.unique: כפילויות (אותו חוק פעמיים בשורה) נעלמות בלי מיון
+        marked = np.zeros(len(frame) * len(self.rules), dtype=bool)
+        marked[rows * len(self.rules) + rule_ids] = True
+        rows, indices = np.divmod(np.flatnonzero(marked), len(self.rules))
+        indptr = np.zeros(len(frame) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=len(frame)), out=indptr[1:])
+        return RuleMatches(indptr, indices, self.names, frame.index)
+
+
+class RuleMatches:
+    """מטריצה בוליאנית דלילה (CSR) - שורה לכל רשומה, עמודה לכל חוק"""
+
+    def __init__(self, indptr, indices, names, index=None):
+        self.indptr = indptr
+        self.indices = indices
+        self.names = list(names)
+        self.index = index
+
+    @property
+    def shape(self):
+        return len(self.indptr) - 1, len(self.names)
+
+    def rows(self):
+        """מספר השורה של כל ערך במטריצה"""
+        return np.repeat(np.arange(self.shape[0]), np.diff(self.indptr))
+
+    def column(self, name):
+        """עמודה אחת כמערך בוליאני צפוף"""
+        dense = np.zeros(self.shape[0], dtype=bool)
+        dense[self.rows()[self.indices == self.names.index(name)]] = True
+        return dense
+
+    def counts(self):
+        """מספר הרשומות שכל חוק תפס"""
+        return pd.Series(np.bincount(self.indices, minlength=len(self.names)), index=self.names)
+
+    def to_dense(self):
+        dense = np.zeros(self.shape, dtype=bool)
+        dense[self.rows(), self.indices] = True
+        return dense
+
+    def to_frame(self):
+        return pd.DataFrame(self.to_dense(), index=self.index, columns=self.names)
+
+
+def match_rules(frame, rules=RULES):
+    """קומפילציה של טבלת החוקים והתאמה על frame עם העמודות Symbol/Description"""
+    return RuleSet(rules).match(frame)
+
+
+def rule_precision(matches, gene_types):
+    """לכל חוק: מספר ההתאמות, ה-GeneType השכיח בהן וחלקו"""
+    codes, labels = pd.factorize(pd.Series(gene_types).astype(object).fillna('unknown'))
+    table = np.bincount(matches.indices * len(labels) + codes[matches.rows()],
+                        minlength=len(matches.names) * len(labels)).reshape(len(matches.names), len(labels))
+    hits = table.sum(axis=1)
+    top = table.argmax(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        share = np.where(hits > 0, table.max(axis=1) / hits, np.nan)
+    return pd.DataFrame({'matches': hits, 'top_gene_type': np.asarray(labels)[top],
+                         'share': share}, index=pd.Index(matches.names, name='rule'))
+
+
+def main():
+    from data_loader import DATA_DIR, load_splits
+
+    parser = argparse.ArgumentParser(description="Symbol/Description rule features and their precision")
+    parser.add_argument('--data-dir', default=DATA_DIR, help="directory holding the split CSV files")
+    args = parser.parse_args()
+
+    _, _, _, all_data = load_splits(args.data_dir)
+    start = time.perf_counter()
+    matches = match_rules(all_data)
+    seconds = time.perf_counter() - start
+
+    print("=" * 60)
+    print(f"🏷️  Rule features: {len(all_data):,} records x {len(matches.names)} rules ({seconds:.2f}s)")
+    print("=" * 60)
+    precision = rule_precision(matches, all_data['GeneType'])
+    print(f"{'Rule':<26} | {'Matches':>8} | {'Top GeneType':<18} | {'Share':>6}")
+    print("-" * 60)
+    for name, row in precision.iterrows():
+        print(f"{name:<26} | {row['matches']:>8,} | {row['top_gene_type'] if row['matches'] else '-':<18} "
+              f"| {row['share']:>6.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,266 @@
+"""
+Sequence Similarity Index
+אינדקס חיפוש רצפים דומים: רצף שאילתה -> הרשומות הקרובות ביותר
+
+Every record is reduced to a sketch of its canonical k-mers (k=15): the
+hashed k-mers below 2^64/scaled ("FracMinHash") plus its few smallest
+hashes, so short sequences are always represented. The sketches are stored
+as an inverted index - sorted hash keys, CSR offsets and record postings -
+in ``.npy`` files that are opened with ``mmap_mode='r'``. A query sketches
+the sequence the same way, counts shared hashes per record with one
+``bincount`` over the matching posting lists, and re-ranks the best
+candidates by exact k-mer Jaccard read from the packed store (see
+``packed_store``). Identical sequences are found through their 64-bit
+fingerprints even when they are too short to share k-mers.
+"""
+
+import argparse
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from composition import BASE_LUT, encode_sequences
+from data_loader import DATA_DIR, cache_path, derived_key, load_splits
+from kmers import kmer_codes_from_bases
+from leakage import _splitmix64, sequence_fingerprints
+from packed_store import CHUNK_SIZE, load_store
+
+INDEX_VERSION = 1
+INDEX_DIR_NAME = 'similarity'
+K = 15
+SCALED = 8
+MIN_HASHES = 8
+# מפתחות עם יותר רשומות מזה (למשל רצפים חוזרים) לא משמשים לבחירת מועמדים
+MAX_POSTINGS = 20000
+CANDIDATES_PER_RESULT = 10
+
+
+def _distinct(hashes, record_ids):
+    """הסרת זוגות (hash, רשומה) כפולים סמוכים במערכים ממוינים"""
+    new = np.ones(len(hashes), dtype=bool)
+    new[1:] = (hashes[1:] != hashes[:-1]) | (record_ids[1:] != record_ids[:-1])
+    return hashes[new], record_ids[new]
+
+
+def sketch_hashes(bases, offsets, k=K, scaled=SCALED, min_hashes=MIN_HASHES):
+    """(hashes, record_ids) ייחודיים, ממוינים לפי hash ואז רשומה
+
+    A record keeps every k-mer hash below 2^64/scaled; records with fewer
+    than ``min_hashes`` such k-mers also keep their ``min_hashes`` smallest
+    hashes. Only that subset is ever sorted.
+    """
+    codes, record_ids = kmer_codes_from_bases(bases, offsets, k, canonical=True)
+    hashes = _splitmix64(codes.astype(np.uint64))
+    sampled = hashes <= np.uint64(np.iinfo(np.uint64).max // scaled)
+    few = np.bincount(record_ids[sampled], minlength=len(offsets) - 1) < min_hashes
+
+    # רשומות קצרות: min_hashes ה-hashes הקטנים ביותר בכל רשומה
+    extra = few[record_ids]
+    extra_hashes, extra_records = hashes[extra], record_ids[extra]
+    order = np.lexsort((extra_hashes, extra_records))
+    extra_hashes, extra_records = _distinct(extra_hashes[order], extra_records[order])
+    starts = np.flatnonzero(np.r_[True, extra_records[1:] != extra_records[:-1]])
+    rank = np.arange(len(extra_records)) - np.repeat(starts, np.diff(np.r_[starts, len(extra_records)]))
+    smallest = rank < min_hashes
+
+    hashes = np.r_[hashes[sampled], extra_hashes[smallest]]
+    record_ids = np.r_[record_ids[sampled], extra_records[smallest]]
+    order = np.lexsort((record_ids, hashes))
+    return _distinct(hashes[order], record_ids[order])
+
+
+def _kmer_set(bases, k):
+    """קבוצת ה-k-mers הקנוניים של רצף יחיד (מערך ממוין)"""
+    codes, _ = kmer_codes_from_bases(bases, np.array([0, len(bases)]), k, canonical=True)
+    return np.unique(codes)
+
+
+def build_index(store, fingerprints, path, key=None, k=K, scaled=SCALED, min_hashes=MIN_HASHES,
+                chunk_size=CHUNK_SIZE):
+    """בניית האינדקס מה-store הארוז וכתיבתו לתיקייה path"""
+    os.makedirs(path, exist_ok=True)
+    all_hashes, all_records = [], []
+    for start, bases, offsets in store.iter_chunks(chunk_size):
+        hashes, record_ids = sketch_hashes(bases, offsets, k, scaled, min_hashes)
+        all_hashes.append(hashes)
+        all_records.append(record_ids + start)
+    hashes = np.concatenate(all_hashes) if all_hashes else np.empty(0, dtype=np.uint64)
+    records = np.concatenate(all_records) if all_records else np.empty(0, dtype=np.int64)
+
+    # רשימות מסודרות לפי hash; בתוך כל רשימה הרשומות בסדר עולה
+    order = np.argsort(hashes, kind='stable')
+    hashes, records = hashes[order], records[order]
+    keys, starts = np.unique(hashes, return_index=True)
+    indptr = np.r_[starts, len(hashes)].astype(np.int64)
+
+    fp_order = np.argsort(fingerprints, kind='stable')
+    arrays = {
+        'keys': keys,
+        'indptr': indptr,
+        'postings': records.astype(np.int32),
+        'sizes': np.bincount(records, minlength=len(store)).astype(np.int32),
+        'fingerprints': np.asarray(fingerprints)[fp_order],
+        'fingerprint_records': fp_order.astype(np.int32),
+    }
+    for name, array in arrays.items():
+        np.save(os.path.join(path, f"{name}.npy"), array)
+    with open(os.path.join(path, 'index.json'), 'w') as f:
+        json.dump({'version': INDEX_VERSION, 'k': k, 'scaled': scaled, 'min_hashes': min_hashes,
+                   'records': len(store), 'hashes': len(hashes), 'keys': len(keys), 'key': key}, f, indent=2)
+    return SimilarityIndex(path, store)
+
+
+class SimilarityIndex:
+    """חיפוש הרשומות הדומות ביותר לרצף - כל המערכים ממופי-זיכרון"""
+
+    def __init__(self, path, store):
+        self.path = path
+        self.store = store
+        with open(os.path.join(path, 'index.json')) as f:
+            self.info = json.load(f)
+        for name in ('keys', 'indptr', 'postings', 'sizes', 'fingerprints', 'fingerprint_records'):
+            setattr(self, name, np.load(os.path.join(path, f"{name}.npy"), mmap_mode='r'))
+
+    def __len__(self):
+        return len(self.sizes)
+
+    def _candidates(self, query_hashes):
+        """מספר ה-hashes המשותפים לכל רשומה שחולקת לפחות אחד"""
+        if not len(self.keys):
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        pos = np.minimum(np.searchsorted(self.keys, query_hashes), len(self.keys) - 1)
+        pos = pos[np.asarray(self.keys[pos]) == query_hashes]
+        lo, hi = np.asarray(self.indptr[pos]), np.asarray(self.indptr[pos + 1])
+        small = (hi - lo) <= MAX_POSTINGS
+        lo, hi = lo[small], hi[small]
+        if not len(lo):
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        # כל הטווחים [lo, hi) כמערך מיקומים אחד
+        lengths = hi - lo
+        flat = np.repeat(lo - np.r_[0, np.cumsum(lengths)[:-1]], lengths) + np.arange(lengths.sum())
+        records, shared = np.unique(np.asarray(self.postings[flat]), return_counts=True)
+        return records.astype(np.int64), shared
+
+    def _exact_matches(self, sequence):
+        fp = sequence_fingerprints(pd.Series([sequence]))[0]
+        lo = np.searchsorted(self.fingerprints, fp, side='left')
+        hi = np.searchsorted(self.fingerprints, fp, side='right')
+        return np.asarray(self.fingerprint_records[lo:hi], dtype=np.int64)
+
+    def query(self, sequence, top_k=10, rerank=True, rank_by='similarity'):
+        """top_k הרשומות הדומות ביותר לרצף (עם או בלי סימוני < ו->)
+
+        Returns a frame with the record position, ``Symbol``, ``GeneType``,
+        split (``source``), length, ``similarity`` (k-mer Jaccard) and
+        ``containment`` (share of the query's k-mers found in the record) -
+        exact after re-ranking, sketch estimates otherwise - and ``exact``
+        (identical sequence). ``rank_by='containment'`` ranks records that
+        contain a short query above shorter look-alikes.
+        """
+        if rank_by not in ('similarity', 'containment'):
+            raise ValueError("rank_by must be 'similarity' or 'containment'")
+        k = self.info['k']
+        buffer, offsets = encode_sequences(pd.Series([sequence]))
+        bases = BASE_LUT[buffer]
+        query_hashes, _ = sketch_hashes(bases, offsets, k, self.info['scaled'], self.info['min_hashes'])
+        records, shared = self._candidates(query_hashes)
+        exact = self._exact_matches(sequence)
+
+        sizes = np.asarray(self.sizes[records], dtype=np.int64)
+        similarity = shared / np.maximum(len(query_hashes) + sizes - shared, 1)
+        containment = shared / max(len(query_hashes), 1)
+        score = similarity if rank_by == 'similarity' else containment
+        keep = np.argsort(-score, kind='stable')[:top_k * CANDIDATES_PER_RESULT]
+        missing = np.setdiff1d(exact, records[keep])
+        records = np.r_[records[keep], missing]
+        similarity = np.r_[similarity[keep], np.ones(len(missing))]
+        containment = np.r_[containment[keep], np.ones(len(missing))]
+
+        if rerank and len(records):
+            query_set = _kmer_set(bases, k)
+            for i, record in enumerate(records):
+                record_set = _kmer_set(self.store.bases(record, record + 1)[0], k)
+                common = len(np.intersect1d(query_set, record_set, assume_unique=True))
+                union = len(query_set) + len(record_set) - common
+                similarity[i] = common / union if union else 0.0
+                containment[i] = common / len(query_set) if len(query_set) else 0.0
+        is_exact = np.isin(records, exact)
+        similarity[is_exact] = 1.0
+        containment[is_exact] = 1.0
+
+        first, second = (similarity, containment) if rank_by == 'similarity' else (containment, similarity)
+        order = np.lexsort((records, -second, -first))[:top_k]
+        records = records[order]
+        metadata = self.store.metadata
+        columns = [c for c in ('Symbol', 'GeneType', 'source') if c in metadata]
+        result = metadata.iloc[records][columns].reset_index(drop=True)
+        result.insert(0, 'record', records)
+        result['length'] = np.diff(np.asarray(self.store.offsets))[records]
+        result['similarity'] = similarity[order]
+        result['containment'] = containment[order]
+        result['exact'] = is_exact[order]
+        return result
+
+
+def index_path(data_dir=DATA_DIR):
+    return cache_path(data_dir, INDEX_DIR_NAME)
+
+
+def load_index(data_dir=DATA_DIR, all_data=None):
+    """פתיחת האינדקס של תיקיית הנתונים; נבנה מחדש אם הנתונים השתנו"""
+    if all_data is None:
+        _, _, _, all_data = load_splits(data_dir)
+    store = load_store(data_dir, all_data)
+    key = derived_key(data_dir, INDEX_VERSION)
+    path = index_path(data_dir)
+    try:
+        index = SimilarityIndex(path, store)
+        if index.info.get('key') == key and index.info.get('version') == INDEX_VERSION \
+                and len(index) == len(store):
+            return index
+    except (OSError, ValueError, KeyError):
+        pass
+    fingerprints = sequence_fingerprints(all_data['NucleotideSequence'])
+    return build_index(store, fingerprints, path, key=key)
+
+
+def search(sequences, data_dir=DATA_DIR, top_k=10, rank_by='similarity'):
+    """חיפוש כמה רצפים - טבלה אחת עם עמודת query"""
+    index = load_index(data_dir)
+    results = [index.query(seq, top_k, rank_by=rank_by).assign(query=i) for i, seq in enumerate(sequences)]
+    return pd.concat(results, ignore_index=True) if results else pd.DataFrame()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Find the records most similar to a DNA sequence")
+    parser.add_argument('sequences', nargs='*', help="query sequences (A/C/G/T, <...> markers optional)")
+    parser.add_argument('--file', help="file with one query sequence per line")
+    parser.add_argument('--data-dir', default=DATA_DIR, help="directory holding the split CSV files")
+    parser.add_argument('--top-k', type=int, default=10)
+    parser.add_argument('--rank-by', choices=['similarity', 'containment'], default='similarity',
+                        help="containment: records that contain the query rank first")
+    args = parser.parse_args()
+
+    queries = list(args.sequences)
+    if args.file:
+        with open(args.file) as f:
+            queries += [line.strip() for line in f if line.strip()]
+    index = load_index(args.data_dir)
+    print(f"🔎 Similarity index: {len(index):,} records, {index.info['keys']:,} k-mer keys (k={index.info['k']})")
+    if not queries:
+        print(f"✅ Index ready at: {index.path}")
+        return
+    for i, sequence in enumerate(queries, 1):
+        preview = sequence if len(sequence) <= 50 else sequence[:50] + '...'
+        print(f"\nQuery {i}: {preview} ({len(sequence.strip('<>'))} bases)")
+        result = index.query(sequence, args.top_k, rank_by=args.rank_by)
+        if result.empty:
+            print("   No similar records")
+            continue
+        print(result.to_string(index=False, float_format=lambda v: f"{v:.3f}"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+"""
+Approximate Sketches
+ספירת ערכים ייחודיים ושכיחויות בזיכרון קבוע (HyperLogLog, Count-Min)
+
+``HyperLogLog`` estimates distinct counts from 2^p one-byte registers
+(16 KB at the default p=14, relative standard error 1.04/sqrt(2^p) ~ 0.8%).
+``CountMinSketch`` keeps ``depth x width`` counters; an estimate never
+undercounts and overcounts by at most e/width * N with probability
+1 - exp(-depth). ``HeavyHitters`` adds a bounded candidate list on top, so
+the most frequent values can be listed. All of them work on the 64-bit
+hashes of ``pd.util.hash_pandas_object`` and merge by element-wise max/sum,
+so they combine across chunks, files and processes like the exact
+accumulators. ``SketchProfile`` and ``SketchCounter`` are drop-in
+replacements for ``ColumnProfile`` and ``ValueCounter``.
+"""
+
+import math
+
+import numpy as np
+import pandas as pd
+
+from accumulators import ColumnProfile, normalized
+
+HLL_PRECISION = 14
+CMS_WIDTH = 2048
+CMS_DEPTH = 5
+HEAVY_HITTERS = 64
+
+
+def hash_values(values):
+    """hash של 64 ביט לכל ערך (אותו hash בכל מנה ובכל תהליך)"""
+    return pd.util.hash_pandas_object(pd.Series(values), index=False, categorize=False).to_numpy()
+
+
+def _bit_length(x):
+    """מספר הביטים של כל ערך uint64 (0 עבור 0) - בלי המרה ל-float"""
+    x = x.copy()
+    n = np.zeros(len(x), dtype=np.uint8)
+    for shift in (32, 16, 8, 4, 2, 1):
+        high = x >= np.uint64(1 << shift)
+        n[high] += shift
+        x[high] >>= np.uint64(shift)
+    return n + (x > 0)
+
+
+class HyperLogLog:
+    """מספר משוער של ערכים ייחודיים (HyperLogLog עם תיקון לטווח הקטן)"""
+
+    def __init__(self, precision=HLL_PRECISION):
+        if not 4 <= precision <= 18:
+            raise ValueError("precision must be between 4 and 18")
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    def update_hashes(self, hashes):
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        if len(hashes) == 0:
+            return self
+        width = 64 - self.precision
+        index = (hashes >> np.uint64(width)).astype(np.int64)
+        rest = hashes & np.uint64((1 << width) - 1)
+        rank = (width + 1 - _bit_length(rest)).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+        return self
+
+    def update(self, values):
+        return self.update_hashes(hash_values(values))
+
+    def merge(self, other):
+        if other.precision != self.precision:
+            raise ValueError("cannot merge HyperLogLog sketches with different precision")
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    @property
+    def relative_error(self):
+        """שגיאת התקן היחסית של האומדן"""
+        return 1.04 / math.sqrt(len(self.registers))
+
+    def estimate(self):
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / np.power(2.0, -self.registers.astype(np.float64)).sum()
+        zeros = int((self.registers == 0).sum())
+        if raw <= 2.5 * m and zeros:
+            return m * math.log(m / zeros)
+        return float(raw)
+
+
+class CountMinSketch:
+    """שכיחות משוערת לכל ערך - לעולם לא פחות מהאמת"""
+
+    def __init__(self, width=CMS_WIDTH, depth=CMS_DEPTH):
+        self.width = width
+        self.depth = depth
+        self.table = np.zeros((depth, width), dtype=np.int64)
+        self.total = 0
+
+    def _columns(self, hashes):
+        """עמודה בכל שורה לפי double hashing: h1 + i*h2"""
+        h1 = hashes & np.uint64(0xFFFFFFFF)
+        h2 = (hashes >> np.uint64(32)) | np.uint64(1)
+        rows = np.arange(self.depth, dtype=np.uint64)[:, None]
+        return ((h1 + rows * h2) % np.uint64(self.width)).astype(np.int64)
+
+    def update_hashes(self, hashes, counts=None):
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        if len(hashes) == 0:
+            return self
+        columns = self._columns(hashes)
+        for row in range(self.depth):
+            self.table[row] += np.bincount(columns[row], weights=counts, minlength=self.width).astype(np.int64)
+        self.total += int(len(hashes) if counts is None else np.sum(counts))
+        return self
+
+    def query_hashes(self, hashes):
+        columns = self._columns(np.asarray(hashes, dtype=np.uint64))
+        return self.table[np.arange(self.depth)[:, None], columns].min(axis=0)
+
+    def merge(self, other):
+        if (other.width, other.depth) != (self.width, self.depth):
+            raise ValueError("cannot merge Count-Min sketches with different shapes")
+        self.table += other.table
+        self.total += other.total
+        return self
+
+    @property
+    def epsilon(self):
+        return math.e / self.width
+
+    @property
+    def confidence(self):
+        return 1 - math.exp(-self.depth)
+
+    @property
+    def error_bound(self):
+        """הטעות המקסימלית (בספירות) בהסתברות confidence"""
+        return self.epsilon * self.total
+
+
+class HeavyHitters:
+    """Count-Min עם רשימת המועמדים השכיחים ביותר (עד capacity ערכים)"""
+
+    def __init__(self, capacity=HEAVY_HITTERS, width=CMS_WIDTH, depth=CMS_DEPTH):
+        self.capacity = capacity
+        self.sketch = CountMinSketch(width, depth)
+        self.candidates = {}  # hash -> value
+
+    def _trim(self):
+        if len(self.candidates) <= self.capacity:
+            return
+        hashes = np.fromiter(self.candidates, dtype=np.uint64, count=len(self.candidates))
+        keep = hashes[np.argsort(-self.sketch.query_hashes(hashes), kind='stable')[:self.capacity]]
+        self.candidates = {h: self.candidates[h] for h in keep.tolist()}
+
+    def update(self, values):
+        values = pd.Series(values).dropna()
+        hashes = hash_values(values)
+        unique, first, counts = np.unique(hashes, return_index=True, return_counts=True)
+        self.sketch.update_hashes(unique, counts)
+        # רק הערכים השכיחים במנה יכולים להיכנס לרשימה
+        top = np.argsort(-counts, kind='stable')[:self.capacity]
+        for h, i in zip(unique[top].tolist(), first[top]):
+            self.candidates.setdefault(h, values.iloc[i])
+        self._trim()
+        return self
+
+    def merge(self, other):
+        self.sketch.merge(other.sketch)
+        for h, value in other.candidates.items():
+            self.candidates.setdefault(h, value)
+        self._trim()
+        return self
+
+    def result(self):
+        """השכיחויות המשוערות של המועמדים, מהגדול לקטן"""
+        if not self.candidates:
+            return pd.Series(dtype='int64')
+        hashes = np.fromiter(self.candidates, dtype=np.uint64, count=len(self.candidates))
+        estimates = pd.Series(self.sketch.query_hashes(hashes), index=list(self.candidates.values()))
+        return estimates.sort_values(ascending=False, kind='stable')
+
+
+class SketchCounter(HeavyHitters):
+    """תחליף ל-ValueCounter: counts ו-result() מתוך ה-sketch"""
+
+    @property
+    def counts(self):
+        return self.result()
+
+
+class SketchProfile(ColumnProfile):
+    """תחליף ל-ColumnProfile: ערכים ייחודיים לפי HyperLogLog בזיכרון קבוע"""
+
+    def __init__(self, precision=HLL_PRECISION):
+        super().__init__()
+        self.hll = HyperLogLog(precision)
+
+    def update(self, values):
+        self.hll.update(normalized(self._observe(values)))
+        return self
+
+    def merge(self, other):
+        self._merge_observed(other)
+        self.hll.merge(other.hll)
+        return self
+
+    @property
+    def unique(self):
+        # אומדן לא יכול לעבור את מספר הערכים שנספרו
+        return min(int(round(self.hll.estimate())), self.non_null)
@@ -0,0 +1,243 @@
+"""
+Watch Mode
+מצב מעקב - עדכון הדוח והתרשימים בכל פעם שקבצי הסטים משתנים
+
+The split files are polled every ``--interval`` seconds by their signature
+(size + mtime, the same one the cache uses) - no inotify dependency, so it
+behaves the same on every platform and on network mounts. A change is acted
+on only after the files have been quiet for ``--debounce`` seconds, so a
+burst of saves (or a copy still in progress) triggers a single refresh.
+
+Between refreshes the parsed splits and the per-file report partials stay in
+memory, together with each split's feature rows, per-record quality scores
+and row hashes of the figure input columns. Only changed files are re-read
+(``load_split`` also refreshes their on-disk cache entry), re-summarized and
+re-derived; the report, the feature and quality tables and the column
+digests are re-assembled from the per-split pieces, and ``update_figures``
+redraws only the figures whose input columns changed. Only the length
+z-scores and the flags are recomputed over all splits, since they compare
+each record with its whole GeneType. Figures are drawn in this process, so
+matplotlib and the dashboard template stay warm as well.
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+import create_visualizations as viz
+from build_cache import BuildCache, row_hashes, rows_digest
+from data_loader import DATA_DIR, SPLIT_FILES, combine_splits, file_signature, ingest_table, load_split
+from features import build_features
+from generate_report import OUTPUT_FORMATS, SAMPLE_SIZE, combine, partial_key, print_report, summarize_file, \
+    write_outputs
+from instrumentation import stage
+from quality import quality_table, string_scores
+
+POLL_INTERVAL = 1.0
+DEBOUNCE = 2.0
+
+# שם הסט -> שם הטבלה שלו בנתוני התרשימים
+FIGURE_TABLES = {'train': 'train', 'test': 'test', 'validation': 'val'}
+
+
+def split_signatures(data_dir):
+    """חתימה לכל קובץ סט (None אם הקובץ חסר כרגע, למשל באמצע החלפה)"""
+    signatures = {}
+    for name, fname in SPLIT_FILES.items():
+        try:
+            signatures[name] = file_signature(os.path.join(data_dir, fname))
+        except OSError:
+            signatures[name] = None
+    return signatures
+
+
+def input_columns(table):
+    """כל העמודות שתרשים כלשהו קורא מטבלה"""
+    return sorted({col for inputs in viz.FIGURE_INPUTS.values() for col in inputs.get(table, [])})
+
+
+class WarmDataset:
+    """הסטים, הסיכומים החלקיים של הדוח והטבלאות הנגזרות של כל סט - נשמרים בזיכרון בין עדכונים"""
+
+    def __init__(self, data_dir, sample_size=SAMPLE_SIZE):
+        self.data_dir = data_dir
+        self.sample_size = sample_size
+        self.frames = {}      # שם סט -> הטבלה מ-load_split
+        self.partials = {}    # שם קובץ -> סיכום חלקי לדוח
+        self.signatures = {}  # שם סט -> החתימה של הקובץ שנטען
+        self.features = {}    # שם סט -> שורות טבלת הפיצ'רים של הסט
+        self.scores = {}      # שם סט -> ציוני האיכות של כל רשומה בסט
+        self.hashes = {}      # שם סט -> {(טבלה, עמודה): hash לכל שורה}
+
+    def update(self, names, signatures):
+        """טעינה וסיכום מחדש רק של הסטים שהשתנו"""
+        cache = BuildCache(self.data_dir)
+        for name in names:
+            fname = SPLIT_FILES[name]
+            # המפתח נלקח לפני הקריאה - שינוי באמצע הקריאה יתגלה בבדיקה הבאה
+            key = partial_key(self.data_dir, fname, self.sample_size)
+            with stage(f"load:{name}") as span:
+                frame, _ = load_split(self.data_dir, name, fname)
+                span.rows = len(frame)
+            partial = cache.load_object(f"report:{fname}", key)
+            if partial is None:
+                with stage(f"summarize:{fname}", rows=len(frame)):
+                    partial = summarize_file([frame], self.sample_size)
+                cache.store_object(f"report:{fname}", key, partial)
+            with stage(f"derive:{name}", rows=len(frame)):
+                self._derive(name, frame)
+            self.frames[name], self.partials[fname] = frame, partial
+            self.signatures[name] = signatures[name]
+        cache.save()
+
+    def _derive(self, name, frame):
+        """פיצ'רים, ציוני איכות ו-hash עמודות הקלט של סט אחד"""
+        source = pd.Categorical([name] * len(frame), categories=list(SPLIT_FILES))
+        features = build_features(frame.assign(source=source))
+        table = FIGURE_TABLES[name]
+        hashes = {('features', col): row_hashes(features, [col]) for col in input_columns('features')}
+        hashes.update({(table, col): row_hashes(frame, [col]) for col in input_columns(table)})
+        self.features[name], self.scores[name], self.hashes[name] = \
+            features, string_scores(frame['NucleotideSequence']), hashes
+
+    def changed(self, signatures):
+        return [name for name in SPLIT_FILES if signatures[name] != self.signatures.get(name)]
+
+    def summary(self):
+        return combine({fname: self.partials[fname] for fname in SPLIT_FILES.values()})
+
+    def splits(self):
+        return combine_splits({name: self.frames[name] for name in SPLIT_FILES})
+
+    def figure_data(self, exclude_flagged=False):
+        """הטבלאות של load_figure_data ו-{(טבלה, עמודה): digest} - מהחלקים של כל סט"""
+        train, test, val, all_data = self.splits()
+        features = pd.concat([self.features[name] for name in SPLIT_FILES], ignore_index=True)
+        features['symbol_prefix'] = pd.api.types.union_categoricals(
+            [self.features[name]['symbol_prefix'] for name in SPLIT_FILES], sort_categories=True)
+        scores = {key: np.concatenate([self.scores[name][key] for name in SPLIT_FILES])
+                  for key in self.scores[next(iter(SPLIT_FILES))]}
+        quality = quality_table(scores, all_data['GeneType'], all_data.index)
+        keep = ~quality['flagged'].to_numpy() if exclude_flagged else None
+        if keep is not None:
+            features = features[keep]
+
+        parts = {}
+        for name in SPLIT_FILES:
+            for key, hashes in self.hashes[name].items():
+                parts.setdefault(key, []).append(hashes)
+        digests = {}
+        for (table, col), arrays in parts.items():
+            hashes = np.concatenate(arrays)
+            if table == 'features' and keep is not None:
+                hashes = hashes[keep]
+            digests[(table, col)] = rows_digest([col], hashes)
+
+        data = {'train': train, 'test': test, 'val': val, 'all_data': all_data, 'features': features,
+                'ingest': ingest_table(self.data_dir), 'quality': quality}
+        return data, digests
+
+
+def refresh(dataset, changed, signatures, output_dir, figures_dir, names, formats=OUTPUT_FORMATS,
+            exclude_flagged=False):
+    """עדכון אחד: הסטים שהשתנו, הדוח והתרשימים שהקלט שלהם השתנה - מחזיר ({תרשים: שניות}, שניות)"""
+    start = time.perf_counter()
+    dataset.update(changed, signatures)
+
+    summary = dataset.summary()
+    with stage('print_report', rows=summary['total_samples']):
+        buffer = io.StringIO()
+        with contextlib.redirect_stdout(buffer):
+            print_report(summary)
+    write_outputs(summary, buffer.getvalue(), output_dir, formats)
+    print(f"📝 Report updated in {time.perf_counter() - start:.2f}s")
+
+    with stage('figure_data'):
+        data, digests = dataset.figure_data(exclude_flagged)
+    timings, _ = viz.update_figures(names, data, figures_dir, dataset.data_dir, exclude_flagged=exclude_flagged,
+                                    column_digests=digests)
+    return timings, time.perf_counter() - start
+
+
+def watch(data_dir, output_dir, figures_dir, names, formats=OUTPUT_FORMATS, interval=POLL_INTERVAL,
+          debounce=DEBOUNCE, exclude_flagged=False):
+    """לולאת המעקב - רצה עד Ctrl+C"""
+    viz._setup_plotting('Agg')
+    dataset = WarmDataset(data_dir)
+    seen = split_signatures(data_dir)
+    last_change = time.monotonic() - debounce  # העדכון הראשון (כל הסטים) רץ מיד
+    while True:
+        current = split_signatures(data_dir)
+        if current != seen:
+            seen, last_change = current, time.monotonic()
+        elif last_change is not None and time.monotonic() - last_change >= debounce:
+            last_change = None
+            changed = dataset.changed(current)
+            if None in current.values():
+                missing = [SPLIT_FILES[name] for name, sig in current.items() if sig is None]
+                print(f"⚠️  Missing {', '.join(missing)} - waiting for the files to come back")
+            elif changed:
+                files = ', '.join(SPLIT_FILES[name] for name in changed)
+                print(f"🔄 Changed: {files}")
+                try:
+                    timings, seconds = refresh(dataset, changed, current, output_dir, figures_dir, names,
+                                               formats, exclude_flagged)
+                except OSError as e:
+                    # תקלה זמנית (קובץ נעול, באמצע העתקה) - השינוי נשאר ממתין וננסה שוב
+                    last_change = time.monotonic()
+                    print(f"❌ Refresh failed ({e}) - retrying in {debounce:.0f}s")
+                except ValueError as e:
+                    # תוכן פגום - ניסיון חוזר יקרא את אותם בתים, מחכים לשינוי הבא בקובץ
+                    print(f"❌ Refresh failed ({e}) - keeping the previous report until the file changes")
+                else:
+                    redrawn = ', '.join(timings) or 'none'
+                    print(f"✅ Figures up to date after {seconds:.2f}s (redrawn: {redrawn})")
+        time.sleep(interval)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Refresh the report and figures whenever the split files change")
+    parser.add_argument('--data-dir', default=DATA_DIR, help="directory holding the split CSV files")
+    parser.add_argument('--output-dir', default=None,
+                        help="where the report files are written (default: <data-dir>/report)")
+    parser.add_argument('--figures-dir', default=None,
+                        help="where the PNG files are written (default: <data-dir>/visualizations)")
+    parser.add_argument('--format', nargs='+', choices=OUTPUT_FORMATS, default=list(OUTPUT_FORMATS),
+                        dest='formats', help="report outputs")
+    parser.add_argument('--only', nargs='+', metavar='FIGURE', help="keep only these figures up to date")
+    parser.add_argument('--skip', nargs='+', metavar='FIGURE', help="do not render these figures")
+    parser.add_argument('--interval', type=float, default=POLL_INTERVAL, help="seconds between file checks")
+    parser.add_argument('--debounce', type=float, default=DEBOUNCE,
+                        help="seconds the files must stay unchanged before a refresh")
+    parser.add_argument('--exclude-flagged', action='store_true',
+                        help="leave records flagged by quality.py out of the feature-based figures")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    try:
+        names = viz.select_figures(args.only, args.skip)
+    except ValueError as e:
+        raise SystemExit(f"❌ {e}")
+    output_dir = args.output_dir or os.path.join(args.data_dir, "report")
+    figures_dir = args.figures_dir or os.path.join(args.data_dir, "visualizations")
+
+    print("=" * 60)
+    print(f"👀 Watching {', '.join(SPLIT_FILES.values())} in {args.data_dir}")
+    print(f"   Report -> {output_dir}, figures -> {figures_dir} (Ctrl+C to stop)")
+    print("=" * 60)
+    try:
+        watch(args.data_dir, output_dir, figures_dir, names, args.formats, args.interval, args.debounce,
+              args.exclude_flagged)
+    except KeyboardInterrupt:
+        print("\n👋 Stopped watching")
+
+
+if __name__ == "__main__":
+    main()